@@ -0,0 +1,291 @@
+"""
+Cache sémantique des réponses, partagé entre les sessions.
+
+Une question proche (similarité cosinus des embeddings >= seuil) d'une
+question déjà traitée pour la même procédure et la même version de l'index
+reçoit immédiatement la réponse et les sources enregistrées, sans recherche
+ni appel au LLM.
+
+Les entrées ont une durée de vie (TTL), leur nombre est plafonné (éviction
+des moins récemment utilisées) et elles sont conservées sur disque entre
+deux redémarrages. Les entrées d'une autre version de l'index (nouvelle
+ingestion, autre modèle) sont ignorées puis supprimées.
+
+Le fichier peut être partagé par plusieurs processus (plusieurs instances
+de l'application): chaque écriture se fait sous verrou de fichier et
+fusionne d'abord les entrées écrites entre-temps par les autres processus.
+La date de dernière utilisation d'une entrée servie est enregistrée au plus
+toutes les save_interval secondes.
+
+Structure (dossier ANSWER_CACHE_DIR):
+    answers.npz    vectors: float32 (n, dimension), entries: JSON des n entrées
+    answers.lock   verrou des écritures (fcntl, sans contenu)
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+try:
+    import fcntl
+except ImportError:
+    # Pas de verrou de fichier (Windows): un seul processus par dossier de cache
+    fcntl = None
+
+
+class AnswerCache:
+    """
+    Cache (portée, version de l'index) -> [(vecteur de la question, réponse, sources)].
+
+    La portée est la procédure sélectionnée (et l'éventuel filtre de
+    métadonnées): une réponse n'est jamais servie pour une autre procédure.
+    """
+
+    def __init__(self, directory: Path, threshold: float = 0.95, ttl_seconds: float = 86400,
+                 max_entries: int = 500, save_interval: float = 60):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+
+        self._file = self.directory / "answers.npz"
+        self._entries: List[Dict] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+        # Version du fichier déjà fusionnée (inode, mtime, taille), entrées
+        # retirées par ce processus (à ne pas reprendre du fichier) et dates
+        # d'utilisation pas encore écrites
+        self._file_version = None
+        self._removed = set()
+        self._dirty = False
+        self._saved_at = time.time()
+
+        disk = self._read()
+        if disk is not None:
+            self._entries, self._vectors, self._file_version = disk
+            self._purge(version=None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _read(self) -> Optional[Tuple[List[Dict], np.ndarray, Tuple]]:
+        """
+        Relit le fichier du cache.
+
+        Returns:
+            Tuple (entrées, vecteurs, identité du fichier), ou None si le fichier
+            est absent ou illisible (le cache repart alors vide)
+        """
+        try:
+            stat = self._file.stat()
+            with np.load(self._file) as data:
+                entries = json.loads(str(data["entries"]))
+                vectors = data["vectors"]
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(entries) != len(vectors):
+            return None
+        return entries, vectors, (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _entry_key(entry: Dict) -> Tuple:
+        return entry["scope"], entry["version"], entry["question"], entry["created"]
+
+    def _evict(self):
+        """
+        Éviction des entrées les moins récemment utilisées au-delà de max_entries.
+        """
+        if len(self._entries) > self.max_entries:
+            order = np.argsort([e["used"] for e in self._entries], kind='stable')
+            keep = np.sort(order[len(self._entries) - self.max_entries:])
+            self._forget(keep)
+
+    def _forget(self, keep):
+        """
+        Ne conserve que les entrées d'indices keep.
+        """
+        kept = set(keep)
+        self._removed.update(self._entry_key(e) for i, e in enumerate(self._entries) if i not in kept)
+        self._entries = [self._entries[i] for i in keep]
+        self._vectors = self._vectors[keep]
+
+    def _merge_from_disk(self):
+        """
+        Ajoute les entrées écrites par un autre processus depuis la dernière
+        lecture (dates d'utilisation: la plus récente des deux).
+        """
+        disk = self._read()
+        if disk is None or disk[2] == self._file_version:
+            return
+        entries, vectors, _ = disk
+        if len(entries) and len(self._entries) and vectors.shape[1] != self._vectors.shape[1]:
+            # Autre modèle d'embeddings: les vecteurs ne sont pas comparables
+            return
+        now = time.time()
+        self._removed = {key for key in self._removed if now - key[3] < self.ttl_seconds}
+        known = {self._entry_key(entry): entry for entry in self._entries}
+        added = []
+        for i, entry in enumerate(entries):
+            key = self._entry_key(entry)
+            if key in known:
+                known[key]["used"] = max(known[key]["used"], entry["used"])
+            elif key not in self._removed and now - entry["created"] < self.ttl_seconds:
+                added.append(i)
+        if added:
+            self._entries = self._entries + [entries[i] for i in added]
+            self._vectors = np.vstack([self._vectors.reshape(-1, vectors.shape[1]), vectors[added]])
+            self._evict()
+
+    def _purge(self, version: Optional[str]):
+        """
+        Supprime les entrées expirées et celles d'une autre version de l'index.
+        """
+        now = time.time()
+        keep = [
+            i for i, entry in enumerate(self._entries)
+            if now - entry["created"] < self.ttl_seconds
+            and (version is None or entry["version"] == version)
+        ]
+        if len(keep) != len(self._entries):
+            self._forget(keep)
+            self._save()
+
+    def get(self, scope: str, version: str, vector) -> Optional[Tuple[str, List[Document]]]:
+        """
+        Réponse enregistrée pour une question similaire.
+
+        Returns:
+            Tuple (réponse, documents sources), ou None si aucune question
+            assez proche n'a été traitée pour cette portée et cette version
+        """
+        if not self.enabled:
+            return None
+        query = self._unit(vector)
+        with self._lock:
+            self._purge(version)
+            candidates = [i for i, entry in enumerate(self._entries) if entry["scope"] == scope]
+            if candidates and self._vectors.shape[1] == len(query):
+                similarities = self._vectors[candidates] @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry = self._entries[candidates[best]]
+                    entry["used"] = time.time()
+                    self.hits += 1
+                    # Date d'utilisation (éviction LRU) écrite au plus toutes les save_interval s
+                    self._dirty = True
+                    if entry["used"] - self._saved_at >= self.save_interval:
+                        self._save()
+                    sources = [Document(page_content=s["page_content"], metadata=s["metadata"])
+                               for s in entry["sources"]]
+                    return entry["answer"], sources
+            self.misses += 1
+            return None
+
+    def put(self, scope: str, version: str, question: str, vector, answer: str, sources: List[Document]):
+        """
+        Enregistre la réponse à une question (éviction LRU au-delà de max_entries).
+        """
+        if not self.enabled:
+            return
+        vector = self._unit(vector)
+        now = time.time()
+        entry = {
+            "scope": scope,
+            "version": version,
+            "question": question,
+            "answer": answer,
+            "sources": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in sources],
+            "created": now,
+            "used": now,
+        }
+        with self._lock:
+            self._purge(version)
+            if len(self._entries) and self._vectors.shape[1] != len(vector):
+                # Autre modèle d'embeddings: les anciens vecteurs ne sont pas comparables
+                self._entries, self._vectors = [], np.zeros((0, len(vector)), dtype=np.float32)
+            self._entries.append(entry)
+            self._vectors = np.vstack([self._vectors.reshape(-1, len(vector)), vector[None, :]])
+            self._evict()
+            self._save()
+
+    def flush(self):
+        """
+        Écrit les dates d'utilisation pas encore enregistrées.
+        """
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._forget([])
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self._save(merge=False)
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Verrou exclusif entre processus pendant une écriture (sans effet sans fcntl).
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.directory / "answers.lock", 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _save(self, merge: bool = True):
+        """
+        Écriture atomique du cache sur disque, sous verrou, après fusion des
+        entrées des autres processus (sauf pour clear()).
+        """
+        with self._file_lock():
+            if merge:
+                self._merge_from_disk()
+            tmp_file = self._file.with_suffix(".tmp.npz")
+            np.savez(tmp_file, vectors=self._vectors,
+                     entries=np.array(json.dumps(self._entries, ensure_ascii=False, default=str)))
+            os.replace(tmp_file, self._file)
+            stat = self._file.stat()
+            self._file_version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self._dirty = False
+        self._saved_at = time.time()
+
+    def stats(self) -> Dict:
+        """
+        Compteurs du cache (pour régler le seuil et la taille).
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
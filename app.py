@@ -9,16 +9,27 @@ Ne remplace PAS une consultation médicale.
 
 import os
 import re
+import json
 import time
-import pickle
+import asyncio
+import threading
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 
+import numpy as np
 import streamlit as st
 from dotenv import load_dotenv
-from rank_bm25 import BM25Okapi
 
-from langchain_community.vectorstores import FAISS
+from answer_cache import AnswerCache
+from chunk_store import ChunkStore
+from context_compression import ContextCompressor
+from context_packing import RERANK_SCORE_KEY, SCORE_KEY, TokenCounter, pack_context
+from embedding_cache import QueryEmbeddingCache
+from partitions import ALL_PROCEDURES, PartitionedIndexes, SearchIndexes
+from reranker import CrossEncoderReranker
+from bm25_index import tokenize
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_classic.chains import RetrievalQA
 from langchain_core.prompts import PromptTemplate
@@ -26,7 +37,7 @@ from langchain_community.llms import OpenAI
 from langchain_openai import ChatOpenAI
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
-from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
 
 # Chargement des variables d'environnement
 load_dotenv()
@@ -36,12 +47,52 @@ load_dotenv()
 # ============================================
 
 VECTOR_STORE_DIR = Path("vector_store")
+CHUNK_STORE_DIR = VECTOR_STORE_DIR / "chunks"
 EMBEDDING_MODEL = "dangvantuan/sentence-camembert-large"
 TOP_K = int(os.getenv("TOP_K_RETRIEVAL", "4"))
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.1"))
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
 MODEL_NAME = os.getenv("MODEL_NAME", "llama-3.3-70b-versatile")
 
+# Cache mémoire des embeddings de questions (partagé par toutes les sessions)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+# Threads partagés par les sessions pour exécuter en parallèle les recherches
+# vectorielle et BM25
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+
+# Constante de Reciprocal Rank Fusion: score = poids / (rang + RRF_OFFSET)
+RRF_OFFSET = 60
+
+# Re-classement par cross-encoder des questions ambiguës (désactivé par défaut)
+RERANK = os.getenv("RERANK", "false").lower() == "true"
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "antoinelouis/crossencoder-camembert-base-mmarcoFR")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "12"))
+RERANK_MIN_GAP = float(os.getenv("RERANK_MIN_GAP", "0.2"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+
+# Cache sémantique des réponses (partagé par les sessions, conservé sur disque)
+ANSWER_CACHE_DIR = Path(os.getenv("ANSWER_CACHE_DIR", "cache/answers"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+# Contexte envoyé au LLM: budget en tokens (tiktoken), score de fusion minimal
+# relatif au meilleur chunk (les chunks plus faibles ne sont pas envoyés).
+# Désactivé par défaut: un chunk trouvé par une seule recherche au rang r
+# obtient poids / (r + 60), soit 0.4 x 60 / 67 = 0.358 fois le meilleur score
+# possible pour BM25 seul au dernier rang avec alpha = 0.6 et TOP_K = 4; un
+# seuil au-delà retire du prompt les chunks trouvés uniquement par BM25
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "2000"))
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.0"))
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+# Compression extractive du contexte: seules les phrases les plus proches de la
+# question sont envoyées au LLM (désactivée par défaut)
+COMPRESS_CONTEXT = os.getenv("COMPRESS_CONTEXT", "false").lower() == "true"
+COMPRESSION_MAX_SENTENCES = int(os.getenv("COMPRESSION_MAX_SENTENCES", "6"))
+# Vecteurs de phrases gardés en mémoire pour la compression
+SENTENCE_CACHE_SIZE = 4096
+# Affiche les compteurs des caches et les latences de recherche dans la barre latérale
+SHOW_STATS = os.getenv("SHOW_STATS", "false").lower() == "true"
+
 # Liste des procédures disponibles (basée sur les métadonnées dans vector_store)
 AVAILABLE_PROCEDURES = [
     "Toutes les procédures",
@@ -348,15 +399,6 @@ def init_session_state():
     if "messages" not in st.session_state:
         st.session_state.messages = []
     
-    if "vector_store" not in st.session_state:
-        st.session_state.vector_store = None
-    
-    if "hybrid_retriever" not in st.session_state:
-        st.session_state.hybrid_retriever = None
-    
-    if "qa_chain" not in st.session_state:
-        st.session_state.qa_chain = None
-    
     if "loading_complete" not in st.session_state:
         st.session_state.loading_complete = False
     
@@ -368,23 +410,206 @@ def init_session_state():
 # HYBRID RETRIEVAL
 # ============================================
 
+class RetrievalTimings:
+    """
+    Latences des étapes du HybridRetriever (encodage de la question,
+    recherche FAISS, BM25, fusion, re-classement, total), pour voir quelle
+    étape domine.
+    Partagé par les sessions (accès protégés par un verrou).
+    """
+    
+    STEPS = ("embedding", "faiss", "bm25", "fusion", "rerank", "total")
+    
+    def __init__(self):
+        self.count = 0
+        self.last = {step: 0.0 for step in self.STEPS}
+        self._totals = {step: 0.0 for step in self.STEPS}
+        self._lock = threading.Lock()
+    
+    def record(self, timings: Dict[str, float]):
+        with self._lock:
+            self.count += 1
+            self.last = dict(timings)
+            for step, ms in timings.items():
+                self._totals[step] += ms
+    
+    def stats(self) -> Dict:
+        """
+        Latences de la dernière recherche et moyennes, en millisecondes.
+        """
+        with self._lock:
+            return {
+                "requests": self.count,
+                "last_ms": {step: round(ms, 2) for step, ms in self.last.items()},
+                "mean_ms": {
+                    step: round(total / self.count, 2) if self.count else 0.0
+                    for step, total in self._totals.items()
+                },
+            }
+
+
+def reciprocal_rank_fusion(
+    rankings: List[np.ndarray], weights: List[float], k: int, offset: int = RRF_OFFSET
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reciprocal Rank Fusion sur des tableaux d'IDs de chunks.
+    
+    Le score d'un chunk est la somme de weight / (rang + offset) sur les
+    classements où il apparaît. Les ex-aequo gardent l'ordre de première
+    apparition (premier classement d'abord).
+    
+    Args:
+        rankings: Classements (IDs de chunks, du meilleur au moins bon)
+        weights: Poids de chaque classement
+        k: Nombre de chunks retenus
+        
+    Returns:
+        Tuple (IDs, scores) des k meilleurs chunks, par score décroissant
+    """
+    ids = np.concatenate([np.asarray(r, dtype=np.int64) for r in rankings])
+    if not len(ids):
+        return ids, np.zeros(0)
+    contributions = np.concatenate([
+        weight / (np.arange(len(ranking)) + offset) for ranking, weight in zip(rankings, weights)
+    ])
+    unique, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    scores = np.bincount(inverse, weights=contributions)
+    order = np.lexsort((first, -scores))[:k]
+    return unique[order], scores[order]
+
+
+def _timed(function, *args):
+    """
+    Exécute function(*args) et renvoie (résultat, durée en millisecondes).
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
 class HybridRetriever(BaseRetriever):
     """
     Retriever hybride combinant recherche vectorielle (FAISS) et recherche par mots-clés (BM25).
     Utilise Reciprocal Rank Fusion (RRF) pour combiner les résultats.
-    Supporte le filtrage par procédure pour des recherches ciblées.
+    Supporte le filtrage par procédure pour des recherches ciblées: seuls les
+    index de la procédure sélectionnée sont interrogés.
+    metadata_filter restreint en plus la recherche par métadonnées, par ex.
+    {"source_type": "pdf"} ou {"folder": ["pose_pac", "biopsie_scanner"]}:
+    le filtre est appliqué dans FAISS et dans BM25 (bitsets précalculés).
+    
+    Les deux recherches sont indépendantes: elles s'exécutent en parallèle
+    sur le pool de threads partagé executor (séquentiellement sans pool).
+    
+    Avec un reranker, la fusion garde reranker.candidates chunks, que le
+    cross-encoder re-classe si la fusion est ambiguë avant de retenir les k
+    premiers.
     """
     
-    vector_store: FAISS
-    bm25: BM25Okapi
-    chunks: List[Document]
+    indexes: PartitionedIndexes
+    store: ChunkStore
     k: int = 4
     alpha: float = 0.5  # Poids pour la recherche vectorielle (0.5 = équilibré)
-    selected_procedure: str = "Toutes les procédures"  # Filtre de procédure
+    rrf_offset: int = RRF_OFFSET  # Constante de la fusion RRF
+    selected_procedure: str = ALL_PROCEDURES  # Filtre de procédure
+    metadata_filter: Optional[Dict[str, Union[str, List[str]]]] = None  # Filtre de métadonnées
+    executor: Optional[ThreadPoolExecutor] = None  # Pool partagé des deux recherches
+    timings: Optional[RetrievalTimings] = None  # Latences par étape
+    reranker: Optional[CrossEncoderReranker] = None  # Re-classement des questions ambiguës
     
     class Config:
         arbitrary_types_allowed = True
     
+    def _prepare(self):
+        """
+        Index de la procédure sélectionnée (partition chargée à la première
+        utilisation), nombre de candidats par recherche et bitset du filtre.
+        """
+        indexes = self.indexes.get(self.selected_procedure)
+        bitmap = self.indexes.filters.bitmap(self.metadata_filter)
+        return indexes, self.k * 2, bitmap
+    
+    def for_procedure(self, procedure: str) -> "HybridRetriever":
+        """
+        Retriever limité à une procédure, partageant avec celui-ci les index,
+        le pool de threads, les latences et le reranker (copie superficielle).
+        """
+        if procedure == self.selected_procedure:
+            return self
+        return self.model_copy(update={"selected_procedure": procedure})
+    
+    @staticmethod
+    def _vector_search(indexes: SearchIndexes, query: str, search_k: int, bitmap):
+        """
+        Recherche vectorielle (sémantique).
+        
+        Returns:
+            Tuple (IDs, latences {"embedding", "faiss"} en millisecondes)
+        """
+        vector_index = indexes.vector_index
+        query_vector, embedding_ms = _timed(vector_index.embeddings.embed_query, query)
+        ids, faiss_ms = _timed(vector_index.search_vector, query_vector, search_k, bitmap)
+        return ids, {"embedding": embedding_ms, "faiss": faiss_ms}
+    
+    @staticmethod
+    def _bm25_search(indexes: SearchIndexes, query: str, search_k: int, bitmap):
+        """
+        Recherche BM25 (mots-clés)
+        (scores vectorisés sur la matrice CSR précalculée, sélection par argpartition).
+        
+        Returns:
+            Tuple (IDs, latences {"bm25"} en millisecondes)
+        """
+        ids, bm25_ms = _timed(indexes.bm25.top_k, tokenize(query), search_k, bitmap)
+        return ids, {"bm25": bm25_ms}
+    
+    def _fuse(self, vector_ids: np.ndarray, bm25_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reciprocal Rank Fusion (RRF) des deux classements, sur les IDs de
+        chunks (communs à FAISS et BM25).
+        
+        Returns:
+            Tuple (IDs, scores RRF) des k meilleurs chunks, ou des
+            reranker.candidates meilleurs avec un reranker
+        """
+        count = self.k if self.reranker is None else max(self.k, self.reranker.candidates)
+        return reciprocal_rank_fusion(
+            [vector_ids, bm25_ids], [self.alpha, 1 - self.alpha], count, self.rrf_offset
+        )
+    
+    def _select(self, query: str, ids: np.ndarray, scores: np.ndarray) -> List[Document]:
+        """
+        Re-classe les candidats si besoin et construit les Documents des k
+        chunks retenus (score de fusion dans metadata["fusion_score"], score
+        du cross-encoder dans metadata["rerank_score"] après un re-classement).
+        """
+        score_of = dict(zip(ids.tolist(), scores.tolist()))
+        relevance = None
+        if self.reranker is not None:
+            ids, relevance = self.reranker.rerank(query, ids, scores, self.k, self.store.text)
+        docs = self.store.documents(ids[:self.k])
+        for rank, (doc, chunk_id) in enumerate(zip(docs, ids[:self.k].tolist())):
+            doc.metadata[SCORE_KEY] = score_of[chunk_id]
+            if relevance is not None and rank < len(relevance):
+                doc.metadata[RERANK_SCORE_KEY] = float(relevance[rank])
+        return docs
+    
+    def _finish(self, query: str, vector_result, bm25_result, start: float) -> List[Document]:
+        """
+        Fusionne les résultats et enregistre les latences.
+        """
+        (vector_ids, vector_timings), (bm25_ids, bm25_timings) = vector_result, bm25_result
+        (ids, scores), fusion_ms = _timed(self._fuse, vector_ids, bm25_ids)
+        final_docs, rerank_ms = _timed(self._select, query, ids, scores)
+        if self.timings is not None:
+            self.timings.record({
+                **vector_timings,
+                **bm25_timings,
+                "fusion": fusion_ms,
+                "rerank": rerank_ms,
+                "total": (time.perf_counter() - start) * 1000,
+            })
+        return final_docs
+    
     def _get_relevant_documents(
         self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None
     ) -> List[Document]:
@@ -392,106 +617,155 @@ class HybridRetriever(BaseRetriever):
         Récupère les documents pertinents en combinant recherche vectorielle et BM25.
         Filtre par procédure si spécifié.
         """
-        # 1. Recherche vectorielle (sémantique) - rechercher plus de documents pour le filtrage
-        search_k = self.k * 4 if self.selected_procedure != "Toutes les procédures" else self.k * 2
-        vector_docs = self.vector_store.similarity_search(query, k=search_k)
-        
-        # 2. Recherche BM25 (mots-clés)
-        tokenized_query = query.lower().split()
-        bm25_scores = self.bm25.get_scores(tokenized_query)
-        
-        # Obtenir les top indices pour BM25
-        bm25_top_indices = sorted(
-            range(len(bm25_scores)), 
-            key=lambda i: bm25_scores[i], 
-            reverse=True
-        )[:search_k]
-        
-        bm25_docs = [self.chunks[i] for i in bm25_top_indices]
-        
-        # 3. Filtrage par procédure si nécessaire
-        if self.selected_procedure != "Toutes les procédures":
-            vector_docs = [
-                doc for doc in vector_docs 
-                if doc.metadata.get('procedure', '') == self.selected_procedure
-            ]
-            bm25_docs = [
-                doc for doc in bm25_docs 
-                if doc.metadata.get('procedure', '') == self.selected_procedure
-            ]
-        
-        # 4. Reciprocal Rank Fusion (RRF)
-        doc_scores = {}
+        start = time.perf_counter()
+        indexes, search_k, bitmap = self._prepare()
+        if indexes is None:
+            return []
         
-        # Scores from vector search
-        for rank, doc in enumerate(vector_docs):
-            doc_id = doc.page_content
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + self.alpha / (rank + 60)
+        args = (indexes, query, search_k, bitmap)
+        if self.executor is None:
+            vector_result = self._vector_search(*args)
+            bm25_result = self._bm25_search(*args)
+        else:
+            # BM25 dans le pool pendant que ce thread encode la requête et interroge FAISS
+            bm25_future = self.executor.submit(self._bm25_search, *args)
+            vector_result = self._vector_search(*args)
+            bm25_result = bm25_future.result()
         
-        # Scores from BM25
-        for rank, doc in enumerate(bm25_docs):
-            doc_id = doc.page_content
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + (1 - self.alpha) / (rank + 60)
+        return self._finish(query, vector_result, bm25_result, start)
+    
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun = None
+    ) -> List[Document]:
+        """
+        Version asynchrone: les deux recherches s'exécutent dans le pool de
+        threads, sans bloquer la boucle d'événements.
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        indexes, search_k, bitmap = await loop.run_in_executor(self.executor, self._prepare)
+        if indexes is None:
+            return []
         
-        # Trier par score et retourner les top k
-        sorted_docs = sorted(doc_scores.items(), key=lambda x: x[1], reverse=True)[:self.k]
+        args = (indexes, query, search_k, bitmap)
+        vector_result, bm25_result = await asyncio.gather(
+            loop.run_in_executor(self.executor, self._vector_search, *args),
+            loop.run_in_executor(self.executor, self._bm25_search, *args),
+        )
+        return await loop.run_in_executor(self.executor, self._finish, query, vector_result, bm25_result, start)
+    
+    def batch_retrieve(
+        self, queries: List[str], procedure: Optional[str] = None, batch_size: int = 64
+    ) -> List[List[Document]]:
+        """
+        Recherche de nombreuses questions (évaluations, pré-génération de FAQ,
+        rejeu de logs): vecteurs des questions en un passage par le cache
+        (embed_query, comme une question isolée), une recherche FAISS
+        multi-requêtes et un produit creux BM25 par lot. Mêmes résultats que
+        _get_relevant_documents question par question.
         
-        # Reconstituer les documents
-        doc_map = {doc.page_content: doc for doc in vector_docs + bm25_docs}
-        final_docs = [doc_map[doc_id] for doc_id, _ in sorted_docs if doc_id in doc_map]
+        Args:
+            queries: Questions
+            procedure: Procédure ciblée (selected_procedure par défaut)
+            batch_size: Nombre de questions traitées ensemble
+            
+        Returns:
+            Documents retenus pour chaque question, dans l'ordre des questions
+        """
+        indexes = self.indexes.get(procedure or self.selected_procedure)
+        if indexes is None:
+            return [[] for _ in queries]
+        search_k = self.k * 2
+        bitmap = self.indexes.filters.bitmap(self.metadata_filter)
         
-        return final_docs
+        results = []
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start:start + batch_size]
+            tokenized = [tokenize(query) for query in batch]
+            if self.executor is None:
+                bm25_ids = indexes.bm25.top_k_batch(tokenized, search_k, bitmap)
+                vector_ids = indexes.vector_index.search_batch(batch, search_k, bitmap)
+            else:
+                bm25_future = self.executor.submit(indexes.bm25.top_k_batch, tokenized, search_k, bitmap)
+                vector_ids = indexes.vector_index.search_batch(batch, search_k, bitmap)
+                bm25_ids = bm25_future.result()
+            results.extend(
+                self._select(query, *self._fuse(v, b)) for query, v, b in zip(batch, vector_ids, bm25_ids)
+            )
+        return results
 
 
 @st.cache_resource(show_spinner=False)
 def load_vector_store():
     """
-    Charge l'index FAISS et crée le retriever hybride (FAISS + BM25).
+    Prépare l'accès aux index FAISS et BM25 (globaux et par procédure) et
+    crée le retriever hybride. Les chunks et les index sont lus en mmap ou
+    chargés à la première recherche qui en a besoin (aucun pickle, aucune
+    tokenisation du corpus au démarrage).
     
     Returns:
-        Tuple (vector_store, hybrid_retriever)
+        Tuple (index partitionnés, hybrid_retriever)
     """
     if not VECTOR_STORE_DIR.exists():
         st.error("INDEX VECTORIEL NON TROUVÉ. Veuillez d'abord exécuter `python ingest.py`")
         st.stop()
     
-    # 1. Charger les embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL,
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
+    if not ChunkStore.exists(CHUNK_STORE_DIR) or not PartitionedIndexes.exists(VECTOR_STORE_DIR):
+        st.error("INDEX VECTORIEL À L'ANCIEN FORMAT. Exécutez `python ingest.py --reindex` pour le convertir")
+        st.stop()
     
-    # 2. Charger le vector store FAISS
-    vector_store = FAISS.load_local(
-        str(VECTOR_STORE_DIR),
-        embeddings,
-        allow_dangerous_deserialization=True
+    # 1. Charger les embeddings (questions déjà posées servies par le cache LRU)
+    embeddings = QueryEmbeddingCache(
+        HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True}
+        ),
+        max_entries=QUERY_CACHE_SIZE
     )
     
-    # 3. Charger les chunks pour BM25
-    chunks_file = VECTOR_STORE_DIR / "chunks.pkl"
-    if chunks_file.exists():
-        with open(chunks_file, 'rb') as f:
-            chunks = pickle.load(f)
-        
-        # 4. Créer l'index BM25
-        tokenized_chunks = [chunk.page_content.lower().split() for chunk in chunks]
-        bm25 = BM25Okapi(tokenized_chunks)
-        
-        # 5. Créer le hybrid retriever
-        hybrid_retriever = HybridRetriever(
-            vector_store=vector_store,
-            bm25=bm25,
-            chunks=chunks,
-            k=TOP_K,
-            alpha=0.6  # 60% vector search, 40% keyword search
+    # 2. Chunk store et index (FAISS + BM25) globaux et par procédure,
+    # chargés à la demande
+    store = ChunkStore(CHUNK_STORE_DIR)
+    indexes = PartitionedIndexes(VECTOR_STORE_DIR, embeddings, store)
+    
+    # 3. Cross-encoder chargé et chauffé dès maintenant: la première question
+    # ne paie pas son chargement, hors du budget de re-classement
+    reranker = None
+    if RERANK:
+        reranker = CrossEncoderReranker(
+            RERANKER_MODEL,
+            candidates=RERANK_CANDIDATES,
+            min_gap=RERANK_MIN_GAP,
+            budget_ms=RERANK_BUDGET_MS
         )
-        
-        return vector_store, hybrid_retriever
-    else:
-        # Fallback: si pas de chunks.pkl, utiliser uniquement FAISS
-        return vector_store, None
+        reranker.load()
+    
+    # 4. Créer le hybrid retriever (pool de threads et latences partagés)
+    hybrid_retriever = HybridRetriever(
+        indexes=indexes,
+        store=store,
+        k=TOP_K,
+        alpha=0.6,  # 60% vector search, 40% keyword search
+        executor=ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval"),
+        timings=RetrievalTimings(),
+        reranker=reranker
+    )
+    
+    return indexes, hybrid_retriever
+
+
+@st.cache_resource(show_spinner=False)
+def load_answer_cache() -> AnswerCache:
+    """
+    Cache sémantique des réponses, partagé par toutes les sessions.
+    """
+    return AnswerCache(
+        ANSWER_CACHE_DIR,
+        threshold=ANSWER_CACHE_THRESHOLD,
+        ttl_seconds=ANSWER_CACHE_TTL,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES
+    )
 
 
 def get_llm():
@@ -535,20 +809,27 @@ def get_llm():
         st.stop()
 
 
-def create_qa_chain(vector_store, hybrid_retriever=None):
+@st.cache_resource(show_spinner=False)
+def load_llm():
+    """
+    Client LLM partagé par toutes les sessions: un seul pool de connexions
+    HTTP, dont les connexions keep-alive servent d'un patient à l'autre.
     """
-    Crée la chaîne RAG avec le prompt système.
-    Utilise le hybrid retriever si disponible, sinon FAISS seul.
+    return get_llm()
+
+
+def create_qa_chain(hybrid_retriever):
+    """
+    Crée la chaîne RAG avec le prompt système (client LLM partagé).
     
     Args:
-        vector_store: Vector store FAISS
-        hybrid_retriever: Retriever hybride (optionnel)
+        hybrid_retriever: Retriever hybride (FAISS + BM25)
         
     Returns:
         Chaîne RetrievalQA
     """
     try:
-        llm = get_llm()
+        llm = load_llm()
         if llm is None:
             raise ValueError("Le LLM n'a pas été initialisé correctement")
         
@@ -557,16 +838,10 @@ def create_qa_chain(vector_store, hybrid_retriever=None):
             input_variables=["context", "question"]
         )
         
-        # Utiliser le hybrid retriever si disponible, sinon FAISS
-        if hybrid_retriever is not None:
-            retriever = hybrid_retriever
-        else:
-            retriever = vector_store.as_retriever(search_kwargs={"k": TOP_K})
-        
         qa_chain = RetrievalQA.from_chain_type(
             llm=llm,
             chain_type="stuff",
-            retriever=retriever,
+            retriever=hybrid_retriever,
             return_source_documents=True,
             chain_type_kwargs={"prompt": prompt}
         )
@@ -582,25 +857,204 @@ def create_qa_chain(vector_store, hybrid_retriever=None):
         raise
 
 
-def get_response(qa_chain, question: str) -> Tuple[str, List]:
+@st.cache_resource(show_spinner=False)
+def load_qa_chain():
+    """
+    Chaîne RAG partagée par toutes les sessions (client LLM, prompt et
+    retriever créés une fois par processus). Le retriever couvre toutes les
+    procédures: chaque session passe sa procédure à AnswerStream.
+    """
+    _, hybrid_retriever = load_vector_store()
+    return create_qa_chain(hybrid_retriever)
+
+
+def answer_cache_key(retriever: HybridRetriever) -> Tuple[str, str]:
+    """
+    Portée (procédure + filtre de métadonnées) et version (index + modèle)
+    d'une réponse dans le cache sémantique.
+    """
+    scope = retriever.selected_procedure
+    if retriever.metadata_filter:
+        scope += "|" + json.dumps(retriever.metadata_filter, sort_keys=True, ensure_ascii=False)
+    version = (f"{retriever.indexes.version}|{LLM_PROVIDER}/{MODEL_NAME}"
+               f"|{CONTEXT_MAX_TOKENS}/{CONTEXT_MIN_SCORE}"
+               f"|{COMPRESSION_MAX_SENTENCES if COMPRESS_CONTEXT else 0}")
+    return scope, version
+
+
+class AnswerTimings(RetrievalTimings):
+    """
+    Latences des réponses générées par le LLM: recherche, compression du
+    contexte (durée de l'étape seule), premier token (ce que le patient
+    attend avant de voir la réponse s'écrire) et réponse complète, mesurées
+    depuis l'envoi de la question.
+    """
+    
+    STEPS = ("retrieval", "compression", "first_token", "total")
+
+
+@st.cache_resource(show_spinner=False)
+def load_token_counter() -> TokenCounter:
+    """
+    Compteur de tokens du contexte (encodage chargé une fois pour toutes les sessions).
+    """
+    return TokenCounter(TOKEN_ENCODING)
+
+
+@st.cache_resource(show_spinner=False)
+def load_context_compressor() -> Optional[ContextCompressor]:
+    """
+    Compression extractive du contexte (None si COMPRESS_CONTEXT est
+    désactivé). Les phrases sont encodées par le modèle des questions, avec
+    leur propre cache LRU.
+    """
+    if not COMPRESS_CONTEXT:
+        return None
+    indexes, _ = load_vector_store()
+    return ContextCompressor(
+        QueryEmbeddingCache(indexes.embeddings.base, max_entries=SENTENCE_CACHE_SIZE),
+        load_token_counter(),
+        max_sentences=COMPRESSION_MAX_SENTENCES
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_answer_timings() -> AnswerTimings:
+    """
+    Latences des réponses, partagées par toutes les sessions.
+    """
+    return AnswerTimings()
+
+
+class AnswerStream:
+    """
+    Réponse du système RAG produite au fil de l'eau: itérer sur l'objet
+    renvoie les fragments de texte dès que le LLM les émet. Même prompt que
+    la chaîne RetrievalQA; le contexte est construit par pack_context
+    (chunks faibles écartés, chevauchements fusionnés, budget de tokens),
+    puis réduit aux phrases les plus proches de la question si un
+    compressor est fourni; sources contient les passages effectivement
+    envoyés.
+    
+    procedure restreint la recherche à la procédure choisie par le patient
+    (celle du retriever de la chaîne si None).
+    
+    Une question proche d'une question déjà traitée pour la même procédure
+    reçoit directement la réponse du cache sémantique (sans recherche ni LLM),
+    en un seul fragment.
+    
+    Après la fin du flux: answer, sources, cached, context_tokens (et
+    original_tokens, avant compression) et latences en millisecondes
+    (first_token_ms, total_ms).
     """
-    Obtient une réponse du système RAG.
+    
+    def __init__(self, qa_chain, question: str, answer_cache: AnswerCache = None,
+                 timings: AnswerTimings = None, compressor: ContextCompressor = None,
+                 procedure: Optional[str] = None):
+        if qa_chain is None:
+            raise ValueError("La chaîne RAG n'est pas initialisée")
+        self.qa_chain = qa_chain
+        self.question = question
+        self.answer_cache = answer_cache
+        self.timings = timings
+        self.compressor = compressor
+        self.procedure = procedure
+        self.answer = ""
+        self.sources: List[Document] = []
+        self.cached = False
+        self.context_tokens = 0
+        self.original_tokens = 0
+        self.first_token_ms: Optional[float] = None
+        self.total_ms: Optional[float] = None
+    
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        use_cache = self.answer_cache is not None and self.answer_cache.enabled
+        retriever = self.qa_chain.retriever
+        if self.procedure is not None:
+            retriever = retriever.for_procedure(self.procedure)
+        vector = None
+        if use_cache:
+            scope, version = answer_cache_key(retriever)
+            # Vecteur de la question (réutilisé ensuite par la recherche via le cache LRU)
+            vector = retriever.indexes.embeddings.embed_query(self.question)
+            cached = self.answer_cache.get(scope, version, vector)
+            if cached is not None:
+                self.answer, self.sources = cached
+                self.cached = True
+                self.first_token_ms = self.total_ms = (time.perf_counter() - start) * 1000
+                yield self.answer
+                return
+        
+        try:
+            docs = retriever.invoke(self.question)
+            retrieval_ms = (time.perf_counter() - start) * 1000
+            
+            stuff_chain = self.qa_chain.combine_documents_chain
+            counter = load_token_counter()
+            context, self.sources = pack_context(
+                docs, CONTEXT_MAX_TOKENS, counter, CONTEXT_MIN_SCORE, stuff_chain.document_separator
+            )
+            self.context_tokens = self.original_tokens = counter.count(context)
+            compression_ms = 0.0
+            if self.compressor is not None and self.sources:
+                compression_start = time.perf_counter()
+                if vector is None:
+                    # Vecteur déjà calculé pour la recherche FAISS (cache LRU des questions)
+                    vector = retriever.indexes.embeddings.embed_query(self.question)
+                self.sources = self.compressor.compress(vector, self.sources)
+                context = stuff_chain.document_separator.join(doc.page_content for doc in self.sources)
+                self.context_tokens = counter.count(context)
+                compression_ms = (time.perf_counter() - compression_start) * 1000
+            prompt = stuff_chain.llm_chain.prompt.format_prompt(
+                **{stuff_chain.document_variable_name: context, "question": self.question}
+            )
+            parts = []
+            for chunk in stuff_chain.llm_chain.llm.stream(prompt):
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if not text:
+                    continue
+                if self.first_token_ms is None:
+                    self.first_token_ms = (time.perf_counter() - start) * 1000
+                parts.append(text)
+                yield text
+        except Exception as e:
+            raise Exception(f"Erreur lors de l'invocation de la chaîne RAG: {str(e)}")
+        
+        self.answer = "".join(parts)
+        self.total_ms = (time.perf_counter() - start) * 1000
+        if self.first_token_ms is None:
+            self.first_token_ms = self.total_ms
+        if self.timings is not None:
+            self.timings.record({
+                "retrieval": retrieval_ms,
+                "compression": compression_ms,
+                "first_token": self.first_token_ms,
+                "total": self.total_ms,
+            })
+        if use_cache:
+            self.answer_cache.put(scope, version, self.question, vector, self.answer, self.sources)
+
+
+def get_response(qa_chain, question: str, answer_cache: AnswerCache = None,
+                 procedure: Optional[str] = None) -> Tuple[str, List]:
+    """
+    Obtient une réponse complète du système RAG (voir AnswerStream pour
+    l'affichage au fil de l'eau).
     
     Args:
         qa_chain: Chaîne RAG
         question: Question de l'utilisateur
+        answer_cache: Cache sémantique des réponses (None = désactivé)
+        procedure: Procédure ciblée (celle du retriever de la chaîne si None)
         
     Returns:
         Tuple (réponse, documents sources)
     """
-    if qa_chain is None:
-        raise ValueError("La chaîne RAG n'est pas initialisée")
-    
-    try:
-        result = qa_chain.invoke({"query": question})
-        return result["result"], result.get("source_documents", [])
-    except Exception as e:
-        raise Exception(f"Erreur lors de l'invocation de la chaîne RAG: {str(e)}")
+    stream = AnswerStream(qa_chain, question, answer_cache, procedure=procedure)
+    for _ in stream:
+        pass
+    return stream.answer, stream.sources
 
 
 # ============================================
@@ -867,28 +1321,10 @@ def show_consent_screen():
         </style>
         """, unsafe_allow_html=True)
         
-        # Charger les ressources
-        if st.session_state.vector_store is None:
-            st.session_state.vector_store, base_hybrid_retriever = load_vector_store()
-            
-            # Créer un retriever avec la procédure sélectionnée
-            if base_hybrid_retriever is not None:
-                # Créer un nouveau retriever avec le filtre de procédure
-                st.session_state.hybrid_retriever = HybridRetriever(
-                    vector_store=st.session_state.vector_store,
-                    bm25=base_hybrid_retriever.bm25,
-                    chunks=base_hybrid_retriever.chunks,
-                    k=TOP_K,
-                    alpha=0.6,
-                    selected_procedure=st.session_state.selected_procedure
-                )
-            else:
-                st.session_state.hybrid_retriever = None
-            
-            st.session_state.qa_chain = create_qa_chain(
-                st.session_state.vector_store,
-                st.session_state.hybrid_retriever
-            )
+        # Charger les ressources partagées (index, client LLM, chaîne RAG):
+        # créées par la première session du processus, immédiates ensuite.
+        # La session ne garde que sa procédure (selected_procedure)
+        load_qa_chain()
         
         # Marquer comme terminé et passer à l'interface de chat
         st.session_state.consent_given = True
@@ -897,6 +1333,17 @@ def show_consent_screen():
         st.rerun()
 
 
+def switch_procedure():
+    """
+    Change la procédure ciblée depuis le chat: simple changement du filtre
+    passé au retriever partagé (ni rechargement, ni écran de chargement).
+    L'historique est conservé si le patient l'a demandé.
+    """
+    st.session_state.selected_procedure = st.session_state.procedure_switcher
+    if not st.session_state.get("keep_history", True):
+        st.session_state.messages = []
+
+
 def show_chat_interface():
     """
     Affiche l'interface de chat principale avec un design amélioré.
@@ -987,77 +1434,91 @@ Pour toute question concernant votre situation personnelle, veuillez consulter v
             with st.chat_message("user"):
                 st.markdown(question)
             
-            # Génération de la réponse
+            # Génération de la réponse (affichée au fil de l'eau)
             with st.chat_message("assistant"):
-                with st.spinner("Recherche dans les documents médicaux..."):
-                    try:
-                        response, source_docs = get_response(st.session_state.qa_chain, question)
-                        
-                        # Affichage de la réponse
-                        st.markdown(response)
+                try:
+                    stream = AnswerStream(
+                        load_qa_chain(), question, load_answer_cache(), load_answer_timings(),
+                        load_context_compressor(), procedure=st.session_state.selected_procedure
+                    )
+                    fragments = iter(stream)
+                    # Le spinner couvre la recherche et l'attente du premier token,
+                    # puis la réponse s'écrit au fil de l'eau
+                    with st.spinner("Recherche dans les documents médicaux..."):
+                        first_fragment = next(fragments, "")
+                    st.write_stream(chain([first_fragment], fragments))
+                    response, source_docs = stream.answer, stream.sources
+                    if SHOW_STATS:
+                        st.caption(f"⏱️ Premier token : {stream.first_token_ms:.0f} ms · "
+                                   f"Réponse complète : {stream.total_ms:.0f} ms · "
+                                   f"Contexte : {stream.context_tokens} tokens"
+                                   + (f" ({stream.context_tokens / stream.original_tokens:.0%} "
+                                      f"de {stream.original_tokens} après compression)"
+                                      if stream.context_tokens < stream.original_tokens else "")
+                                   + f"{' (cache)' if stream.cached else ''}")
+                    
+                    # Extraction des sources
+                    sources = []
+                    for doc in source_docs:
+                        # Déterminer le type de source
+                        source_type = doc.metadata.get("source_type", "pdf")
                         
-                        # Extraction des sources
-                        sources = []
-                        for doc in source_docs:
-                            # Déterminer le type de source
-                            source_type = doc.metadata.get("source_type", "pdf")
-                            
-                            if source_type == "web":
-                                # Source web : afficher l'URL et le nom de la procédure
-                                source_name = f"Site web - {doc.metadata.get('procedure', 'laradiologiequisoigne.fr')}"
-                                source_url = doc.metadata.get("source_url", "")
-                            else:
-                                # Source PDF : afficher le nom du fichier
-                                source_name = f"Document - {doc.metadata.get('source_file', 'Document PDF')}"
-                                source_url = None
-                            
-                            sources.append({
-                                "name": source_name,
-                                "url": source_url,
-                                "content": doc.page_content,
-                                "type": source_type
-                            })
+                        if source_type == "web":
+                            # Source web : afficher l'URL et le nom de la procédure
+                            source_name = f"Site web - {doc.metadata.get('procedure', 'laradiologiequisoigne.fr')}"
+                            source_url = doc.metadata.get("source_url", "")
+                        else:
+                            # Source PDF : afficher le nom du fichier
+                            source_name = f"Document - {doc.metadata.get('source_file', 'Document PDF')}"
+                            source_url = None
                         
-                        # Affichage des sources
-                        if sources:
-                            with st.expander("Sources documentaires utilisées"):
-                                for i, source in enumerate(sources, 1):
-                                    source_display = source['name']
-                                    if source['url']:
-                                        source_display += f" ({source['url']})"
-                                    
-                                    # Affichage de la source avec expandeur pour le texte complet
+                        sources.append({
+                            "name": source_name,
+                            "url": source_url,
+                            "content": doc.page_content,
+                            "type": source_type
+                        })
+                    
+                    # Affichage des sources
+                    if sources:
+                        with st.expander("Sources documentaires utilisées"):
+                            for i, source in enumerate(sources, 1):
+                                source_display = source['name']
+                                if source['url']:
+                                    source_display += f" ({source['url']})"
+                                
+                                # Affichage de la source avec expandeur pour le texte complet
+                                st.markdown(f"""
+                                <div class="source-container">
+                                    <div class="source-title">Source {i}: {source_display}</div>
+                                </div>
+                                """, unsafe_allow_html=True)
+                                
+                                # Expandeur pour voir le contenu complet de chaque source
+                                with st.expander(f"📄 Voir le contenu complet de la source {i}", expanded=False):
                                     st.markdown(f"""
-                                    <div class="source-container">
-                                        <div class="source-title">Source {i}: {source_display}</div>
+                                    <div style="background: #f8f9fa; padding: 1rem; border-radius: 8px; 
+                                                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+                                                line-height: 1.6; color: #2c3e50;">
+                                        {source['content']}
                                     </div>
                                     """, unsafe_allow_html=True)
-                                    
-                                    # Expandeur pour voir le contenu complet de chaque source
-                                    with st.expander(f"📄 Voir le contenu complet de la source {i}", expanded=False):
-                                        st.markdown(f"""
-                                        <div style="background: #f8f9fa; padding: 1rem; border-radius: 8px; 
-                                                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                                                    line-height: 1.6; color: #2c3e50;">
-                                            {source['content']}
-                                        </div>
-                                        """, unsafe_allow_html=True)
-                        
-                        # Sauvegarde dans l'historique
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": response,
-                            "sources": sources
-                        })
                     
-                    except Exception as e:
-                        error_msg = f"ERREUR : Impossible de générer une réponse. {str(e)}"
-                        st.error(error_msg)
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": error_msg
-                        })
-    
+                    # Sauvegarde dans l'historique
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": response,
+                        "sources": sources
+                    })
+                
+                except Exception as e:
+                    error_msg = f"ERREUR : Impossible de générer une réponse. {str(e)}"
+                    st.error(error_msg)
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": error_msg
+                    })
+
     # Sidebar
     with st.sidebar:
         st.markdown('<h3 style="color: var(--primary-color);">⚙ Actions</h3>', unsafe_allow_html=True)
@@ -1096,19 +1557,42 @@ Pour toute question concernant votre situation personnelle, veuillez consulter v
             </div>
             """, unsafe_allow_html=True)
         
-        # Bouton pour changer de procédure
-        if st.button("🔄 Changer de procédure", use_container_width=True):
-            # Réinitialiser pour revenir à l'écran de sélection
-            st.session_state.consent_given = False
-            st.session_state.loading_complete = False
-            st.session_state.messages = []
-            st.session_state.qa_chain = None
-            st.session_state.vector_store = None
-            st.session_state.hybrid_retriever = None
-            st.rerun()
+        # Changement de procédure sans quitter le chat (appliqué à la prochaine question)
+        st.selectbox(
+            "🔄 Changer de procédure :",
+            options=AVAILABLE_PROCEDURES,
+            index=AVAILABLE_PROCEDURES.index(current_procedure),
+            key="procedure_switcher",
+            on_change=switch_procedure
+        )
+        st.checkbox(
+            "Conserver la conversation",
+            value=True,
+            key="keep_history",
+            help="Décochez pour repartir d'une conversation vide en changeant de procédure"
+        )
         
         st.divider()
         
+        if SHOW_STATS:
+            indexes, hybrid_retriever = load_vector_store()
+            with st.expander("📊 Statistiques"):
+                st.caption("Embeddings des questions")
+                st.json(indexes.embeddings.stats())
+                st.caption("Réponses (cache sémantique)")
+                st.json(load_answer_cache().stats())
+                st.caption("Latences des réponses (premier token / réponse complète)")
+                st.json(load_answer_timings().stats())
+                if hybrid_retriever.timings:
+                    st.caption("Latences de recherche (vectorielle / BM25 en parallèle)")
+                    st.json(hybrid_retriever.timings.stats())
+                if hybrid_retriever.reranker:
+                    st.caption("Re-classement (cross-encoder)")
+                    st.json(hybrid_retriever.reranker.stats())
+                if load_context_compressor() is not None:
+                    st.caption("Compression du contexte (phrases / tokens gardés)")
+                    st.json(load_context_compressor().stats())
+        
         st.markdown('<h3 style="color: var(--primary-color);">ⓘ Rappels importants</h3>', unsafe_allow_html=True)
         st.markdown("""
         <div class="info-card">
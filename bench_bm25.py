@@ -0,0 +1,144 @@
+"""
+Micro-benchmark du scoring BM25 du HybridRetriever.
+
+Compare, par requête, l'ancien chemin (BM25Okapi.get_scores puis tri Python
+de tous les chunks) au scorer vectorisé de bm25_index (somme des lignes CSR
+précalculées puis sélection par argpartition), sur le corpus actuel et sur
+des corpus 10x et 100x plus grands (chunks répliqués). Vérifie aussi que
+les deux classements sont identiques.
+
+Usage:
+    python bench_bm25.py
+    python bench_bm25.py --scales 1 10 100 --k 16
+"""
+
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from rank_bm25 import BM25Okapi
+    from chunk_store import ChunkStore
+    from bm25_index import BM25Index, build_bm25_index, tokenize
+except ImportError:
+    print("❌ Erreur: Impossible d'importer rank_bm25 / chunk_store / bm25_index")
+    sys.exit(1)
+
+CHUNK_STORE_DIR = Path("vector_store/chunks")
+
+QUESTIONS = [
+    "Qu'est-ce que l'embolisation de la prostate ?",
+    "Quels sont les effets secondaires courants ?",
+    "Combien de temps dure l'hospitalisation ?",
+    "Comment se déroule la procédure ?",
+    "Quels examens sont nécessaires avant l'intervention ?",
+    "Est-ce que la biopsie sous scanner est douloureuse ?",
+    "Comment entretenir une chambre implantable ?",
+    "Faut-il être à jeun avant l'examen ?",
+]
+
+
+def _timed(function, queries):
+    """
+    Exécute function sur chaque requête.
+
+    Returns:
+        Tuple (résultats, latences en millisecondes)
+    """
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(function(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+def run_benchmark(scales, k: int, query_count: int, seed: int):
+    """
+    Exécute le benchmark et affiche un tableau récapitulatif.
+    """
+    store = ChunkStore(CHUNK_STORE_DIR)
+    texts = [store.text(i) for i in range(len(store))]
+
+    random.seed(seed)
+    vocabulary = sorted({token for text in texts for token in tokenize(text)})
+    queries = [tokenize(q) for q in QUESTIONS]
+    queries += [random.sample(vocabulary, random.randint(2, 6)) for _ in range(max(0, query_count - len(queries)))]
+
+    print("=" * 80)
+    print("📏 MICRO-BENCHMARK BM25: BM25Okapi + tri vs CSR + argpartition")
+    print("=" * 80)
+    print(f"   Corpus de base: {len(texts)} chunks, {len(queries)} requêtes, top-{k}")
+
+    rows = []
+    for scale in scales:
+        corpus = texts * scale
+
+        bm25 = BM25Okapi([tokenize(text) for text in corpus])
+
+        def previous(query):
+            scores = bm25.get_scores(query)
+            return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            build_bm25_index(corpus, Path(tmp) / "bm25")
+            build_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            index = BM25Index(Path(tmp) / "bm25")
+            load_ms = (time.perf_counter() - start) * 1000
+
+            index.top_k(queries[0], k)  # échauffement
+            expected, previous_latencies = _timed(previous, queries)
+            found, latencies = _timed(lambda query: index.top_k(query, k), queries)
+            identical = all(list(f) == e for f, e in zip(found, expected))
+            del index
+
+        rows.append((
+            len(corpus),
+            np.percentile(previous_latencies, 50),
+            np.percentile(latencies, 50),
+            np.percentile(latencies, 99),
+            np.percentile(previous_latencies, 50) / np.percentile(latencies, 50),
+            build_seconds,
+            load_ms,
+            identical,
+        ))
+
+    print()
+    print(f"{'Chunks':>8} {'Avant p50 (ms)':>15} {'CSR p50 (ms)':>13} {'CSR p99 (ms)':>13} "
+          f"{'Gain':>7} {'Build (s)':>10} {'Chargement (ms)':>16} {'Classement':>11}")
+    print("-" * 100)
+    for chunks, before, p50, p99, gain, build, load, identical in rows:
+        print(f"{chunks:>8} {before:>15.3f} {p50:>13.3f} {p99:>13.3f} {gain:>6.0f}x "
+              f"{build:>10.2f} {load:>16.2f} {'identique' if identical else 'DIFFÉRENT':>11}")
+    print()
+    return rows
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    parser = argparse.ArgumentParser(description="Micro-benchmark du scoring BM25")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10, 100],
+                        help="Facteurs de réplication du corpus")
+    parser.add_argument("--k", type=int, default=8, help="Nombre de chunks retenus (search_k)")
+    parser.add_argument("--queries", type=int, default=50, help="Nombre de requêtes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.scales, args.k, args.queries, args.seed)
+    sys.exit(0 if all(row[-1] for row in rows) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Benchmark des types d'index vectoriel (Flat, HNSW, IVF-Flat, IVF-PQ) et
+des précisions de stockage des vecteurs (float32, float16, int8).
+
+Pour chaque combinaison construite sur les vecteurs du vector store,
+mesure le recall@k par rapport à la recherche exacte (Flat float32), la
+latence d'une requête (p50 / p99), le temps de construction et la mémoire
+occupée par l'index. Les index approximatifs en distance sont aussi
+mesurés avec re-classement exact des k * RESCORE_FACTOR meilleurs
+candidats. L'option --scale simule un corpus plus grand pour anticiper le
+moment où l'ANN devient intéressant.
+
+Usage:
+    python bench_index.py
+    python bench_index.py --scale 20 --k 8
+    python bench_index.py --specs Flat HNSW --precisions float32 int8
+    python bench_index.py --questions   # requêtes réelles encodées par le modèle
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from ingest import (
+        INDEX_SPECS, VECTOR_PRECISIONS, RESCORE_FACTOR, EMBEDDING_MODEL,
+        build_search_index, load_vectors
+    )
+    from vector_index import VectorIndex
+except ImportError:
+    print("❌ Erreur: Impossible d'importer ingest.py")
+    print("   Assurez-vous que ingest.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# Questions de patients utilisées avec --questions
+EXAMPLE_QUESTIONS = [
+    "Qu'est-ce que l'embolisation de la prostate ?",
+    "Quels sont les effets secondaires courants ?",
+    "Combien de temps dure l'hospitalisation ?",
+    "Comment se déroule la procédure ?",
+    "Quels examens sont nécessaires avant l'intervention ?",
+    "Est-ce que la biopsie sous scanner est douloureuse ?",
+    "Comment entretenir une chambre implantable ?",
+    "L'embolisation utérine permet-elle une grossesse ensuite ?",
+    "Faut-il être à jeun avant l'examen ?",
+    "Quand pourrai-je reprendre le travail ?",
+]
+
+
+# ============================================
+# CORPUS ET REQUÊTES
+# ============================================
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def scale_corpus(vectors: np.ndarray, scale: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Agrandit le corpus en ajoutant des variantes bruitées des vecteurs réels
+    (même distribution, pour estimer le comportement avec plus de documents).
+    """
+    if scale <= 1:
+        return vectors
+    copies = [vectors]
+    for _ in range(scale - 1):
+        noise = rng.normal(scale=0.02, size=vectors.shape).astype(np.float32)
+        copies.append(_normalize(vectors + noise).astype(np.float32))
+    return np.concatenate(copies)
+
+
+def synthetic_queries(vectors: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Requêtes synthétiques: combinaison de deux chunks du corpus plus un bruit,
+    pour ne pas retomber exactement sur un vecteur indexé.
+    """
+    first = vectors[rng.integers(0, len(vectors), count)]
+    second = vectors[rng.integers(0, len(vectors), count)]
+    noise = rng.normal(scale=0.01, size=first.shape).astype(np.float32)
+    return _normalize(first + 0.5 * second + noise).astype(np.float32)
+
+
+def question_queries() -> np.ndarray:
+    """
+    Encode EXAMPLE_QUESTIONS avec le modèle d'embeddings de l'application.
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    return np.asarray([embeddings.embed_query(q) for q in EXAMPLE_QUESTIONS], dtype=np.float32)
+
+
+# ============================================
+# MESURES
+# ============================================
+
+def measure(vector_index: VectorIndex, queries: np.ndarray, k: int):
+    """
+    Recherche requête par requête (comme dans l'application).
+
+    Returns:
+        Tuple (IDs trouvés, latences en millisecondes)
+    """
+    found = np.full((len(queries), k), -1, dtype=np.int64)
+    latencies = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        ids = vector_index.search_vector(query, k)
+        latencies[i] = (time.perf_counter() - start) * 1000
+        found[i, :len(ids)] = ids
+    return found, latencies
+
+
+def recall_at_k(found: np.ndarray, exact: np.ndarray) -> float:
+    """
+    Part moyenne des k plus proches voisins exacts retrouvés.
+    """
+    hits = [len(set(f[f >= 0]) & set(e)) / len(e) for f, e in zip(found, exact)]
+    return float(np.mean(hits))
+
+
+def run_benchmark(specs, precisions, k: int, query_count: int, scale: int, questions: bool,
+                  rescore_factor: int, seed: int):
+    """
+    Exécute le benchmark et affiche un tableau récapitulatif.
+    """
+    rng = np.random.default_rng(seed)
+    vectors = scale_corpus(load_vectors(), scale, rng)
+    queries = question_queries() if questions else synthetic_queries(vectors, query_count, rng)
+    k = min(k, len(vectors))
+
+    print("=" * 80)
+    print("📏 BENCHMARK DES INDEX VECTORIELS")
+    print("=" * 80)
+    print(f"   Vecteurs: {len(vectors)} x {vectors.shape[1]} (échelle x{scale})")
+    print(f"   Requêtes: {len(queries)} ({'questions encodées' if questions else 'synthétiques'}), k={k}")
+    print(f"   Threads FAISS: {faiss.omp_get_max_threads()}")
+
+    # Vérité terrain: recherche exacte
+    exact_index, _ = build_search_index(vectors, "Flat")
+    _, exact = exact_index.search(queries, k)
+    flat_size = len(faiss.serialize_index(exact_index))
+
+    rows = []
+    for spec in specs:
+        # IVF-PQ compresse déjà les vecteurs: une seule précision
+        for precision in (precisions if spec != "IVF-PQ" else ["float32"]):
+            index, info = build_search_index(vectors, spec, precision, rescore_factor)
+            size = len(faiss.serialize_index(index))
+            variants = [("-", VectorIndex(index))]
+            if info["rescore_factor"] > 1:
+                rescored = VectorIndex(index, vectors=vectors, rescore_factor=info["rescore_factor"])
+                variants.append((f"x{info['rescore_factor']}", rescored))
+
+            for rescore, vector_index in variants:
+                measure(vector_index, queries[:10], k)  # échauffement
+                found, latencies = measure(vector_index, queries, k)
+                rows.append((
+                    spec,
+                    info["precision"],
+                    info["factory"],
+                    rescore,
+                    recall_at_k(found, exact),
+                    np.percentile(latencies, 50),
+                    np.percentile(latencies, 99),
+                    info["build_seconds"],
+                    size / (1024 * 1024),
+                    size / flat_size,
+                ))
+
+    print()
+    print(f"{'Index':<9} {'Précision':<9} {'Factory':<17} {'Rescore':>7} {'Recall@' + str(k):>9} "
+          f"{'p50 (ms)':>9} {'p99 (ms)':>9} {'Build (s)':>9} {'Mémoire (MB)':>12} {'vs Flat':>8}")
+    print("-" * 108)
+    for spec, precision, factory, rescore, recall, p50, p99, build, size, ratio in rows:
+        print(f"{spec:<9} {precision:<9} {factory:<17} {rescore:>7} {recall:>9.3f} "
+              f"{p50:>9.3f} {p99:>9.3f} {build:>9.2f} {size:>12.2f} {ratio:>7.0%}")
+    print()
+    print("   Mémoire: taille de l'index chargé par l'application. Le re-classement lit")
+    print("   vectors.npy en mmap: seules les lignes des candidats sont chargées.")
+    print()
+    return rows
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark recall / latence des types d'index vectoriel")
+    parser.add_argument("--specs", nargs="+", choices=INDEX_SPECS, default=list(INDEX_SPECS),
+                        help="Types d'index à comparer")
+    parser.add_argument("--precisions", nargs="+", choices=VECTOR_PRECISIONS, default=list(VECTOR_PRECISIONS),
+                        help="Précisions de stockage des vecteurs à comparer")
+    parser.add_argument("--rescore", type=int, default=RESCORE_FACTOR,
+                        help="Re-classement exact des k * N meilleurs candidats (0 = désactivé)")
+    parser.add_argument("--k", type=int, default=8, help="Nombre de voisins recherchés")
+    parser.add_argument("--queries", type=int, default=500, help="Nombre de requêtes synthétiques")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="Multiplie la taille du corpus (variantes bruitées des vecteurs)")
+    parser.add_argument("--questions", action="store_true",
+                        help="Utiliser des questions réelles encodées par le modèle")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="Threads FAISS (1 = comme une requête isolée de l'application)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    run_benchmark(args.specs, args.precisions, args.k, args.queries, args.scale, args.questions,
+                  args.rescore, args.seed)
+
+
+if __name__ == "__main__":
+    main()
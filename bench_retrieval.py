@@ -0,0 +1,542 @@
+"""
+Benchmark de la recherche hybride (HybridRetriever) sur des questions
+annotées, et balayage de ses paramètres.
+
+Pour chaque combinaison de TOP_K_RETRIEVAL, alpha (poids vectoriel / BM25),
+constante RRF et découpage (CHUNK_SIZE / CHUNK_OVERLAP), mesure la qualité
+(recall@k, MRR, part des questions avec au moins un passage pertinent), la
+latence de chaque étape (encodage de la question, FAISS, BM25, fusion, total;
+p50 / p95 / p99) et le temps de construction des index. Tout tourne hors
+ligne sur vector_store/ et le modèle d'embeddings déjà téléchargé; les
+autres découpages sont construits dans un dossier temporaire à partir des
+PDFs locaux et du cache des pages web (vector_store/ n'est jamais modifié).
+
+Questions annotées (data/eval/retrieval_queries.json): chaque passage
+pertinent est décrit par sa source et une expression qu'il contient, pour
+rester valable quel que soit le découpage:
+    {"question": "...", "procedure": "Embolisation utérine",
+     "relevant": [{"source": "fiche_e_fibrome.pdf", "contains": "à jeun"}]}
+
+Usage:
+    python bench_retrieval.py
+    python bench_retrieval.py --top-k 3 4 6 --alpha 0.4 0.6 0.8 --rrf 30 60 100
+    python bench_retrieval.py --chunk-sizes 300 800 --chunk-overlaps 50 100
+    python bench_retrieval.py --rerank   # avec le cross-encoder (RERANK_* de .env)
+    python bench_retrieval.py --compare bench_results/retrieval-20260101-120000.json
+"""
+
+import os
+
+# Hors ligne par défaut: le modèle doit déjà être dans le cache Hugging Face
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    import ingest
+    from app import (
+        HybridRetriever, RetrievalTimings, RRF_OFFSET, TOP_K,
+        RERANKER_MODEL, RERANK_CANDIDATES, RERANK_MIN_GAP, RERANK_BUDGET_MS
+    )
+    from bm25_index import build_bm25_index
+    from chunk_store import ChunkStore, ChunkStoreWriter
+    from embedding_cache import QueryEmbeddingCache
+    from metadata_filters import build_filter_bitmaps
+    from partitions import PartitionedIndexes
+    from reranker import CrossEncoderReranker
+    from langchain_core.documents import Document
+except ImportError as e:
+    print(f"❌ Erreur: Impossible d'importer les modules de l'application ({e})")
+    print("   Lancez le benchmark depuis le dossier du projet.")
+    sys.exit(1)
+
+
+QUERIES_FILE = Path("data/eval/retrieval_queries.json")
+RESULTS_DIR = Path("bench_results")
+DEFAULT_ALPHA = 0.6
+PERCENTILES = (50, 95, 99)
+
+
+# ============================================
+# QUESTIONS ANNOTÉES
+# ============================================
+
+def load_queries(path: Path) -> List[Dict]:
+    """
+    Charge les questions annotées et vérifie leur format.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    queries = data["queries"] if isinstance(data, dict) else data
+    for query in queries:
+        if not query.get("question") or not query.get("procedure") or not query.get("relevant"):
+            raise ValueError(f"Question annotée incomplète: {query}")
+    return queries
+
+
+def is_relevant(doc: Document, label: Dict) -> bool:
+    """
+    Le chunk correspond-il au passage annoté (même source, contient l'expression) ?
+    """
+    metadata = doc.metadata
+    source = label.get("source")
+    if source and source not in (metadata.get("source_file"), metadata.get("source_url"), metadata.get("source")):
+        return False
+    return label.get("contains", "").lower() in doc.page_content.lower()
+
+
+def check_labels(queries: List[Dict], store: ChunkStore) -> List[str]:
+    """
+    Passages annotés introuvables dans le chunk store (annotation à corriger).
+    """
+    documents = store.documents(range(len(store)))
+    missing = []
+    for query in queries:
+        candidates = [doc for doc in documents if doc.metadata.get("procedure") == query["procedure"]]
+        for label in query["relevant"]:
+            if not any(is_relevant(doc, label) for doc in candidates):
+                missing.append(f"{query['question']} -> {label}")
+    return missing
+
+
+def score(queries: List[Dict], results: List[List[Document]]) -> Dict:
+    """
+    recall@k (part des passages pertinents retrouvés), MRR (rang du premier
+    chunk pertinent) et hit rate (au moins un chunk pertinent), globalement
+    et par procédure.
+    """
+    rows = []
+    for query, docs in zip(queries, results):
+        labels = query["relevant"]
+        found = sum(any(is_relevant(doc, label) for doc in docs) for label in labels)
+        ranks = [rank for rank, doc in enumerate(docs, 1) if any(is_relevant(doc, label) for label in labels)]
+        rows.append((query["procedure"], found / len(labels), 1 / ranks[0] if ranks else 0.0, bool(ranks)))
+
+    def summary(selected):
+        return {
+            "queries": len(selected),
+            "recall": round(float(np.mean([r[1] for r in selected])), 4),
+            "mrr": round(float(np.mean([r[2] for r in selected])), 4),
+            "hit_rate": round(float(np.mean([r[3] for r in selected])), 4),
+        }
+
+    procedures = dict.fromkeys(r[0] for r in rows)
+    return {
+        **summary(rows),
+        "per_procedure": {p: summary([r for r in rows if r[0] == p]) for p in procedures},
+    }
+
+
+# ============================================
+# DÉCOUPAGES ALTERNATIFS
+# ============================================
+
+def _stitch_chunks(store: ChunkStore, ids: List[int]) -> str:
+    """
+    Texte d'une page recousu à partir de ses chunks et de leur start_index.
+    Les espaces supprimés entre deux chunks sans chevauchement sont
+    remplacés par des sauts de ligne (approximation).
+    """
+    text = ""
+    for i in sorted(ids, key=lambda i: store.metadata(i).get("start_index", -1)):
+        chunk = store.text(i)
+        start = store.metadata(i).get("start_index", -1)
+        if start < 0:
+            start = len(text) + 1 if text else 0
+        if start > len(text):
+            text += "\n" * (start - len(text))
+        if start + len(chunk) > len(text):
+            text = text[:start] + chunk
+    return text
+
+
+def load_source_documents(store: ChunkStore) -> Tuple[List[Document], Dict[str, int]]:
+    """
+    Documents d'origine des chunks indexés, sans accès réseau: PDFs relus
+    dans PDF_DIR, pages web depuis le cache HTTP local (WEB_CACHE_DIR), à
+    défaut texte recousu à partir des chunks.
+
+    Returns:
+        Tuple (documents, nombre de pages par origine)
+    """
+    pages: Dict[Tuple, List[int]] = {}
+    for i in range(len(store)):
+        metadata = store.metadata(i)
+        pages.setdefault((ingest.source_key(metadata), metadata.get("page")), []).append(i)
+    indexed = {key for key, _ in pages}
+
+    documents = []
+    if ingest.PDF_DIR.exists():
+        tasks = [task for task in ingest.find_pdf_files(ingest.PDF_DIR)
+                 if f"pdf:{task[2]}/{task[0].name}" in indexed]
+        documents.extend(ingest.iter_pdf_documents(tasks))
+    origins = {"pdf": len(documents), "web_cache": 0, "chunks": 0}
+    loaded = {ingest.source_key(doc.metadata) for doc in documents}
+
+    for (key, page), ids in pages.items():
+        if key in loaded:
+            continue
+        metadata = {k: v for k, v in store.metadata(ids[0]).items() if k not in ("start_index", "chunk_id")}
+        cache_file = ingest._web_cache_file(ingest.WEB_CACHE_DIR, metadata.get("source_url", ""))
+        if metadata.get("source_type") == "web" and cache_file.exists():
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)["documents"]
+            documents.extend(Document(page_content=d["page_content"], metadata=metadata) for d in cached)
+            origins["web_cache"] += len(cached)
+            loaded.add(key)
+        else:
+            documents.append(Document(page_content=_stitch_chunks(store, ids), metadata=metadata))
+            origins["chunks"] += 1
+    return documents, origins
+
+
+def build_store(
+    documents: List[Document],
+    chunk_size: int,
+    chunk_overlap: int,
+    embeddings,
+    directory: Path,
+    index_spec: str,
+    precision: str
+) -> Dict[str, float]:
+    """
+    Construit un vector store complet (chunks, FAISS, BM25, partitions,
+    filtres) pour un découpage donné.
+
+    Returns:
+        Durée de chaque étape de construction, en secondes
+    """
+    seconds = {}
+    start = time.perf_counter()
+    chunks = ingest._make_text_splitter(chunk_size, chunk_overlap).split_documents(documents)
+    writer = ChunkStoreWriter(directory / "chunks")
+    writer.add_many(chunks)
+    writer.close()
+    store = ChunkStore(directory / "chunks")
+    seconds["chunking"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = np.asarray(ingest.embed_chunks(chunks, embeddings), dtype=np.float32)
+    np.save(directory / "vectors.npy", vectors)
+    seconds["embedding"] = time.perf_counter() - start
+
+    seconds.update(build_indexes(store, vectors, directory, index_spec, precision))
+    return {step: round(value, 3) for step, value in seconds.items()}
+
+
+def build_indexes(store: ChunkStore, vectors: np.ndarray, directory: Path,
+                  index_spec: str, precision: str) -> Dict[str, float]:
+    """
+    Construit les index (FAISS, BM25, partitions, filtres) d'un chunk store
+    dans directory.
+
+    Returns:
+        Durée de chaque construction, en secondes
+    """
+    seconds = {}
+    start = time.perf_counter()
+    index, index_info = ingest.build_search_index(vectors, index_spec, precision, ingest.RESCORE_FACTOR)
+    faiss.write_index(index, str(directory / "index.faiss"))
+    with open(directory / "index_info.json", 'w', encoding='utf-8') as f:
+        json.dump(index_info, f, indent=1)
+    seconds["faiss"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    build_bm25_index((store.text(i) for i in range(len(store))), directory / "bm25")
+    seconds["bm25"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ingest.build_partitions(store, vectors, directory / "bm25", directory / "partitions", index_spec, precision)
+    build_filter_bitmaps(store, directory / "filters")
+    seconds["partitions"] = time.perf_counter() - start
+    return {step: round(value, 3) for step, value in seconds.items()}
+
+
+# ============================================
+# MESURES
+# ============================================
+
+def evaluate(indexes: PartitionedIndexes, store: ChunkStore, queries: List[Dict],
+             top_k: int, alpha: float, rrf_offset: int,
+             reranker: Optional[CrossEncoderReranker] = None) -> Dict:
+    """
+    Qualité de la recherche pour une combinaison de paramètres (questions
+    traitées par lots, procédure par procédure, comme l'application les
+    traiterait une à une).
+    """
+    retriever = HybridRetriever(indexes=indexes, store=store, k=top_k, alpha=alpha, rrf_offset=rrf_offset,
+                                reranker=reranker)
+    results: List[Optional[List[Document]]] = [None] * len(queries)
+    for procedure in dict.fromkeys(q["procedure"] for q in queries):
+        positions = [i for i, q in enumerate(queries) if q["procedure"] == procedure]
+        found = retriever.batch_retrieve([queries[i]["question"] for i in positions], procedure)
+        for i, docs in zip(positions, found):
+            results[i] = docs
+    return score(queries, results)
+
+
+def measure_latency(directory: Path, store: ChunkStore, base_embeddings, queries: List[Dict],
+                    top_k: int, alpha: float, repeat: int,
+                    reranker: Optional[CrossEncoderReranker] = None) -> Dict:
+    """
+    Latence de chaque étape, question par question, sans cache des
+    embeddings de requêtes (chaque question est réellement encodée) et sans
+    pool de threads (étapes mesurées séparément).
+
+    Returns:
+        {étape: {"p50", "p95", "p99", "mean"}} en millisecondes
+    """
+    indexes = PartitionedIndexes(directory, QueryEmbeddingCache(base_embeddings, max_entries=0), store)
+    timings = RetrievalTimings()
+    retriever = HybridRetriever(indexes=indexes, store=store, k=top_k, alpha=alpha, timings=timings,
+                                reranker=reranker)
+
+    # Échauffement: chargement des partitions et du modèle
+    for procedure in dict.fromkeys(q["procedure"] for q in queries):
+        retriever.selected_procedure = procedure
+        retriever.invoke(procedure)
+
+    samples = {step: [] for step in RetrievalTimings.STEPS}
+    for _ in range(repeat):
+        for query in queries:
+            retriever.selected_procedure = query["procedure"]
+            retriever.invoke(query["question"])
+            for step in samples:
+                samples[step].append(timings.last.get(step, 0.0))
+
+    return {
+        step: {
+            **{f"p{p}": round(float(np.percentile(values, p)), 3) for p in PERCENTILES},
+            "mean": round(float(np.mean(values)), 3),
+        }
+        for step, values in samples.items()
+    }
+
+
+# ============================================
+# RAPPORT
+# ============================================
+
+def print_report(report: Dict):
+    """
+    Affiche les tableaux récapitulatifs (qualité, latences, construction).
+    """
+    print()
+    print(f"{'Chunk':>6} {'Overlap':>7} {'k':>3} {'Alpha':>5} {'RRF':>4} "
+          f"{'Recall':>7} {'MRR':>6} {'Hit':>6}")
+    print("-" * 52)
+    for r in sorted(report["results"], key=lambda r: (-r["recall"], -r["mrr"])):
+        print(f"{r['chunk_size']:>6} {r['chunk_overlap']:>7} {r['top_k']:>3} {r['alpha']:>5.2f} "
+              f"{r['rrf_offset']:>4} {r['recall']:>7.3f} {r['mrr']:>6.3f} {r['hit_rate']:>6.3f}")
+
+    for entry in report["stores"]:
+        print()
+        print(f"⏱️  Chunks {entry['chunk_size']}/{entry['chunk_overlap']} ({entry['chunks']} chunks, "
+              f"{entry['origin']}) - latences (ms)")
+        print(f"   {'Étape':<10} " + " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES))
+        for step, values in entry["latency_ms"].items():
+            print(f"   {step:<10} " + " ".join(f"{values['p' + str(p)]:>8.2f}" for p in PERCENTILES))
+        build = ", ".join(f"{step} {value:.2f}s" for step, value in entry["build_seconds"].items())
+        print(f"   🏗️  Construction: {build}")
+    print()
+
+
+def compare_reports(previous: Dict, current: Dict):
+    """
+    Affiche l'évolution par rapport à un rapport précédent (mêmes paramètres,
+    avec ou sans re-classement).
+    """
+    def key(r):
+        return (r["chunk_size"], r["chunk_overlap"], r["top_k"], r["alpha"], r["rrf_offset"])
+
+    before = {key(r): r for r in previous.get("results", [])}
+    print(f"🔁 Comparaison avec {previous.get('created', 'rapport précédent')} (re-classement: "
+          f"{'oui' if 'reranker' in previous else 'non'} → {'oui' if 'reranker' in current else 'non'})")
+    print(f"{'Chunk':>6} {'Overlap':>7} {'k':>3} {'Alpha':>5} {'RRF':>4} {'Δ Recall':>9} {'Δ MRR':>7}")
+    print("-" * 47)
+    for r in current["results"]:
+        old = before.get(key(r))
+        if old is not None:
+            print(f"{r['chunk_size']:>6} {r['chunk_overlap']:>7} {r['top_k']:>3} {r['alpha']:>5.2f} "
+                  f"{r['rrf_offset']:>4} {r['recall'] - old['recall']:>+9.3f} {r['mrr'] - old['mrr']:>+7.3f}")
+
+    old_stores = {(s["chunk_size"], s["chunk_overlap"]): s for s in previous.get("stores", [])}
+    for entry in current["stores"]:
+        old = old_stores.get((entry["chunk_size"], entry["chunk_overlap"]))
+        if old is None:
+            continue
+        deltas = ", ".join(
+            f"{step} {values['p50'] - old['latency_ms'][step]['p50']:+.2f}"
+            for step, values in entry["latency_ms"].items() if step in old["latency_ms"]
+        )
+        print(f"   Δ p50 (ms) chunks {entry['chunk_size']}/{entry['chunk_overlap']}: {deltas}")
+    print()
+
+
+def run_benchmark(queries_file: Path, top_k_values: List[int], alphas: List[float], rrf_offsets: List[int],
+                  chunk_sizes: List[int], chunk_overlaps: List[int], repeat: int, rerank: bool = False) -> Dict:
+    """
+    Exécute le balayage et renvoie le rapport (sérialisable en JSON).
+    """
+    store = ChunkStore(ingest.CHUNK_STORE_DIR)
+    queries = load_queries(queries_file)
+    index_info = ingest.load_index_info()
+    index_spec = index_info["spec"]
+    precision = index_info.get("precision", "float32")
+    precision = precision if precision in ingest.VECTOR_PRECISIONS else "float32"
+    manifest = {}
+    if ingest.MANIFEST_FILE.exists():
+        with open(ingest.MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    base_size = manifest.get("chunk_size", ingest.CHUNK_SIZE)
+    base_overlap = manifest.get("chunk_overlap", ingest.CHUNK_OVERLAP)
+
+    print("=" * 80)
+    print("📏 BENCHMARK DE LA RECHERCHE HYBRIDE")
+    print("=" * 80)
+    print(f"   Questions: {len(queries)} ({queries_file})")
+    print(f"   Index: {index_spec} ({index_info.get('precision', 'float32')}), {len(store)} chunks "
+          f"découpés en {base_size}/{base_overlap}")
+    if not manifest:
+        print(f"   ⚠️  {ingest.MANIFEST_FILE} absent: découpage de l'index supposé {base_size}/{base_overlap}")
+    for label in check_labels(queries, store):
+        print(f"   ⚠️  Passage annoté introuvable: {label}")
+
+    embeddings = ingest.create_embeddings()
+    base_embeddings = embeddings.base
+    reranker = None
+    if rerank:
+        reranker = CrossEncoderReranker(RERANKER_MODEL, candidates=RERANK_CANDIDATES,
+                                        min_gap=RERANK_MIN_GAP, budget_ms=RERANK_BUDGET_MS)
+        reranker.load()
+        print(f"   🔀 Re-classement: {RERANKER_MODEL} (écart < {RERANK_MIN_GAP}, "
+              f"budget {RERANK_BUDGET_MS:.0f} ms)")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "queries_file": str(queries_file),
+        "queries": len(queries),
+        "embedding_model": ingest.EMBEDDING_MODEL,
+        "index": {k: index_info.get(k) for k in ("spec", "precision", "factory", "search_params", "version")},
+        "stores": [],
+        "results": [],
+    }
+
+    variants = [(base_size, base_overlap)] + [
+        (size, overlap) for size, overlap in product(chunk_sizes, chunk_overlaps)
+        if (size, overlap) != (base_size, base_overlap) and overlap < size
+    ]
+    with tempfile.TemporaryDirectory(prefix="bench_retrieval_") as tmp:
+        documents, origins = load_source_documents(store) if len(variants) > 1 else ([], {})
+        if origins:
+            report["source_documents"] = origins
+            print(f"   📄 Textes sources: {origins['pdf']} page(s) PDF, {origins['web_cache']} page(s) web "
+                  f"en cache, {origins['chunks']} page(s) recousue(s) à partir des chunks")
+        for chunk_size, chunk_overlap in variants:
+            if (chunk_size, chunk_overlap) == (base_size, base_overlap):
+                # Index existant; temps de construction mesurés sur une copie
+                directory, variant_store, origin = ingest.VECTOR_STORE_DIR, store, "vector_store"
+                rebuild_dir = Path(tmp) / "rebuild"
+                rebuild_dir.mkdir()
+                build_seconds = build_indexes(store, ingest.load_vectors(), rebuild_dir, index_spec, precision)
+            else:
+                print(f"\n✂️  Découpage {chunk_size}/{chunk_overlap}...")
+                directory, origin = Path(tmp) / f"c{chunk_size}-{chunk_overlap}", "redécoupé"
+                directory.mkdir()
+                build_seconds = build_store(documents, chunk_size, chunk_overlap, embeddings, directory,
+                                            index_spec, precision)
+                variant_store = ChunkStore(directory / "chunks")
+
+            print(f"   ⏳ Chunks {chunk_size}/{chunk_overlap}: {len(variant_store)} chunks, mesures...")
+            report["stores"].append({
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "chunks": len(variant_store),
+                "origin": origin,
+                "build_seconds": build_seconds,
+                "latency_ms": measure_latency(directory, variant_store, base_embeddings, queries,
+                                              TOP_K, DEFAULT_ALPHA, repeat, reranker),
+            })
+
+            # Les questions ne sont encodées qu'une fois pour tout le balayage
+            indexes = PartitionedIndexes(directory, QueryEmbeddingCache(base_embeddings), variant_store)
+            for top_k, alpha, rrf_offset in product(top_k_values, alphas, rrf_offsets):
+                report["results"].append({
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "top_k": top_k,
+                    "alpha": alpha,
+                    "rrf_offset": rrf_offset,
+                    "rerank": rerank,
+                    **evaluate(indexes, variant_store, queries, top_k, alpha, rrf_offset, reranker),
+                })
+    if reranker is not None:
+        report["reranker"] = {
+            **reranker.stats(),
+            "candidates": reranker.candidates,
+            "min_gap": reranker.min_gap,
+            "budget_ms": reranker.budget_ms,
+        }
+    return report
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark qualité / latence de la recherche hybride")
+    parser.add_argument("--queries", type=Path, default=QUERIES_FILE, help="Questions annotées (JSON)")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[TOP_K],
+                        help="Valeurs de TOP_K_RETRIEVAL à comparer")
+    parser.add_argument("--alpha", type=float, nargs="+", default=[DEFAULT_ALPHA],
+                        help="Poids de la recherche vectorielle (1 - alpha pour BM25)")
+    parser.add_argument("--rrf", type=int, nargs="+", default=[RRF_OFFSET], help="Constantes de la fusion RRF")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[],
+                        help="Autres tailles de chunk (index reconstruits dans un dossier temporaire)")
+    parser.add_argument("--chunk-overlaps", type=int, nargs="+", default=None,
+                        help=f"Chevauchements pour --chunk-sizes (défaut: {ingest.CHUNK_OVERLAP})")
+    parser.add_argument("--repeat", type=int, default=3, help="Passages des questions pour les latences")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="Threads FAISS (1 = comme une requête isolée de l'application)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help=f"Rapport JSON (défaut: {RESULTS_DIR}/retrieval-<date>.json)")
+    parser.add_argument("--rerank", action="store_true",
+                        help="Re-classer les questions ambiguës par cross-encoder (RERANK_* de .env)")
+    parser.add_argument("--compare", type=Path, default=None, help="Rapport JSON précédent à comparer")
+    args = parser.parse_args()
+
+    if not ChunkStore.exists(ingest.CHUNK_STORE_DIR) or not PartitionedIndexes.exists(ingest.VECTOR_STORE_DIR):
+        print(f"❌ Erreur: aucun index à jour dans {ingest.VECTOR_STORE_DIR}/, lancez d'abord python ingest.py")
+        sys.exit(1)
+
+    faiss.omp_set_num_threads(args.threads)
+    report = run_benchmark(args.queries, args.top_k, args.alpha, args.rrf, args.chunk_sizes,
+                           args.chunk_overlaps or [ingest.CHUNK_OVERLAP], args.repeat, args.rerank)
+    print_report(report)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_reports(json.load(f), report)
+
+    output = args.output or RESULTS_DIR / f"retrieval-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"💾 Rapport enregistré: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+Index lexical BM25 (Okapi) construit à l'ingestion et relu en mmap.
+
+Remplace la construction de BM25Okapi au démarrage de l'application:
+la tokenisation du corpus, le calcul des IDF et des longueurs de documents
+sont faits une fois par ingest.py. Les scores sont identiques à ceux de
+rank_bm25.BM25Okapi (mêmes paramètres, même formule).
+
+Les postings forment une matrice creuse CSR termes x chunks dont les valeurs
+(postings_weights) sont les contributions BM25 précalculées: le score d'une
+requête est la somme des lignes de ses termes, sans boucle sur le corpus.
+
+Structure (dossier vector_store/bm25/):
+    vocab.bin        termes UTF-8 concaténés, triés
+    vocab_offsets.npy  int64 (V + 1), le terme t est vocab.bin[offsets[t]:offsets[t+1]]
+    idf.npy          float64 (V), IDF de chaque terme (epsilon déjà appliqué)
+    postings_offsets.npy  int64 (V + 1), bornes des postings de chaque terme
+    postings_docs.npy     int32, IDs des chunks contenant le terme (croissants)
+    postings_tf.npy       int32, fréquence du terme dans chacun de ces chunks
+    postings_weights.npy  float64, contribution BM25 du terme au score de ces chunks
+    doc_lengths.npy  int32 (N), nombre de tokens de chaque chunk
+    meta.json        paramètres (k1, b, epsilon), avgdl, nombre de chunks et de termes
+
+Un index de partition (build_bm25_partition) a la même structure, restreinte
+aux chunks d'une procédure, avec les IDF et avgdl du corpus complet.
+"""
+
+import json
+import math
+import mmap
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from metadata_filters import unpack_bitmap
+
+# Paramètres par défaut de rank_bm25.BM25Okapi
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenisation utilisée pour l'index et pour les requêtes.
+    """
+    return text.lower().split()
+
+
+def build_bm25_index(texts: Iterable[str], directory: Path,
+                     k1: float = BM25_K1, b: float = BM25_B, epsilon: float = BM25_EPSILON):
+    """
+    Construit l'index BM25 des textes (dans l'ordre des IDs de chunks) et
+    l'écrit dans directory.
+    """
+    directory = Path(directory)
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+
+    term_ids = {}
+    doc_lengths = []
+    posting_terms, posting_docs, posting_tf = [], [], []
+
+    for doc_id, text in enumerate(texts):
+        tokens = tokenize(text)
+        doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            posting_terms.append(term_ids.setdefault(term, len(term_ids)))
+            posting_docs.append(doc_id)
+            posting_tf.append(tf)
+
+    corpus_size = len(doc_lengths)
+    avgdl = sum(doc_lengths) / corpus_size if corpus_size else 0.0
+
+    # Vocabulaire trié (l'ordre des str Python est celui des octets UTF-8)
+    vocabulary = sorted(term_ids)
+    remap = np.empty(len(term_ids), dtype=np.int64)
+    for rank, term in enumerate(vocabulary):
+        remap[term_ids[term]] = rank
+
+    # IDF calculé comme BM25Okapi._calc_idf (mêmes opérations, termes dans
+    # l'ordre de première apparition) puis réordonné selon le vocabulaire trié
+    posting_terms = np.asarray(posting_terms, dtype=np.int64)
+    document_frequency = np.bincount(posting_terms, minlength=len(term_ids))
+    idf = np.empty(len(term_ids), dtype=np.float64)
+    idf_sum = 0
+    negative_idfs = []
+    for term_id, freq in enumerate(document_frequency.tolist()):
+        value = math.log(corpus_size - freq + 0.5) - math.log(freq + 0.5)
+        idf[term_id] = value
+        idf_sum += value
+        if value < 0:
+            negative_idfs.append(term_id)
+    if term_ids:
+        idf[negative_idfs] = epsilon * (idf_sum / len(term_ids))
+    idf[remap] = idf.copy()
+    document_frequency[remap] = document_frequency.copy()
+
+    posting_terms = remap[posting_terms]
+    posting_docs = np.asarray(posting_docs, dtype=np.int32)
+    posting_tf = np.asarray(posting_tf, dtype=np.int32)
+    order = np.lexsort((posting_docs, posting_terms))
+
+    postings_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(document_frequency, out=postings_offsets[1:])
+
+    encoded = [term.encode('utf-8') for term in vocabulary]
+    vocab_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(term) for term in encoded], out=vocab_offsets[1:])
+    with open(directory / "vocab.bin", 'wb') as f:
+        f.write(b"".join(encoded))
+
+    np.save(directory / "vocab_offsets.npy", vocab_offsets)
+    np.save(directory / "idf.npy", idf)
+    np.save(directory / "postings_offsets.npy", postings_offsets)
+    posting_docs, posting_tf = posting_docs[order], posting_tf[order]
+    doc_lengths = np.asarray(doc_lengths, dtype=np.int32)
+    np.save(directory / "postings_docs.npy", posting_docs)
+    np.save(directory / "postings_tf.npy", posting_tf)
+    np.save(directory / "postings_weights.npy", _bm25_weights(
+        idf, postings_offsets, posting_docs, posting_tf, doc_lengths, k1, b, avgdl
+    ))
+    np.save(directory / "doc_lengths.npy", doc_lengths)
+
+    with open(directory / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump({
+            "k1": k1,
+            "b": b,
+            "epsilon": epsilon,
+            "avgdl": avgdl,
+            "count": corpus_size,
+            "vocabulary_size": len(vocabulary),
+        }, f)
+
+
+def build_bm25_partition(source: "BM25Index", doc_ids: np.ndarray, directory: Path):
+    """
+    Écrit l'index BM25 restreint aux chunks doc_ids (IDs globaux croissants).
+
+    Les IDF, longueurs moyennes et poids restent ceux du corpus complet: les
+    scores d'une partition sont exactement ceux de l'index global, filtrés.
+    """
+    directory = Path(directory)
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    in_partition = np.zeros(source.corpus_size, dtype=bool)
+    in_partition[doc_ids] = True
+
+    # Postings des chunks de la partition, termes absents retirés du vocabulaire
+    keep = in_partition[source._postings_docs]
+    posting_terms = np.repeat(np.arange(source.vocabulary_size), np.diff(source._postings_offsets))[keep]
+    terms = np.unique(posting_terms)
+    local_terms = np.searchsorted(terms, posting_terms)
+    postings_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(local_terms, minlength=len(terms)), out=postings_offsets[1:])
+
+    encoded = [source._term(term_id) for term_id in terms.tolist()]
+    vocab_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(term) for term in encoded], out=vocab_offsets[1:])
+    with open(directory / "vocab.bin", 'wb') as f:
+        f.write(b"".join(encoded))
+
+    np.save(directory / "vocab_offsets.npy", vocab_offsets)
+    np.save(directory / "idf.npy", source.idf[terms])
+    np.save(directory / "postings_offsets.npy", postings_offsets)
+    np.save(directory / "postings_docs.npy",
+            np.searchsorted(doc_ids, source._postings_docs[keep]).astype(np.int32))
+    np.save(directory / "postings_tf.npy", source._postings_tf[keep])
+    np.save(directory / "postings_weights.npy", source._postings_weights[keep])
+    np.save(directory / "doc_lengths.npy", source.doc_len[doc_ids])
+
+    with open(directory / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump({
+            "k1": source.k1,
+            "b": source.b,
+            "epsilon": source.epsilon,
+            "avgdl": source.avgdl,
+            "count": len(doc_ids),
+            "vocabulary_size": len(terms),
+        }, f)
+
+
+def _bm25_weights(idf, postings_offsets, posting_docs, posting_tf, doc_lengths,
+                  k1: float, b: float, avgdl: float) -> np.ndarray:
+    """
+    Contribution de chaque posting au score BM25, calculée avec les mêmes
+    opérations que BM25Okapi.get_scores (résultats identiques au bit près).
+    """
+    term_ids = np.repeat(np.arange(len(idf)), np.diff(postings_offsets))
+    tf = np.asarray(posting_tf, dtype=np.float64)
+    doc_len = np.asarray(doc_lengths, dtype=np.float64)[posting_docs]
+    return np.asarray(idf)[term_ids] * (tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avgdl)))
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices des k meilleurs scores, par score décroissant puis indice
+    croissant (même ordre qu'un tri stable décroissant de tout le tableau).
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    # Seuil = k-ième meilleur score; les ex-aequo au seuil sont départagés par indice
+    threshold = scores[np.argpartition(scores, n - k)[n - k]]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+    ids = np.concatenate([above, ties])
+    return ids[np.lexsort((ids, -scores[ids]))]
+
+
+class BM25Index:
+    """
+    Lecture d'un index BM25 mappé en mémoire, avec la même interface de
+    scoring que BM25Okapi (get_scores).
+
+    Pour l'index d'une partition, doc_ids donne l'ID global de chaque chunk:
+    get_scores est indexé par position dans la partition, top_k renvoie
+    des IDs globaux.
+    """
+
+    def __init__(self, directory: Path, doc_ids: Optional[np.ndarray] = None):
+        self.directory = Path(directory)
+        self.doc_ids = doc_ids
+        with open(self.directory / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.epsilon = meta["epsilon"]
+        self.avgdl = meta["avgdl"]
+        self.corpus_size = meta["count"]
+
+        # Vocabulaire lu par mmap Python (tranches de bytes rapides pour la
+        # recherche dichotomique), offsets en vue ndarray du fichier mappé
+        vocab_path = self.directory / "vocab.bin"
+        if vocab_path.stat().st_size > 0:
+            with open(vocab_path, 'rb') as f:
+                self._vocab = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._vocab = b""
+        self._vocab_offsets = np.load(self.directory / "vocab_offsets.npy", mmap_mode='r').view(np.ndarray)
+        self.idf = np.load(self.directory / "idf.npy", mmap_mode='r').view(np.ndarray)
+        self._postings_offsets = np.load(self.directory / "postings_offsets.npy", mmap_mode='r').view(np.ndarray)
+        self._postings_docs = np.load(self.directory / "postings_docs.npy", mmap_mode='r').view(np.ndarray)
+        self._postings_tf = np.load(self.directory / "postings_tf.npy", mmap_mode='r').view(np.ndarray)
+        self.doc_len = np.load(self.directory / "doc_lengths.npy", mmap_mode='r').view(np.ndarray)
+        weights_path = self.directory / "postings_weights.npy"
+        if weights_path.exists():
+            self._postings_weights = np.load(weights_path, mmap_mode='r').view(np.ndarray)
+        else:
+            # Index écrit avant l'ajout des poids précalculés
+            self._postings_weights = _bm25_weights(
+                self.idf, self._postings_offsets, self._postings_docs, self._postings_tf,
+                self.doc_len, self.k1, self.b, self.avgdl
+            )
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        return (Path(directory) / "meta.json").exists()
+
+    def __len__(self) -> int:
+        return self.corpus_size
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._vocab_offsets) - 1
+
+    def _term(self, term_id: int) -> bytes:
+        return self._vocab[int(self._vocab_offsets[term_id]):int(self._vocab_offsets[term_id + 1])]
+
+    def term_id(self, term: str) -> Optional[int]:
+        """
+        ID d'un terme du vocabulaire (recherche dichotomique), None si absent.
+        """
+        key = term.encode('utf-8')
+        low, high = 0, self.vocabulary_size
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.vocabulary_size and self._term(low) == key:
+            return low
+        return None
+
+    def postings(self, term_id: int):
+        """
+        Chunks contenant le terme et fréquences correspondantes.
+        """
+        start, end = self._postings_offsets[term_id], self._postings_offsets[term_id + 1]
+        return self._postings_docs[start:end], self._postings_tf[start:end]
+
+    def _query_postings(self, query: List[str]):
+        """
+        Lignes CSR des termes de la requête (dans l'ordre, répétitions comprises).
+
+        Returns:
+            Tuple (IDs des chunks, contributions BM25), ou None si aucun terme connu
+        """
+        term_ids = [term_id for term_id in map(self.term_id, query) if term_id is not None]
+        if not term_ids:
+            return None
+        starts = self._postings_offsets[term_ids]
+        ends = self._postings_offsets[np.asarray(term_ids) + 1]
+        docs = np.concatenate([self._postings_docs[s:e] for s, e in zip(starts, ends)])
+        weights = np.concatenate([self._postings_weights[s:e] for s, e in zip(starts, ends)])
+        return docs, weights
+
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        """
+        Scores BM25 de tous les chunks pour la requête tokenisée
+        (identiques à BM25Okapi.get_scores).
+        """
+        postings = self._query_postings(query)
+        if postings is None:
+            return np.zeros(self.corpus_size)
+        docs, weights = postings
+        # Somme des lignes, dans l'ordre des termes comme BM25Okapi
+        return np.bincount(docs, weights=weights, minlength=self.corpus_size)
+
+    def get_scores_batch(self, queries: List[List[str]]) -> np.ndarray:
+        """
+        Scores BM25 de plusieurs requêtes tokenisées, matrice (requêtes x chunks).
+
+        Produit creux requêtes x postings calculé en une seule accumulation
+        (ligne * corpus_size + chunk): les termes de chaque requête sont
+        sommés dans le même ordre que get_scores, scores identiques.
+        """
+        cells, weights = [], []
+        for row, query in enumerate(queries):
+            postings = self._query_postings(query)
+            if postings is not None:
+                cells.append(postings[0].astype(np.int64) + row * self.corpus_size)
+                weights.append(postings[1])
+        size = len(queries) * self.corpus_size
+        if not cells:
+            return np.zeros((len(queries), self.corpus_size))
+        scores = np.bincount(np.concatenate(cells), weights=np.concatenate(weights), minlength=size)
+        return scores.reshape(len(queries), self.corpus_size)
+
+    def top_k(self, query: List[str], k: int, bitmap: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        IDs des k chunks les mieux classés pour la requête tokenisée
+        (même ordre que le tri des scores de BM25Okapi, ex-aequo par ID).
+
+        Args:
+            bitmap: Bitset des IDs globaux autorisés (None = pas de filtre)
+        """
+        return self._select(self.get_scores(query), k, self._allowed(bitmap))
+
+    def top_k_batch(self, queries: List[List[str]], k: int, bitmap: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """
+        top_k de plusieurs requêtes tokenisées (scores calculés ensemble).
+        """
+        allowed = self._allowed(bitmap)
+        return [self._select(scores, k, allowed) for scores in self.get_scores_batch(queries)]
+
+    def _allowed(self, bitmap: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Positions (dans cet index) des chunks autorisés par le bitset global.
+        """
+        if bitmap is None:
+            return None
+        mask = unpack_bitmap(bitmap)
+        return np.flatnonzero(mask[self.doc_ids] if self.doc_ids is not None else mask[:self.corpus_size])
+
+    def _select(self, scores: np.ndarray, k: int, allowed: Optional[np.ndarray]) -> np.ndarray:
+        ids = top_k(scores, k) if allowed is None else allowed[top_k(scores[allowed], k)]
+        return self.doc_ids[ids] if self.doc_ids is not None else ids
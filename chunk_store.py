@@ -0,0 +1,235 @@
+"""
+Stockage compact et mappé en mémoire des chunks de l'index.
+
+Remplace chunks.pkl et le docstore picklé de FAISS (index.pkl): chaque
+chunk n'est stocké qu'une fois et aucun pickle n'est relu côté application.
+
+Structure (dossier vector_store/chunks/):
+    text.bin       textes UTF-8 concaténés
+    offsets.npy    int64 (n + 1), le texte du chunk i est text.bin[offsets[i]:offsets[i+1]]
+    meta.json      nombre de chunks et description des colonnes de métadonnées
+    col_XXX.npy    une colonne de métadonnées (procedure, source_type, source_file...):
+                   - "dict": codes int32 vers la table de valeurs de meta.json (-1 = absent)
+                   - "int":  valeurs int64 (INT_MISSING = absent)
+
+Les fichiers sont ouverts en mmap: seuls les chunks effectivement lus
+(les top-k d'une recherche) sont matérialisés en Document.
+"""
+
+import os
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from array import array
+
+import numpy as np
+from langchain_core.documents import Document
+
+INT_MISSING = np.iinfo(np.int64).min
+
+
+def _value_key(value):
+    """
+    Clé de dictionnaire d'une valeur de métadonnée (True et 1 restent distincts).
+    """
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return (type(value).__name__, value)
+    return ("json", json.dumps(value, ensure_ascii=False, sort_keys=True, default=str))
+
+
+class ChunkStoreWriter:
+    """
+    Écrit un chunk store en flux: les textes vont directement sur disque et
+    les métadonnées sont encodées par dictionnaire au fil de l'eau.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        if self.directory.exists():
+            shutil.rmtree(self.directory)
+        self.directory.mkdir(parents=True)
+        self._text_file = open(self.directory / "text.bin", 'wb')
+        self._offsets = array('q', [0])
+        self._columns: Dict[str, array] = {}
+        self._tables: Dict[str, List] = {}
+        self._table_index: Dict[str, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def add(self, doc: Document):
+        """
+        Ajoute un chunk à la fin du store.
+        """
+        row = len(self)
+        data = doc.page_content.encode('utf-8')
+        self._text_file.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+        for name, value in doc.metadata.items():
+            if name not in self._columns:
+                self._columns[name] = array('i', [-1] * row)
+                self._tables[name] = []
+                self._table_index[name] = {}
+            key = _value_key(value)
+            code = self._table_index[name].get(key)
+            if code is None:
+                code = len(self._tables[name])
+                self._table_index[name][key] = code
+                self._tables[name].append(value)
+            self._columns[name].append(code)
+
+        for codes in self._columns.values():
+            if len(codes) == row:
+                codes.append(-1)
+
+    def add_many(self, docs: Iterable[Document]):
+        for doc in docs:
+            self.add(doc)
+
+    def close(self):
+        """
+        Écrit les offsets et les colonnes de métadonnées.
+        """
+        self._text_file.close()
+        np.save(self.directory / "offsets.npy", np.frombuffer(self._offsets, dtype=np.int64))
+
+        columns = []
+        for number, (name, codes) in enumerate(self._columns.items()):
+            codes = np.frombuffer(codes, dtype=np.int32)
+            table = self._tables[name]
+            file_name = f"col_{number:03d}.npy"
+
+            if table and all(isinstance(v, int) and not isinstance(v, bool) for v in table):
+                # Colonne entière (page, start_index...): valeurs stockées directement
+                values = np.array(table + [INT_MISSING], dtype=np.int64)
+                np.save(self.directory / file_name, values[codes])
+                columns.append({"name": name, "kind": "int", "file": file_name})
+            else:
+                np.save(self.directory / file_name, codes)
+                columns.append({"name": name, "kind": "dict", "file": file_name, "values": table})
+
+        with open(self.directory / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump({"count": len(self), "columns": columns}, f, ensure_ascii=False, default=str)
+
+
+class ChunkStore:
+    """
+    Lecture d'un chunk store mappé en mémoire.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self._offsets = np.load(self.directory / "offsets.npy", mmap_mode='r')
+        text_path = self.directory / "text.bin"
+        if text_path.stat().st_size > 0:
+            self._text = np.memmap(text_path, dtype=np.uint8, mode='r')
+        else:
+            self._text = np.zeros(0, dtype=np.uint8)
+
+        self._masks = {}
+        self._columns = {}
+        for column in meta["columns"]:
+            data = np.load(self.directory / column["file"], mmap_mode='r')
+            self._columns[column["name"]] = (column["kind"], data, column.get("values"))
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        return (Path(directory) / "meta.json").exists()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns)
+
+    def text(self, i: int) -> str:
+        """
+        Texte du chunk i.
+        """
+        return bytes(self._text[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+    def metadata(self, i: int) -> Dict:
+        """
+        Métadonnées du chunk i.
+        """
+        metadata = {}
+        for name, (kind, data, values) in self._columns.items():
+            raw = data[i]
+            if kind == "int":
+                if raw != INT_MISSING:
+                    metadata[name] = int(raw)
+            elif raw >= 0:
+                metadata[name] = values[raw]
+        return metadata
+
+    def document(self, i: int) -> Document:
+        """
+        Matérialise le chunk i en Document LangChain.
+        """
+        return Document(page_content=self.text(int(i)), metadata=self.metadata(int(i)))
+
+    def documents(self, ids: Iterable[int]) -> List[Document]:
+        return [self.document(i) for i in ids]
+
+    def column_values(self, name: str) -> List:
+        """
+        Table des valeurs distinctes d'une colonne "dict".
+        """
+        kind, _, values = self._columns[name]
+        return list(values) if kind == "dict" else []
+
+    def codes(self, name: str) -> np.ndarray:
+        """
+        Colonne brute (codes pour "dict", valeurs pour "int"), en mmap.
+        """
+        return self._columns[name][1]
+
+    def mask(self, name: str, value) -> np.ndarray:
+        """
+        Masque booléen des chunks dont la métadonnée name vaut value
+        (calculé une fois puis mis en cache).
+        """
+        key = (name, _value_key(value))
+        if key not in self._masks:
+            self._masks[key] = self._compute_mask(name, value)
+        return self._masks[key]
+
+    def _compute_mask(self, name: str, value) -> np.ndarray:
+        if name not in self._columns:
+            return np.zeros(len(self), dtype=bool)
+        kind, data, values = self._columns[name]
+        if kind == "int":
+            return np.asarray(data) == value
+        code = self._code_of(values, value)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return np.asarray(data) == code
+
+    @staticmethod
+    def _code_of(values: List, value) -> Optional[int]:
+        key = _value_key(value)
+        for code, candidate in enumerate(values):
+            if _value_key(candidate) == key:
+                return code
+        return None
+
+
+def replace_directory(tmp_directory: Path, directory: Path):
+    """
+    Remplace directory par tmp_directory (l'ancienne version est supprimée).
+    """
+    directory = Path(directory)
+    old_directory = directory.with_name(directory.name + ".old")
+    if old_directory.exists():
+        shutil.rmtree(old_directory)
+    if directory.exists():
+        os.replace(directory, old_directory)
+    os.replace(tmp_directory, directory)
+    if old_directory.exists():
+        shutil.rmtree(old_directory)
@@ -0,0 +1,140 @@
+"""
+Compression extractive du contexte avant l'appel au LLM (optionnelle).
+
+Un chunk de 500 caractères contient souvent une ou deux phrases utiles à
+la question et plusieurs qui ne le sont pas. Après pack_context, les
+passages sont découpés en phrases, chaque phrase est comparée à la question
+(similarité cosinus avec le vecteur déjà calculé pour la recherche FAISS)
+et seules les max_sentences meilleures sont envoyées au LLM, dans leur
+ordre d'origine et dans le passage (donc la source) dont elles viennent.
+Moins de tokens dans le prompt, c'est une génération plus rapide.
+
+Les phrases sont encodées par le modèle d'embeddings local (aucun appel
+réseau); leurs vecteurs sont gardés dans un cache LRU, les mêmes chunks
+revenant souvent d'une question à l'autre.
+"""
+
+import re
+import threading
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from context_packing import TokenCounter
+
+# Fin de phrase suivie d'un début de phrase, ou saut de paragraphe
+# (les simples retours à la ligne des PDF coupent les phrases en plein milieu)
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?…:])\s+(?=[A-ZÀ-ÖØ-Þ«\"(•\-–0-9])|\n\s*\n")
+# Phrases non contiguës dans le passage compressé
+GAP_MARKER = " […] "
+
+
+def split_sentences(text: str, min_chars: int = 40) -> List[str]:
+    """
+    Découpe un texte en phrases (espaces normalisés). Les fragments plus
+    courts que min_chars (titres, puces) sont rattachés à la phrase suivante.
+    """
+    sentences, pending = [], ""
+    for part in _SENTENCE_BREAK.split(text):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        pending = f"{pending} {part}" if pending else part
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences:
+            sentences[-1] += " " + pending
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+class ContextCompressor:
+    """
+    Garde les phrases les plus proches de la question. Partagé par toutes
+    les sessions (compteurs protégés par un verrou).
+
+    embeddings: cache d'embeddings des phrases (QueryEmbeddingCache dédié,
+    devant le modèle utilisé pour les questions).
+    """
+
+    def __init__(self, embeddings, counter: TokenCounter, max_sentences: int = 6, min_chars: int = 40):
+        self.embeddings = embeddings
+        self.counter = counter
+        self.max_sentences = max_sentences
+        self.min_chars = min_chars
+
+        self.calls = 0
+        self.sentences_total = 0
+        self.sentences_kept = 0
+        self.tokens_original = 0
+        self.tokens_kept = 0
+        self._lock = threading.Lock()
+
+    def _similarities(self, query_vector, sentences: List[str]) -> np.ndarray:
+        vectors = self.embeddings.embed_passages(sentences)
+        query = np.asarray(query_vector, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        return vectors @ query / np.maximum(norms, 1e-12)
+
+    def compress(self, query_vector, passages: List[Document]) -> List[Document]:
+        """
+        Réduit les passages à leurs phrases les plus proches de la question.
+
+        Args:
+            query_vector: Vecteur de la question (celui de la recherche FAISS)
+            passages: Passages du contexte (sortie de pack_context)
+
+        Returns:
+            Passages compressés, dans le même ordre et avec les mêmes
+            métadonnées (les passages sans phrase retenue sont retirés)
+        """
+        split = [split_sentences(passage.page_content, self.min_chars) for passage in passages]
+        flat = [(p, s) for p, sentences in enumerate(split) for s in range(len(sentences))]
+
+        if len(flat) <= self.max_sentences:
+            kept = set(flat)
+        else:
+            similarities = self._similarities(query_vector, [split[p][s] for p, s in flat])
+            best = np.argsort(-similarities, kind='stable')[:self.max_sentences]
+            kept = {flat[i] for i in best.tolist()}
+
+        compressed = []
+        for p, (passage, sentences) in enumerate(zip(passages, split)):
+            text, previous = "", None
+            for s, sentence in enumerate(sentences):
+                if (p, s) not in kept:
+                    continue
+                if text:
+                    text += " " if previous == s - 1 else GAP_MARKER
+                text += sentence
+                previous = s
+            if text:
+                compressed.append(Document(page_content=text, metadata=passage.metadata))
+
+        original_tokens = sum(self.counter.count(passage.page_content) for passage in passages)
+        kept_tokens = sum(self.counter.count(passage.page_content) for passage in compressed)
+        with self._lock:
+            self.calls += 1
+            self.sentences_total += len(flat)
+            self.sentences_kept += len(kept)
+            self.tokens_original += original_tokens
+            self.tokens_kept += kept_tokens
+        return compressed
+
+    def stats(self) -> Dict:
+        """
+        Phrases et tokens gardés par rapport au contexte non compressé.
+        """
+        with self._lock:
+            return {
+                "contexts": self.calls,
+                "sentences_kept": self.sentences_kept,
+                "sentences_total": self.sentences_total,
+                "tokens_kept": self.tokens_kept,
+                "tokens_original": self.tokens_original,
+                "token_ratio": round(self.tokens_kept / self.tokens_original, 3) if self.tokens_original else 1.0,
+            }
@@ -0,0 +1,166 @@
+"""
+Construction du contexte envoyé au LLM à partir des chunks retenus.
+
+Les chunks du HybridRetriever (du plus pertinent au moins pertinent, score
+de fusion dans metadata["fusion_score"]) sont:
+- filtrés: un chunk dont le score est inférieur à min_score x le meilleur
+  score est écarté, au lieu d'envoyer toujours k chunks. Avec la fusion RRF
+  (poids alpha pour FAISS, 1 - alpha pour BM25, rang + 60 au dénominateur),
+  un chunk trouvé par une seule recherche au rang r vaut au plus
+  poids x 60 / (r + 60) fois un chunk classé premier par les deux: pour
+  garder les chunks de chaque recherche, min_score doit rester sous
+  min(alpha, 1 - alpha) x 60 / (60 + rang maximal), soit 0.358 avec alpha =
+  0.6 et 8 candidats par recherche. Après un
+  re-classement par le cross-encoder (metadata["rerank_score"]), l'ordre ne
+  suit plus les scores de fusion: aucun chunk n'est écarté sur ce seuil;
+- fusionnés: les chunks d'une même page qui se chevauchent (start_index
+  enregistré par le découpeur) forment un seul passage, sans le texte
+  répété du chevauchement; les doublons exacts sont supprimés;
+- ajoutés dans l'ordre des scores tant que le budget de tokens le permet.
+
+Les tokens sont comptés avec tiktoken. Sans l'encodage en cache local (pas
+de réseau), ils sont estimés à 4 caractères par token.
+"""
+
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+SCORE_KEY = "fusion_score"
+RERANK_SCORE_KEY = "rerank_score"
+
+
+class TokenCounter:
+    """
+    Compte et tronque en tokens (encodage tiktoken chargé à la première
+    utilisation).
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        import tiktoken
+                        self._encoding = tiktoken.get_encoding(self.encoding_name)
+                    except Exception:
+                        # Encodage indisponible hors ligne: estimation
+                        self._encoding = None
+                    self._loaded = True
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return math.ceil(len(text) / self.CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Début du texte tenant en max_tokens tokens.
+        """
+        if self.encoding is None:
+            return text[:max_tokens * self.CHARS_PER_TOKEN]
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _page_key(metadata: Dict) -> Tuple:
+    return (metadata.get("source_url") or metadata.get("source"), metadata.get("page"))
+
+
+def merge_neighbors(docs: List[Document]) -> List[Document]:
+    """
+    Fusionne les chunks d'une même page qui se chevauchent et supprime les
+    doublons exacts.
+
+    Returns:
+        Passages dans l'ordre de leur chunk le mieux classé (score de fusion
+        du meilleur chunk, start_index du premier)
+    """
+    pages: Dict[Tuple, List[Tuple[int, Document]]] = {}
+    for rank, doc in enumerate(docs):
+        pages.setdefault(_page_key(doc.metadata), []).append((rank, doc))
+
+    passages = []  # (meilleur rang, fin, texte, métadonnées)
+    for chunks in pages.values():
+        chunks.sort(key=lambda item: item[1].metadata.get("start_index", -1))
+        current: Optional[list] = None
+        for rank, doc in chunks:
+            start = doc.metadata.get("start_index")
+            text = doc.page_content
+            if current is not None and start is not None and current[1] is not None and start <= current[1]:
+                # Chevauchement: seul le texte au-delà de la fin du passage est ajouté
+                current[2] += text[current[1] - start:]
+                current[1] = max(current[1], start + len(text))
+                current[0] = min(current[0], rank)
+                score = doc.metadata.get(SCORE_KEY)
+                if score is not None:
+                    current[3][SCORE_KEY] = max(current[3].get(SCORE_KEY, score), score)
+                continue
+            current = [rank, start + len(text) if start is not None else None, text, dict(doc.metadata)]
+            passages.append(current)
+
+    passages.sort(key=lambda passage: passage[0])
+    merged, seen = [], set()
+    for _, _, text, metadata in passages:
+        if text in seen:
+            continue
+        seen.add(text)
+        merged.append(Document(page_content=text, metadata=metadata))
+    return merged
+
+
+def pack_context(
+    docs: List[Document],
+    max_tokens: int,
+    counter: TokenCounter,
+    min_score: float = 0.0,
+    separator: str = "\n\n"
+) -> Tuple[str, List[Document]]:
+    """
+    Construit le contexte dans le budget de tokens.
+
+    Args:
+        docs: Chunks retenus, du plus pertinent au moins pertinent
+        max_tokens: Budget de tokens du contexte
+        counter: Compteur de tokens
+        min_score: Score de fusion minimal, relatif au meilleur (0 = tous les
+            chunks; ignoré si les chunks ont été re-classés)
+        separator: Séparateur des passages
+
+    Returns:
+        Tuple (contexte, passages utilisés)
+    """
+    scores = [doc.metadata[SCORE_KEY] for doc in docs if SCORE_KEY in doc.metadata]
+    reranked = any(RERANK_SCORE_KEY in doc.metadata for doc in docs)
+    if scores and min_score > 0 and not reranked:
+        threshold = min_score * max(scores)
+        docs = [doc for doc in docs if doc.metadata.get(SCORE_KEY, threshold) >= threshold]
+
+    used, tokens = [], 0
+    separator_tokens = counter.count(separator)
+    for passage in merge_neighbors(docs):
+        cost = counter.count(passage.page_content) + (separator_tokens if used else 0)
+        if tokens + cost <= max_tokens:
+            used.append(passage)
+            tokens += cost
+        elif not used:
+            # Premier passage plus long que le budget: tronqué plutôt qu'un contexte vide
+            text = counter.truncate(passage.page_content, max_tokens)
+            used.append(Document(page_content=text, metadata=passage.metadata))
+            tokens = counter.count(text)
+    return separator.join(passage.page_content for passage in used), used
@@ -0,0 +1,383 @@
+"""
+Caches d'embeddings: cache disque des chunks pour l'ingestion et cache
+mémoire des requêtes pour l'application.
+
+Évite de ré-encoder avec sentence-camembert-large un texte déjà vu
+(nouvelle exécution de ingest.py, essais de CHUNK_SIZE / CHUNK_OVERLAP...).
+Les vecteurs sont stockés dans un tableau float32 mappé en mémoire et ne
+sont lus que ligne par ligne ; seul l'index des clés est chargé en RAM.
+
+Structure d'un cache (un sous-dossier par couple modèle / normalisation):
+    <cache_dir>/<espace>/vectors.f32   vecteurs bruts (capacité x dimension)
+    <cache_dir>/<espace>/slots.sha256  sha256 du texte de chaque ligne (capacité x 32 octets)
+    <cache_dir>/<espace>/keys.json     {sha256 du texte: [ligne, dernier usage]}
+
+keys.json n'est réécrit que par save() (toutes les save_every requêtes de
+CachedEmbeddings et en fin d'ingestion), pas à chaque lot. Une ligne évincée
+puis réutilisée peut donc encore figurer sous son ancienne clé dans
+keys.json si le processus s'arrête avant save(): le sha256 de chaque ligne
+est écrit avant son vecteur et vérifié à la lecture, une ligne réutilisée
+n'est jamais servie pour l'ancien texte.
+
+Côté application, QueryEmbeddingCache garde en mémoire les vecteurs des
+dernières questions posées (les patients posent souvent les mêmes): une
+question déjà vue ne repasse pas par le modèle.
+"""
+
+import os
+import json
+import hashlib
+import heapq
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCache:
+    """
+    Cache persistant (modèle, normalisation, sha256 du texte) -> vecteur.
+
+    Le nombre d'entrées est plafonné à max_entries ; au-delà, les entrées
+    utilisées le moins récemment sont évincées et leurs lignes réutilisées.
+    max_entries <= 0 désactive le cache (aucune lecture ni écriture).
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str, normalize: bool, max_entries: int = 100_000):
+        namespace = hashlib.sha256(f"{model_name}|normalize={normalize}".encode('utf-8')).hexdigest()[:16]
+        self.directory = Path(cache_dir) / namespace
+        self.model_name = model_name
+        self.normalize = normalize
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors_file = self.directory / "vectors.f32"
+        self._slots_file = self.directory / "slots.sha256"
+        self._keys_file = self.directory / "keys.json"
+        self._vectors = None
+        self._slots = None
+        self._dirty = False
+
+        if self._keys_file.exists():
+            with open(self._keys_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.dim = state["dim"]
+            self._capacity = state["capacity"]
+            self._clock = state["clock"]
+            self._entries = state["entries"]
+            tagged = self._slots_file.exists()
+            self._open_vectors()
+            if not tagged:
+                # Cache antérieur aux empreintes de lignes: index des clés supposé exact
+                for key, (slot, _) in self._entries.items():
+                    self._slots[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+        else:
+            self.dim = None
+            self._capacity = 0
+            self._clock = 0
+            self._entries = {}
+
+        used_slots = {slot for slot, _ in self._entries.values()}
+        self._free_slots = [slot for slot in range(self._capacity) if slot not in used_slots]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        """
+        Clé d'un texte dans le cache.
+        """
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _open_vectors(self):
+        self._vectors = np.memmap(self._vectors_file, dtype=np.float32, mode='r+', shape=(self._capacity, self.dim))
+        if not self._slots_file.exists() or self._slots_file.stat().st_size < self._capacity * 32:
+            with open(self._slots_file, 'ab') as f:
+                f.truncate(self._capacity * 32)
+        self._slots = np.memmap(self._slots_file, dtype=np.uint8, mode='r+', shape=(self._capacity, 32))
+
+    def _grow(self, needed: int):
+        """
+        Agrandit le fichier de vecteurs (doublement, borné par max_entries).
+        """
+        new_capacity = min(max(needed, self._capacity * 2, 1024), self.max_entries)
+        if new_capacity <= self._capacity:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._slots.flush()
+            self._vectors = None
+            self._slots = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._vectors_file, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._free_slots.extend(range(self._capacity, new_capacity))
+        self._capacity = new_capacity
+        self._open_vectors()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Recherche les vecteurs des textes donnés.
+
+        Returns:
+            Liste alignée sur texts: vecteur (copie) ou None si absent
+        """
+        if not self.enabled:
+            self.misses += len(texts)
+            return [None] * len(texts)
+        self._clock += 1
+        results = []
+        for text in texts:
+            key = self.text_key(text)
+            entry = self._entries.get(key)
+            if entry is not None and bytes(self._slots[entry[0]]) != bytes.fromhex(key):
+                # Ligne réutilisée par un autre texte avant un arrêt brutal
+                self._free_slots.append(entry[0])
+                del self._entries[key]
+                self._dirty = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                entry[1] = self._clock
+                self._dirty = True
+                results.append(np.array(self._vectors[entry[0]]))
+        return results
+
+    def put_many(self, texts: List[str], vectors):
+        """
+        Ajoute des vecteurs au cache, en évinçant les entrées les moins
+        récemment utilisées si le plafond est atteint.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0 or not self.enabled:
+            return
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+
+        self._clock += 1
+        pending = {}
+        for text, vector in zip(texts, vectors):
+            key = self.text_key(text)
+            if key in self._entries:
+                self._entries[key][1] = self._clock
+            else:
+                pending[key] = vector
+        if not pending:
+            return
+
+        # Les plus anciens de ce lot sont ignorés s'il dépasse à lui seul le plafond
+        if len(pending) > self.max_entries:
+            pending = dict(list(pending.items())[-self.max_entries:])
+
+        if len(self._free_slots) < len(pending) and self._capacity < self.max_entries:
+            self._grow(len(self._entries) + len(pending))
+
+        shortage = len(pending) - len(self._free_slots)
+        if shortage > 0:
+            evicted = heapq.nsmallest(shortage, self._entries.items(), key=lambda item: item[1][1])
+            for key, (slot, _) in evicted:
+                del self._entries[key]
+                self._free_slots.append(slot)
+
+        for key, vector in pending.items():
+            slot = self._free_slots.pop()
+            # Empreinte avant le vecteur: l'ancienne clé de la ligne est invalidée d'abord
+            self._slots[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+            self._vectors[slot] = vector
+            self._entries[key] = [slot, self._clock]
+        self._dirty = True
+
+    def save(self):
+        """
+        Écrit les vecteurs sur disque puis l'index des clés (écriture atomique).
+        """
+        if not self._dirty:
+            return
+        if self._vectors is not None:
+            self._slots.flush()
+            self._vectors.flush()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_file = self._keys_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "model_name": self.model_name,
+                "normalize": self.normalize,
+                "dim": self.dim,
+                "capacity": self._capacity,
+                "clock": self._clock,
+                "entries": self._entries,
+            }, f)
+        os.replace(tmp_file, self._keys_file)
+        self._dirty = False
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings LangChain lisant et écrivant dans un EmbeddingCache.
+    Seuls les textes absents du cache sont encodés par le modèle sous-jacent.
+
+    L'index des clés est écrit toutes les save_every requêtes (sa taille croît
+    avec le cache); appeler save() à la fin du traitement.
+    """
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache, save_every: int = 50):
+        self.base = base
+        self.cache = cache
+        self.save_every = save_every
+        self._calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+
+        if missing:
+            # Les doublons au sein d'un même appel ne sont encodés qu'une fois
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = self.base.embed_documents(unique_texts)
+            by_text = dict(zip(unique_texts, encoded))
+            for i in missing:
+                cached[i] = by_text[texts[i]]
+            self.cache.put_many(unique_texts, encoded)
+
+        self._calls += 1
+        if self._calls % self.save_every == 0:
+            self.cache.save()
+
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in cached]
+
+    def save(self):
+        """
+        Écrit le cache sur disque (vecteurs, index des clés et dates de
+        dernier usage des hits pour l'éviction LRU).
+        """
+        self.cache.save()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+
+class QueryEmbeddingCache(Embeddings):
+    """
+    Cache mémoire LRU texte de requête normalisé -> vecteur, devant le modèle
+    d'embeddings. Partagé par toutes les sessions (accès protégés par un verrou).
+
+    La normalisation (Unicode NFC, espaces superflus) ne change pas le texte
+    encodé au-delà des espaces: le modèle reçoit la requête normalisée.
+    """
+
+    def __init__(self, base: Embeddings, max_entries: int = 1024):
+        self.base = base
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def normalize_query(text: str) -> str:
+        """
+        Clé d'une requête dans le cache.
+        """
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector.tolist()
+            self.misses += 1
+
+        # Encodage hors du verrou (les autres sessions ne sont pas bloquées)
+        vector = np.asarray(self.base.embed_query(key), dtype=np.float32)
+        with self._lock:
+            if self.max_entries > 0:
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return vector.tolist()
+
+    def _embed_many(self, texts: List[str], encode: Callable[[List[str]], List[List[float]]]) -> np.ndarray:
+        """
+        Vecteurs de plusieurs textes (matrice float32), en un seul passage par
+        le cache: seuls les textes absents sont transmis à encode.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        keys = [self.normalize_query(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    vectors[key] = vector
+                else:
+                    self.misses += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing:
+            encoded = np.asarray(encode(missing), dtype=np.float32)
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    vectors[key] = vector
+                    if self.max_entries > 0:
+                        self._entries[key] = vector
+                        self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return np.stack([vectors[key] for key in keys])
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Vecteurs de plusieurs requêtes. Les requêtes absentes du cache sont
+        encodées une par une avec embed_query, comme une question isolée:
+        embed_documents (lots complétés par du padding, sans préfixe ni
+        instruction de requête) donnerait des vecteurs différents pour
+        certains modèles.
+        """
+        return self._embed_many(texts, lambda keys: [self.base.embed_query(key) for key in keys])
+
+    def embed_passages(self, texts: List[str]) -> np.ndarray:
+        """
+        Vecteurs de plusieurs passages (phrases du contexte), encodés par lots
+        avec embed_documents comme les chunks de l'index. Un même cache ne
+        doit servir qu'à des requêtes ou qu'à des passages.
+        """
+        return self._embed_many(texts, self.base.embed_documents)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def stats(self) -> Dict:
+        """
+        Compteurs du cache (pour le dimensionner).
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -10,17 +10,37 @@ pour créer une base de connaissances stricte (pas d'hallucinations).
 
 import os
 import sys
+import json
+import argparse
+import asyncio
+import hashlib
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 import pickle
+import shutil
+
+import faiss
+import numpy as np
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, WebBaseLoader
-from langchain_community.vectorstores import FAISS
+import requests
+from bs4 import BeautifulSoup
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.document_loaders.web_base import default_header_template
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
 from dotenv import load_dotenv
 
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from chunk_store import ChunkStore, ChunkStoreWriter, replace_directory
+from bm25_index import BM25Index, build_bm25_index, build_bm25_partition
+from metadata_filters import build_filter_bitmaps
+
 # Chargement des variables d'environnement
 load_dotenv()
 
@@ -30,13 +50,67 @@ load_dotenv()
 
 PDF_DIR = Path("data/pdfs")
 VECTOR_STORE_DIR = Path("vector_store")
+INDEX_FILE = VECTOR_STORE_DIR / "index.faiss"
+CHUNK_STORE_DIR = VECTOR_STORE_DIR / "chunks"
+BM25_DIR = VECTOR_STORE_DIR / "bm25"
+VECTORS_FILE = VECTOR_STORE_DIR / "vectors.npy"
+INDEX_INFO_FILE = VECTOR_STORE_DIR / "index_info.json"
+PARTITIONS_DIR = VECTOR_STORE_DIR / "partitions"
+FILTERS_DIR = VECTOR_STORE_DIR / "filters"
+
+# Fichiers de l'ancien format (docstore FAISS picklé + chunks picklés pour BM25)
+LEGACY_FILES = ("index.pkl", "chunks.pkl")
 
 # Configuration pour chunking optimisé
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
 
+# Manifeste de l'ingestion incrémentale (hash des sources -> IDs des chunks)
+MANIFEST_FILE = VECTOR_STORE_DIR / "manifest.json"
+
+# Checkpoints de l'ingestion en flux (reprise après interruption)
+CHECKPOINT_DIR = VECTOR_STORE_DIR / ".checkpoint"
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+# Nombre de processus pour l'extraction des PDFs (1 = mode séquentiel)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+
+# Scraping web: requêtes simultanées et cache HTTP local (ETag / Last-Modified)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "4"))
+WEB_CACHE_DIR = Path(os.getenv("WEB_CACHE_DIR", "data/web_cache"))
+WEB_TIMEOUT = 30
+
 # Modèle d'embeddings français
 EMBEDDING_MODEL = "dangvantuan/sentence-camembert-large"
+NORMALIZE_EMBEDDINGS = True
+
+# Encodage par lots de chunks de longueurs voisines (moins de padding)
+ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "32"))
+
+# Cache disque des embeddings (évite de ré-encoder un texte déjà vu)
+EMBEDDING_CACHE_DIR = Path(os.getenv("EMBEDDING_CACHE_DIR", "cache/embeddings"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+# Type d'index de recherche vectorielle (Flat = exact, les autres = ANN)
+INDEX_SPECS = ("Flat", "HNSW", "IVF-Flat", "IVF-PQ")
+INDEX_SPEC = os.getenv("INDEX_SPEC", "Flat")
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 8
+PQ_M = 64
+
+# Précision des vecteurs dans l'index (float16 / int8: quantification scalaire)
+VECTOR_PRECISIONS = ("float32", "float16", "int8")
+VECTOR_PRECISION = os.getenv("VECTOR_PRECISION", "float32")
+
+# Index approximatif en distance (float16, int8, PQ): les k * RESCORE_FACTOR
+# meilleurs candidats sont re-classés avec les vecteurs exacts (0 = désactivé)
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+
+# Vecteurs lus et ajoutés à l'index par blocs (mémoire bornée), et nombre
+# maximum de vecteurs d'entraînement des index IVF
+VECTOR_BLOCK_SIZE = 65536
+TRAIN_SAMPLE_SIZE = 65536
 
 # URLs des pages web à scraper par maladie (URLs CORRIGÉES - Janvier 2026)
 WEB_URLS = {
@@ -96,23 +170,100 @@ def detect_procedure_from_folder(folder_name: str) -> str:
     return procedure_mapping.get(folder_lower, folder_name.replace("_", " ").title())
 
 
-def load_pdfs_recursive(base_directory: Path) -> List[Document]:
+def _extract_pdf(pdf_path: str) -> Tuple[List[Document], Optional[str]]:
     """
-    Charge tous les PDFs de manière récursive depuis les sous-dossiers.
+    Extrait les pages d'un PDF (exécuté dans un processus du pool en mode parallèle).
+    
+    Les exceptions sont capturées ici pour qu'un fichier défaillant ne casse
+    pas le pool : l'erreur est renvoyée au processus principal qui la rapporte.
+    
+    Args:
+        pdf_path: Chemin du fichier PDF
+        
+    Returns:
+        Tuple (pages chargées, message d'erreur ou None)
+    """
+    try:
+        return PyPDFLoader(pdf_path).load(), None
+    except Exception as e:
+        return [], str(e)
+
+
+def _extract_pdf_isolated(pdf_path: str) -> Tuple[List[Document], Optional[str]]:
+    """
+    Extrait un PDF dans un processus dédié: si ce processus meurt (segfault,
+    mémoire...), seul ce fichier est perdu.
+    """
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(_extract_pdf, pdf_path).result()
+        except BrokenProcessPool:
+            return [], "processus d'extraction arrêté brutalement (segfault, mémoire...)"
+
+
+def _extract_pdfs_parallel(pdf_files: List[Path], workers: int) -> Iterator[Tuple[List[Document], Optional[str]]]:
+    """
+    Extrait les PDFs sur un pool de processus et renvoie leurs résultats dans
+    l'ordre de pdf_files, indépendamment de l'ordre de fin des processus.
+    
+    Seuls 2 x workers fichiers sont soumis à la fois (mémoire bornée). Si un
+    processus meurt, le pool entier est cassé et tous les fichiers en cours
+    échouent avec lui (BrokenProcessPool): ceux-ci sont ré-extraits un par un
+    dans un processus dédié, ce qui isole le fichier fautif, puis un nouveau
+    pool reprend les fichiers restants.
+    """
+    tasks = iter(pdf_files)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    
+    def fill():
+        while len(pending) < 2 * workers:
+            pdf_file = next(tasks, None)
+            if pdf_file is None:
+                return
+            pending.append((pdf_file, executor.submit(_extract_pdf, str(pdf_file))))
+    
+    try:
+        fill()
+        while pending:
+            pdf_file, future = pending.popleft()
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                retry = [pdf_file] + [queued for queued, _ in pending]
+                pending.clear()
+                executor.shutdown(wait=True, cancel_futures=True)
+                print(f"      ⚠️ Un processus d'extraction s'est arrêté brutalement: "
+                      f"{len(retry)} fichier(s) en cours ré-extrait(s) un par un")
+                for queued in retry:
+                    yield _extract_pdf_isolated(str(queued))
+                executor = ProcessPoolExecutor(max_workers=workers)
+                fill()
+                continue
+            except Exception as e:
+                result = ([], str(e))
+            fill()
+            yield result
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def find_pdf_files(base_directory: Path) -> List[Tuple[Path, str, str]]:
+    """
+    Liste les PDFs à ingérer, sous-dossier par sous-dossier.
     Chaque sous-dossier représente une maladie/procédure.
     
     Args:
         base_directory: Chemin vers le dossier racine contenant les sous-dossiers
         
     Returns:
-        Liste de documents LangChain avec métadonnées enrichies
+        Liste ordonnée de tuples (fichier PDF, procédure, nom du dossier)
     """
     if not base_directory.exists():
         print(f"❌ Erreur: Le dossier {base_directory} n'existe pas.")
         print(f"   Structure attendue: data/pdfs/maladie/*.pdf")
         sys.exit(1)
     
-    all_documents = []
     subdirs = [d for d in base_directory.iterdir() if d.is_dir()]
     
     if not subdirs:
@@ -122,6 +273,8 @@ def load_pdfs_recursive(base_directory: Path) -> List[Document]:
     
     print(f"\n📁 Dossiers détectés: {len(subdirs)}")
     
+    pdf_tasks = []
+    
     for subdir in subdirs:
         procedure_name = detect_procedure_from_folder(subdir.name) if subdir != base_directory else "Radiologie interventionnelle"
         pdf_files = list(subdir.glob("*.pdf"))
@@ -135,28 +288,87 @@ def load_pdfs_recursive(base_directory: Path) -> List[Document]:
         print(f"   Fichiers: {len(pdf_files)} PDF(s)")
         
         for pdf_file in pdf_files:
-            print(f"   📖 Chargement: {pdf_file.name}")
-            try:
-                loader = PyPDFLoader(str(pdf_file))
-                documents = loader.load()
-                
-                # Ajout de métadonnées enrichies
-                for doc in documents:
-                    doc.metadata.update({
-                        "source_file": pdf_file.name,
-                        "source_type": "pdf",
-                        "procedure": procedure_name,
-                        "folder": subdir.name,
-                        "type": "document_patient",
-                        "langue": "français"
-                    })
-                
-                all_documents.extend(documents)
-                print(f"      ✅ {len(documents)} page(s) chargée(s)")
-                
-            except Exception as e:
-                print(f"      ⚠️ Erreur: {e}")
+            pdf_tasks.append((pdf_file, procedure_name, subdir.name))
+    
+    return pdf_tasks
+
+
+def iter_pdf_documents(
+    pdf_tasks: List[Tuple[Path, str, str]],
+    workers: int = None
+) -> Iterator[Document]:
+    """
+    Extrait les pages des PDFs une à une, dans l'ordre de pdf_tasks.
+    
+    Avec workers > 1, l'extraction est répartie sur un pool de processus.
+    Seuls quelques fichiers sont en cours à un instant donné, de sorte que la
+    mémoire ne dépend pas du nombre total de PDFs.
+    Un processus d'extraction qui meurt ne fait perdre que son propre fichier.
+    
+    Args:
+        pdf_tasks: Fichiers à extraire, tels que renvoyés par find_pdf_files()
+        workers: Nombre de processus d'extraction (défaut: INGEST_WORKERS)
+        
+    Yields:
+        Pages avec métadonnées enrichies
+    """
+    workers = INGEST_WORKERS if workers is None else workers
+    
+    if workers > 1 and len(pdf_tasks) > 1:
+        print(f"\n⚡ Extraction parallèle: {len(pdf_tasks)} PDF(s) sur {workers} processus")
+        results = _extract_pdfs_parallel([pdf_file for pdf_file, _, _ in pdf_tasks], workers)
+    else:
+        results = (_extract_pdf(str(pdf_file)) for pdf_file, _, _ in pdf_tasks)
+    
+    try:
+        for (pdf_file, procedure_name, folder), (documents, error) in zip(pdf_tasks, results):
+            print(f"   📖 Chargement: {folder}/{pdf_file.name}")
+            if error is not None:
+                print(f"      ⚠️ Erreur: {error}")
                 continue
+            
+            # Ajout de métadonnées enrichies
+            for doc in documents:
+                doc.metadata.update({
+                    "source_file": pdf_file.name,
+                    "source_type": "pdf",
+                    "procedure": procedure_name,
+                    "folder": folder,
+                    "type": "document_patient",
+                    "langue": "français"
+                })
+            
+            print(f"      ✅ {len(documents)} page(s) chargée(s)")
+            yield from documents
+    finally:
+        # Arrête le pool si l'appelant s'interrompt avant la fin
+        results.close()
+
+
+def load_pdfs_recursive(
+    base_directory: Path,
+    workers: int = None,
+    pdf_tasks: List[Tuple[Path, str, str]] = None
+) -> List[Document]:
+    """
+    Charge tous les PDFs de manière récursive depuis les sous-dossiers.
+    Chaque sous-dossier représente une maladie/procédure.
+    
+    Avec workers > 1, l'extraction est répartie sur un pool de processus ;
+    l'ordre des documents reste identique à celui du mode séquentiel.
+    
+    Args:
+        base_directory: Chemin vers le dossier racine contenant les sous-dossiers
+        workers: Nombre de processus d'extraction (défaut: INGEST_WORKERS)
+        pdf_tasks: Sous-ensemble de find_pdf_files() à charger (défaut: tous)
+        
+    Returns:
+        Liste de documents LangChain avec métadonnées enrichies
+    """
+    if pdf_tasks is None:
+        pdf_tasks = find_pdf_files(base_directory)
+    
+    all_documents = list(iter_pdf_documents(pdf_tasks, workers))
     
     if not all_documents:
         print("\n⚠️ Aucun document PDF n'a pu être chargé.")
@@ -167,57 +379,198 @@ def load_pdfs_recursive(base_directory: Path) -> List[Document]:
     return all_documents
 
 
-def scrape_website() -> List[Document]:
+def _web_cache_file(cache_dir: Path, url: str) -> Path:
+    """
+    Chemin du fichier de cache associé à une URL.
+    """
+    return cache_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]}.json"
+
+
+def _parse_web_page(html: str, url: str) -> List[Document]:
+    """
+    Extrait le texte et les métadonnées d'une page HTML
+    (même résultat que WebBaseLoader avec ses paramètres par défaut).
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    metadata = {"source": url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html_tag := soup.find("html"):
+        metadata["language"] = html_tag.get("lang", "No language found.")
+    return [Document(page_content=soup.get_text(), metadata=metadata)]
+
+
+def _fetch_web_page(url: str, cache_dir: Path) -> Tuple[List[Document], bool]:
+    """
+    Télécharge une page en revalidant la copie en cache.
+    
+    Si une copie existe, la requête est conditionnelle (If-None-Match /
+    If-Modified-Since) : une réponse 304 réutilise le texte déjà extrait,
+    sans téléchargement ni parsing.
+    
+    Args:
+        url: URL de la page
+        cache_dir: Dossier du cache HTTP
+        
+    Returns:
+        Tuple (documents extraits, True si servi depuis le cache)
+    """
+    cache_file = _web_cache_file(cache_dir, url)
+    cached = None
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = None
+    
+    headers = dict(default_header_template)
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    
+    response = requests.get(url, headers=headers, timeout=WEB_TIMEOUT)
+    
+    if response.status_code == 304 and cached:
+        documents = [
+            Document(page_content=d["page_content"], metadata=d["metadata"])
+            for d in cached["documents"]
+        ]
+        return documents, True
+    
+    response.raise_for_status()
+    response.encoding = response.apparent_encoding
+    documents = _parse_web_page(response.text, url)
+    
+    # Écriture atomique pour ne jamais laisser un fichier de cache tronqué
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "documents": [
+                {"page_content": d.page_content, "metadata": d.metadata}
+                for d in documents
+            ],
+        }, f, ensure_ascii=False)
+    os.replace(tmp_file, cache_file)
+    
+    return documents, False
+
+
+async def _fetch_all_pages(urls: Dict[str, str], cache_dir: Path, max_concurrency: int) -> list:
+    """
+    Télécharge toutes les pages avec au plus max_concurrency requêtes simultanées.
+    
+    Returns:
+        Résultats dans l'ordre de urls: (documents, depuis_cache) ou l'exception levée
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def fetch(url):
+        async with semaphore:
+            return await asyncio.to_thread(_fetch_web_page, url, cache_dir)
+    
+    return await asyncio.gather(*(fetch(url) for url in urls.values()), return_exceptions=True)
+
+
+def scrape_website(
+    urls: Dict[str, str] = None,
+    cache_dir: Path = None,
+    max_concurrency: int = None
+) -> List[Document]:
     """
     Scrape toutes les pages pertinentes du site laradiologiequisoigne.fr
     
+    Les pages sont téléchargées en parallèle (nombre de requêtes borné) et
+    revalidées via le cache HTTP local : une page inchangée coûte un 304.
+    
+    Args:
+        urls: Pages à scraper {clé procédure: url} (défaut: WEB_URLS)
+        cache_dir: Dossier du cache HTTP (défaut: WEB_CACHE_DIR)
+        max_concurrency: Requêtes simultanées maximum (défaut: WEB_CONCURRENCY)
+    
     Returns:
         Liste de documents web avec métadonnées
     """
+    urls = WEB_URLS if urls is None else urls
+    cache_dir = WEB_CACHE_DIR if cache_dir is None else cache_dir
+    max_concurrency = WEB_CONCURRENCY if max_concurrency is None else max_concurrency
+    
     print(f"\n🌐 Scraping du site web: laradiologiequisoigne.fr")
-    print(f"   Pages à scraper: {len(WEB_URLS)} (10 maladies + 4 pages générales)")
+    print(f"   Pages à scraper: {len(urls)} ({max_concurrency} requêtes simultanées)")
+    
+    results = asyncio.run(_fetch_all_pages(urls, cache_dir, max_concurrency))
     
     web_documents = []
+    cache_hits = 0
     
-    for procedure_key, url in WEB_URLS.items():
+    for (procedure_key, url), result in zip(urls.items(), results):
         print(f"\n   🔗 {procedure_key}: {url}")
-        try:
-            loader = WebBaseLoader(url)
-            docs = loader.load()
-            
-            # Détection de la procédure
-            procedure_name = detect_procedure_from_folder(procedure_key)
-            
-            for doc in docs:
-                # Nettoyage du contenu web (enlever navigation, footer, etc.)
-                content = doc.page_content
-                
-                # Ajout de métadonnées
-                doc.metadata.update({
-                    "source_url": url,
-                    "source_type": "web",
-                    "source_name": "laradiologiequisoigne.fr",
-                    "procedure": procedure_name,
-                    "type": "information_generale",
-                    "langue": "français"
-                })
-            
-            web_documents.extend(docs)
-            print(f"      ✅ Contenu récupéré ({len(docs[0].page_content)} caractères)")
-            
-        except Exception as e:
-            print(f"      ⚠️ Erreur lors du scraping: {e}")
+        if isinstance(result, BaseException):
+            print(f"      ⚠️ Erreur lors du scraping: {result}")
             continue
+        
+        docs, from_cache = result
+        cache_hits += from_cache
+        
+        # Détection de la procédure
+        procedure_name = detect_procedure_from_folder(procedure_key)
+        
+        for doc in docs:
+            # Ajout de métadonnées
+            doc.metadata.update({
+                "source_url": url,
+                "source_type": "web",
+                "source_name": "laradiologiequisoigne.fr",
+                "procedure": procedure_name,
+                "type": "information_generale",
+                "langue": "français"
+            })
+        
+        web_documents.extend(docs)
+        status = "inchangé (304, cache)" if from_cache else "téléchargé"
+        print(f"      ✅ Contenu {status} ({len(docs[0].page_content)} caractères)")
     
     if not web_documents:
         print("\n⚠️ Aucune page web n'a pu être scrapée.")
         print("   Le système continuera avec les PDFs uniquement.")
     else:
-        print(f"\n✅ Total Web: {len(web_documents)} page(s) scrapée(s)")
+        print(f"\n✅ Total Web: {len(web_documents)} page(s) scrapée(s), {cache_hits} depuis le cache")
     
     return web_documents
 
 
+def _make_text_splitter(chunk_size: int = None, chunk_overlap: int = None) -> RecursiveCharacterTextSplitter:
+    """
+    Découpeur utilisé pour tous les documents (PDF et web).
+    CHUNK_SIZE / CHUNK_OVERLAP par défaut (autres valeurs: bench_retrieval.py).
+    """
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE if chunk_size is None else chunk_size,
+        chunk_overlap=CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", "! ", "? ", ", ", " ", ""],
+        add_start_index=True
+    )
+
+
+def iter_chunks(documents: Iterable[Document]) -> Iterator[Document]:
+    """
+    Découpe les documents au fil de l'eau, document par document.
+    Produit les mêmes chunks, dans le même ordre, que split_documents().
+    """
+    text_splitter = _make_text_splitter()
+    for doc in documents:
+        yield from text_splitter.split_documents([doc])
+
+
 def split_documents(documents: List[Document]) -> List[Document]:
     """
     Découpe les documents avec RecursiveCharacterTextSplitter optimisé.
@@ -232,15 +585,7 @@ def split_documents(documents: List[Document]) -> List[Document]:
     print(f"   Taille de chunk: {CHUNK_SIZE} caractères")
     print(f"   Chevauchement: {CHUNK_OVERLAP} caractères")
     
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", "! ", "? ", ", ", " ", ""],
-        add_start_index=True
-    )
-    
-    chunks = text_splitter.split_documents(documents)
+    chunks = _make_text_splitter().split_documents(documents)
     
     print(f"   ✅ {len(chunks)} chunk(s) créé(s)")
     
@@ -268,9 +613,122 @@ def split_documents(documents: List[Document]) -> List[Document]:
     return chunks
 
 
+# ============================================
+# INGESTION INCRÉMENTALE
+# ============================================
+
+def hash_file(path: Path) -> str:
+    """
+    Calcule le SHA-256 du contenu d'un fichier.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(metadata: Dict) -> str:
+    """
+    Identifiant stable d'une source (fichier PDF ou page web) dans le manifeste.
+    """
+    if metadata.get("source_type") == "web":
+        return f"web:{metadata['source_url']}"
+    return f"pdf:{metadata['folder']}/{metadata['source_file']}"
+
+
+def hash_documents(documents: List[Document]) -> Dict[str, str]:
+    """
+    Calcule le hash du contenu de chaque source à partir de ses documents.
+    
+    Returns:
+        Dictionnaire {clé source: SHA-256 du texte}
+    """
+    digests = {}
+    for doc in documents:
+        key = source_key(doc.metadata)
+        digests.setdefault(key, hashlib.sha256()).update(doc.page_content.encode('utf-8'))
+    return {key: digest.hexdigest() for key, digest in digests.items()}
+
+
+def assign_chunk_ids(
+    chunks: List[Document],
+    source_hashes: Dict[str, str],
+    sources: Dict[str, Dict] = None
+) -> Dict[str, Dict]:
+    """
+    Attribue un ID déterministe à chaque chunk (metadata["chunk_id"]),
+    dérivé de la source et de son hash.
+    
+    Args:
+        chunks: Chunks à identifier
+        source_hashes: Hash de chaque source
+        sources: Entrées déjà produites, complétées lot après lot (optionnel)
+        
+    Returns:
+        Entrées du manifeste {clé source: {"hash", "chunk_ids"}}
+    """
+    sources = {} if sources is None else sources
+    for chunk in chunks:
+        key = source_key(chunk.metadata)
+        entry = sources.setdefault(key, {"hash": source_hashes[key], "chunk_ids": []})
+        prefix = hashlib.sha256(f"{key}|{entry['hash']}".encode('utf-8')).hexdigest()[:16]
+        chunk_id = f"{prefix}-{len(entry['chunk_ids']):05d}"
+        chunk.metadata["chunk_id"] = chunk_id
+        entry["chunk_ids"].append(chunk_id)
+    return sources
+
+
+def load_manifest() -> Optional[Dict]:
+    """
+    Charge le manifeste de la précédente ingestion s'il est utilisable.
+    
+    Returns:
+        Manifeste, ou None si une reconstruction complète est nécessaire
+        (pas d'index, ancien format, ou paramètres de découpage/modèle changés)
+    """
+    if not MANIFEST_FILE.exists():
+        return None
+    if not INDEX_FILE.exists() or not ChunkStore.exists(CHUNK_STORE_DIR):
+        return None
+    
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    config = {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+    for name, value in config.items():
+        if manifest.get(name) != value:
+            print(f"   ⚠️  Paramètre modifié ({name}: {manifest.get(name)} → {value}), reconstruction complète")
+            return None
+    
+    return manifest
+
+
+def save_manifest(sources: Dict[str, Dict]):
+    """
+    Écrit le manifeste (après l'index, pour qu'une interruption ne laisse
+    jamais un manifeste plus récent que l'index).
+    """
+    manifest = {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "sources": sources,
+    }
+    tmp_file = MANIFEST_FILE.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_file, MANIFEST_FILE)
+    print(f"   ✅ Manifeste sauvegardé ({len(sources)} sources)")
+
+
 def create_embeddings():
     """
-    Crée le modèle d'embeddings français.
+    Crée le modèle d'embeddings français, adossé au cache disque des embeddings.
     """
     print(f"\n🧠 Initialisation du modèle d'embeddings...")
     print(f"   Modèle: {EMBEDDING_MODEL}")
@@ -279,131 +737,799 @@ def create_embeddings():
     embeddings = HuggingFaceEmbeddings(
         model_name=EMBEDDING_MODEL,
         model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
+        encode_kwargs={'normalize_embeddings': NORMALIZE_EMBEDDINGS, 'batch_size': ENCODE_BATCH_SIZE}
+    )
+    
+    cache = EmbeddingCache(
+        EMBEDDING_CACHE_DIR,
+        model_name=EMBEDDING_MODEL,
+        normalize=NORMALIZE_EMBEDDINGS,
+        max_entries=EMBEDDING_CACHE_MAX_ENTRIES
     )
     
     print(f"   ✅ Modèle chargé avec succès")
-    return embeddings
+    print(f"   💾 Cache d'embeddings: {len(cache)} vecteur(s) ({cache.directory})")
+    return CachedEmbeddings(embeddings, cache)
+
+
+def _save_embedding_cache(embeddings):
+    """
+    Écrit le cache d'embeddings sur disque et affiche ses hits/misses, si le
+    modèle en utilise un.
+    """
+    cache = getattr(embeddings, "cache", None)
+    if cache is not None:
+        embeddings.save()
+        print(f"   💾 Cache d'embeddings: {cache.hits} hit(s), {cache.misses} encodage(s)")
 
 
-def build_vector_store(chunks: List[Document], embeddings) -> FAISS:
+def _token_lengths(texts: List[str], embeddings) -> List[int]:
+    """
+    Longueur en tokens de chaque texte selon le tokenizer du modèle
+    (longueur en caractères si le tokenizer n'est pas accessible).
+    """
+    model = getattr(embeddings, "base", embeddings)
+    tokenizer = getattr(getattr(model, "_client", None), "tokenizer", None)
+    if tokenizer is None:
+        return [len(text) for text in texts]
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+
+def embed_chunks(chunks: List[Document], embeddings, batch_size: int = None) -> List[List[float]]:
+    """
+    Encode les chunks par lots de longueurs voisines.
+    
+    Les chunks sont triés par nombre de tokens pour que chaque lot soit
+    rembourré (padding) au minimum, puis les vecteurs sont remis dans
+    l'ordre d'origine des chunks.
+    
+    Args:
+        chunks: Chunks à encoder
+        embeddings: Modèle d'embeddings
+        batch_size: Taille des lots (défaut: ENCODE_BATCH_SIZE)
+        
+    Returns:
+        Vecteurs dans l'ordre de chunks
+    """
+    batch_size = ENCODE_BATCH_SIZE if batch_size is None else batch_size
+    texts = [chunk.page_content for chunk in chunks]
+    lengths = _token_lengths(texts, embeddings)
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+    
+    vectors = [None] * len(texts)
+    n_batches = (len(texts) + batch_size - 1) // batch_size
+    start = time.perf_counter()
+    
+    for batch_number, offset in enumerate(range(0, len(order), batch_size), 1):
+        batch = order[offset:offset + batch_size]
+        batch_vectors = embeddings.embed_documents([texts[i] for i in batch])
+        for i, vector in zip(batch, batch_vectors):
+            vectors[i] = vector
+        if batch_number % 10 == 0 or batch_number == n_batches:
+            elapsed = time.perf_counter() - start
+            done = offset + len(batch)
+            print(f"   ⏳ Lot {batch_number}/{n_batches} - {done / max(elapsed, 1e-9):.1f} chunks/s")
+    
+    elapsed = time.perf_counter() - start
+    if texts:
+        print(f"   ⚡ {len(texts)} chunks encodés en {elapsed:.1f}s "
+              f"({len(texts) / max(elapsed, 1e-9):.1f} chunks/s, lots de {batch_size})")
+    return vectors
+
+
+def build_vector_store(chunks: List[Document], embeddings) -> faiss.Index:
     """
     Construit l'index FAISS à partir des chunks.
+    La position d'un vecteur dans l'index est celle de son chunk dans le chunk store.
     
     Args:
         chunks: Liste de chunks de documents
         embeddings: Modèle d'embeddings
         
     Returns:
-        Vector store FAISS
+        Index FAISS
     """
     print(f"\n🔍 Construction de l'index vectoriel FAISS...")
     print(f"   ⏳ Génération des embeddings pour {len(chunks)} chunks...")
     print(f"   (Cela peut prendre plusieurs minutes)")
     
-    vector_store = FAISS.from_documents(chunks, embeddings)
+    vectors = np.asarray(embed_chunks(chunks, embeddings), dtype=np.float32)
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
     
     print(f"   ✅ Index FAISS créé avec succès")
-    return vector_store
+    _save_embedding_cache(embeddings)
+    return index
+
+
+def load_vectors() -> np.ndarray:
+    """
+    Vecteurs exacts de l'index (float32, ligne = ID du chunk), mappés en
+    mémoire: seules les lignes lues sont chargées.
+    
+    Un index sans vectors.npy (ancien format) est un index Flat dont les
+    vecteurs sont relus directement.
+    """
+    if VECTORS_FILE.exists():
+        return np.load(VECTORS_FILE, mmap_mode='r')
+    if load_index_info()["spec"] != "Flat":
+        raise RuntimeError(f"{VECTORS_FILE} manquant: relancez python ingest.py --full")
+    index = faiss.read_index(str(INDEX_FILE))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+class VectorFileWriter:
+    """
+    Écrit un fichier .npy de vecteurs float32 en flux, lot après lot: la
+    mémoire utilisée ne dépend pas du nombre de vecteurs. L'en-tête .npy
+    (dont la forme n'est connue qu'à la fin) est réservé au début du fichier
+    et écrit par close().
+    """
+    
+    HEADER_SIZE = 128
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        self.dim = None
+        self._file = open(self.path, 'wb')
+        self._file.write(b"\0" * self.HEADER_SIZE)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def add(self, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            return
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Dimension {vectors.shape[1]} différente de {self.dim}")
+        self._file.write(vectors.tobytes())
+        self.count += len(vectors)
+    
+    def close(self):
+        header = repr({"descr": "<f4", "fortran_order": False, "shape": (self.count, self.dim or 0)})
+        header = header.ljust(self.HEADER_SIZE - 11) + "\n"
+        self._file.seek(0)
+        self._file.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1"))
+        self._file.close()
 
 
-def save_vector_store(vector_store: FAISS, chunks: List[Document]):
+def open_vector_store_for_update(keep_ids: set, vectors_writer: VectorFileWriter, writer: ChunkStoreWriter):
     """
-    Sauvegarde l'index FAISS et les données pour hybrid retrieval.
+    Recopie de l'index existant les chunks des sources inchangées, avant
+    l'ajout des nouveaux chunks.
+    
+    Les chunks conservés et leurs vecteurs sont recopiés par blocs, dans leur
+    ordre d'origine, dans le nouveau chunk store (writer) et le nouveau
+    fichier de vecteurs (vectors_writer); les autres sont retirés.
     
     Args:
-        vector_store: Vector store FAISS à sauvegarder
-        chunks: Liste des chunks (pour BM25)
+        keep_ids: IDs des chunks à conserver
+        vectors_writer: Fichier de vecteurs en cours d'écriture
+        writer: Chunk store en cours d'écriture
+    """
+    print(f"\n🔄 Mise à jour incrémentale de l'index FAISS...")
+    
+    vectors = load_vectors()
+    store = ChunkStore(CHUNK_STORE_DIR)
+    
+    # Les lignes inconnues du manifeste (exécution interrompue avant son
+    # écriture) sont retirées comme celles des sources modifiées
+    chunk_ids = store.column_values("chunk_id")
+    codes = np.asarray(store.codes("chunk_id"))
+    known = np.array([chunk_id in keep_ids for chunk_id in chunk_ids] + [False], dtype=bool)
+    keep = known[codes]  # code -1 (chunk sans ID) -> dernière case, False
+    
+    for start in range(0, len(store), VECTOR_BLOCK_SIZE):
+        rows = np.flatnonzero(keep[start:start + VECTOR_BLOCK_SIZE]) + start
+        vectors_writer.add(vectors[rows])
+        writer.add_many(store.document(i) for i in rows)
+    print(f"   🗑️  {int((~keep).sum())} chunk(s) retiré(s), {int(keep.sum())} conservé(s)")
+
+
+def add_to_vector_store(
+    vectors_writer: VectorFileWriter,
+    writer: ChunkStoreWriter,
+    chunks: List[Document],
+    vectors: List[List[float]]
+):
+    """
+    Ajoute un lot de chunks déjà encodés au fichier de vecteurs et au chunk
+    store, dans le même ordre.
+    """
+    vectors_writer.add(np.asarray(vectors, dtype=np.float32))
+    writer.add_many(chunks)
+
+
+# ============================================
+# INDEX DE RECHERCHE (FLAT / HNSW / IVF)
+# ============================================
+
+def index_factory_string(spec: str, count: int, dimension: int, precision: str = "float32") -> Tuple[str, str]:
+    """
+    Traduit un type d'index et une précision en chaîne faiss.index_factory et
+    en paramètres de recherche, dimensionnés selon le nombre de vecteurs.
+    
+    Returns:
+        Tuple (chaîne factory, paramètres de recherche pour faiss.ParameterSpace)
     """
+    if precision not in VECTOR_PRECISIONS:
+        raise ValueError(f"Précision inconnue: {precision} (choix: {', '.join(VECTOR_PRECISIONS)})")
+    storage = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}[precision]
+    
+    if spec == "Flat":
+        return storage, ""
+    if spec == "HNSW":
+        suffix = "" if precision == "float32" else f"_{storage}"
+        return f"HNSW{HNSW_M}{suffix}", f"efSearch={HNSW_EF_SEARCH}"
+    
+    # IVF: ~4√n listes, avec au moins 39 vecteurs d'entraînement par liste
+    nlist = max(1, min(int(4 * np.sqrt(count)), count // 39))
+    search_params = f"nprobe={min(IVF_NPROBE, nlist)}"
+    if spec == "IVF-Flat":
+        return f"IVF{nlist},{storage}", search_params
+    if spec == "IVF-PQ":
+        # Vecteurs déjà compressés par PQ: la précision ne s'applique pas
+        m = PQ_M
+        while dimension % m:
+            m -= 1
+        # Chaque sous-quantifieur a 2^nbits centroïdes, entraînés avec au
+        # moins 39 vecteurs chacun
+        nbits = min(8, int(np.log2(max(count // 39, 1))))
+        if nbits < 4:
+            # Trop peu de vecteurs pour PQ: quantification scalaire 8 bits
+            return f"IVF{nlist},SQ8", search_params
+        # "np": pas d'entraînement polysémique (très lent, inutile ici)
+        return f"IVF{nlist},PQ{m}x{nbits}np", search_params
+    raise ValueError(f"Type d'index inconnu: {spec} (choix: {', '.join(INDEX_SPECS)})")
+
+
+def build_search_index(
+    vectors: np.ndarray,
+    spec: str,
+    precision: str = "float32",
+    rescore_factor: int = 0
+) -> Tuple[faiss.Index, Dict]:
+    """
+    Construit l'index de recherche du type et de la précision demandés à
+    partir des vecteurs exacts.
+    
+    Returns:
+        Tuple (index FAISS, description de l'index pour index_info.json)
+    """
+    factory, search_params = index_factory_string(spec, len(vectors), vectors.shape[1], precision)
+    if spec == "IVF-PQ":
+        print(f"   ℹ️  IVF-PQ sur {len(vectors)} vecteurs: index {factory}"
+              + ("" if "PQ" in factory else " (trop peu de vecteurs pour entraîner PQ)"))
+    
+    start = time.perf_counter()
+    index = faiss.index_factory(vectors.shape[1], factory)
+    if not index.is_trained:
+        # Échantillon d'entraînement borné (k-means et PQ n'en utilisent pas plus)
+        sample = np.arange(len(vectors))
+        if len(sample) > TRAIN_SAMPLE_SIZE:
+            sample = np.sort(np.random.default_rng(0).choice(len(vectors), TRAIN_SAMPLE_SIZE, replace=False))
+        index.train(np.ascontiguousarray(vectors[sample], dtype=np.float32))
+    # Ajout par blocs: vectors peut être mappé en mémoire (vectors.npy)
+    for offset in range(0, len(vectors), VECTOR_BLOCK_SIZE):
+        index.add(np.ascontiguousarray(vectors[offset:offset + VECTOR_BLOCK_SIZE], dtype=np.float32))
+    if search_params:
+        faiss.ParameterSpace().set_index_parameters(index, search_params)
+    
+    # Distances exactes: le re-classement n'apporterait rien
+    exact = precision == "float32" and spec != "IVF-PQ"
+    return index, {
+        "spec": spec,
+        "precision": precision if spec != "IVF-PQ" else "pq",
+        "factory": factory,
+        "search_params": search_params,
+        "rescore_factor": 0 if exact else rescore_factor,
+        "metric": "L2",
+        "dimension": int(vectors.shape[1]),
+        "count": int(len(vectors)),
+        "build_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def load_index_info() -> Dict:
+    """
+    Description de l'index sauvegardé (un index sans index_info.json est un Flat).
+    """
+    if INDEX_INFO_FILE.exists():
+        with open(INDEX_INFO_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"spec": "Flat", "precision": "float32", "factory": "Flat", "search_params": "", "rescore_factor": 0}
+
+
+def build_partitions(
+    store: ChunkStore,
+    vectors: np.ndarray,
+    bm25_dir: Path,
+    directory: Path,
+    index_spec: str,
+    precision: str
+) -> Dict[str, Dict]:
+    """
+    Construit un index vectoriel et un index BM25 par procédure, pour que
+    l'application ne cherche que dans la procédure sélectionnée.
+    
+    Args:
+        store: Chunk store complet
+        vectors: Vecteurs exacts (ligne = ID du chunk)
+        bm25_dir: Index BM25 global (IDF et poids repris par les partitions)
+        directory: Dossier de sortie
+        
+    Returns:
+        Description des partitions {procédure: {"directory", "count"}}
+    """
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+    
+    bm25 = BM25Index(bm25_dir)
+    procedures = store.column_values("procedure") if "procedure" in store.column_names else []
+    codes = np.asarray(store.codes("procedure")) if procedures else None
+    partitions = {}
+    for code, procedure in enumerate(procedures):
+        ids = np.flatnonzero(codes == code)
+        if not len(ids):
+            continue
+        partition_dir = directory / f"p{code:03d}"
+        partition_dir.mkdir()
+        np.save(partition_dir / "ids.npy", ids)
+        
+        index, index_info = build_search_index(vectors[ids], index_spec, precision, RESCORE_FACTOR)
+        faiss.write_index(index, str(partition_dir / "index.faiss"))
+        with open(partition_dir / "index_info.json", 'w', encoding='utf-8') as f:
+            json.dump(index_info, f, indent=1)
+        build_bm25_partition(bm25, ids, partition_dir / "bm25")
+        
+        partitions[procedure] = {"directory": partition_dir.name, "count": int(len(ids))}
+    
+    with open(directory / "partitions.json", 'w', encoding='utf-8') as f:
+        json.dump(partitions, f, ensure_ascii=False, indent=1)
+    return partitions
+
+
+# ============================================
+# CHECKPOINTS (REPRISE APRÈS INTERRUPTION)
+# ============================================
+
+def _batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """
+    Regroupe un itérable en listes de taille fixe (la dernière peut être plus courte).
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_checkpoint(fingerprint: str) -> Tuple[List[Path], set]:
+    """
+    Retrouve les lots déjà encodés par une exécution interrompue.
+    
+    Un checkpoint n'est réutilisé que s'il correspond exactement au même plan
+    d'ingestion (mêmes sources, même index de départ, mêmes paramètres);
+    sinon il est effacé.
+    
+    Args:
+        fingerprint: Empreinte du plan d'ingestion courant
+        
+    Returns:
+        Fichiers des lots terminés, dans l'ordre, et clés des sources dont
+        tous les chunks y sont (elles ne sont ni rechargées ni ré-encodées)
+    """
+    state_file = CHECKPOINT_DIR / "state.json"
+    if state_file.exists():
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get("fingerprint") == fingerprint and "sources_done" in state:
+            batch_files = [CHECKPOINT_DIR / f"batch_{n:06d}.pkl" for n in range(1, state["batches_done"] + 1)]
+            return batch_files, set(state["sources_done"])
+    clear_checkpoint()
+    return [], set()
+
+
+def save_checkpoint_batch(
+    fingerprint: str,
+    batch_number: int,
+    chunks: List[Document],
+    vectors: List[List[float]],
+    sources_done: set
+):
+    """
+    Enregistre un lot encodé puis avance l'état du checkpoint.
+    
+    sources_done: sources entièrement découpées et encodées à ce stade (la
+    dernière source du lot peut continuer dans le lot suivant)
+    """
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    batch_file = CHECKPOINT_DIR / f"batch_{batch_number:06d}.pkl"
+    tmp_file = batch_file.with_suffix(".tmp")
+    with open(tmp_file, 'wb') as f:
+        pickle.dump((chunks, np.asarray(vectors, dtype=np.float32)), f)
+    os.replace(tmp_file, batch_file)
+    
+    state_file = CHECKPOINT_DIR / "state.json"
+    tmp_file = state_file.with_suffix(".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({"fingerprint": fingerprint, "batches_done": batch_number, "sources_done": sorted(sources_done)}, f)
+    os.replace(tmp_file, state_file)
+
+
+def read_checkpoint_batch(batch_file: Path) -> Tuple[List[Document], np.ndarray]:
+    """
+    Relit un lot enregistré par save_checkpoint_batch().
+    """
+    with open(batch_file, 'rb') as f:
+        return pickle.load(f)
+
+
+def clear_checkpoint():
+    """
+    Supprime le checkpoint (ingestion terminée ou plan différent).
+    """
+    if CHECKPOINT_DIR.exists():
+        for file in CHECKPOINT_DIR.iterdir():
+            file.unlink()
+        CHECKPOINT_DIR.rmdir()
+
+
+def compute_index_version(store_directory: Path, vectors_file: Path, index_info: Dict) -> str:
+    """
+    Empreinte du contenu indexé (chunks, vecteurs, type d'index): identique
+    si l'index est reconstruit à l'identique, différente sinon. Sert à
+    invalider les caches de l'application (réponses) après une ingestion.
+    """
+    digest = hashlib.sha256()
+    files = sorted(f for f in Path(store_directory).iterdir() if f.is_file()) + [Path(vectors_file)]
+    for path in files:
+        digest.update(path.name.encode('utf-8'))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    for key in ("factory", "search_params", "rescore_factor"):
+        digest.update(json.dumps(index_info.get(key), sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _directory_size(path: Path) -> int:
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return path.stat().st_size
+
+
+def save_vector_store(
+    vectors_writer: VectorFileWriter,
+    writer: ChunkStoreWriter,
+    index_spec: str = None,
+    precision: str = None
+):
+    """
+    Sauvegarde les vecteurs, l'index de recherche FAISS, le chunk store
+    (textes + métadonnées) et l'index BM25 pour le hybrid retrieval, puis
+    supprime les fichiers de l'ancien format.
+    
+    Les index sont construits à partir du fichier de vecteurs mappé en
+    mémoire: aucune copie de l'ensemble des vecteurs n'est chargée.
+    
+    Args:
+        vectors_writer: Fichier de vecteurs écrit pendant l'ingestion
+        writer: Chunk store écrit en parallèle des vecteurs (même ordre)
+        index_spec: Type d'index de recherche (INDEX_SPECS), INDEX_SPEC par défaut
+        precision: Précision des vecteurs dans l'index, VECTOR_PRECISION par défaut
+    """
+    index_spec = index_spec or INDEX_SPEC
+    precision = precision or VECTOR_PRECISION
     print(f"\n💾 Sauvegarde de l'index vectoriel...")
     
     VECTOR_STORE_DIR.mkdir(exist_ok=True)
     
-    # Sauvegarde de l'index FAISS
-    vector_store.save_local(str(VECTOR_STORE_DIR))
-    print(f"   ✅ Index FAISS sauvegardé")
+    # Finalisation du chunk store et du fichier de vecteurs
+    writer.close()
+    vectors_writer.close()
+    if len(writer) != len(vectors_writer):
+        raise RuntimeError(f"Vecteurs ({len(vectors_writer)}) et chunk store ({len(writer)}) désalignés")
+    
+    # Index BM25 construit une fois ici plutôt qu'au démarrage de l'application
+    store = ChunkStore(writer.directory)
+    tmp_bm25 = BM25_DIR.with_name("bm25.tmp")
+    build_bm25_index((store.text(i) for i in range(len(store))), tmp_bm25)
+    
+    # Vecteurs exacts (mises à jour incrémentales, reconstruction d'un autre
+    # type d'index) puis index de recherche du type demandé
+    tmp_vectors = vectors_writer.path
+    vectors = np.load(tmp_vectors, mmap_mode='r')
+    if index_spec != "Flat" or precision != "float32":
+        print(f"   ⏳ Construction de l'index {index_spec} ({precision})...")
+    search_index, index_info = build_search_index(vectors, index_spec, precision, RESCORE_FACTOR)
+    index_info["version"] = compute_index_version(writer.directory, tmp_vectors, index_info)
+    
+    # Index par procédure (recherche ciblée sans filtrage a posteriori)
+    tmp_partitions = PARTITIONS_DIR.with_name("partitions.tmp")
+    partitions = build_partitions(store, vectors, tmp_bm25, tmp_partitions, index_spec, precision)
+    
+    # Bitsets des valeurs de métadonnées filtrables (source_type, folder...)
+    tmp_filters = FILTERS_DIR.with_name("filters.tmp")
+    build_filter_bitmaps(store, tmp_filters)
+    del store, vectors
     
-    # Sauvegarde des chunks pour BM25 (hybrid retrieval)
-    chunks_file = VECTOR_STORE_DIR / "chunks.pkl"
-    with open(chunks_file, 'wb') as f:
-        pickle.dump(chunks, f)
-    print(f"   ✅ Chunks sauvegardés pour hybrid retrieval")
+    # Sauvegarde de l'index FAISS puis remplacement des fichiers ensemble
+    tmp_index = INDEX_FILE.with_suffix(".tmp")
+    faiss.write_index(search_index, str(tmp_index))
+    tmp_info = INDEX_INFO_FILE.with_suffix(".tmp")
+    with open(tmp_info, 'w', encoding='utf-8') as f:
+        json.dump(index_info, f, indent=1)
+    replace_directory(writer.directory, CHUNK_STORE_DIR)
+    replace_directory(tmp_bm25, BM25_DIR)
+    replace_directory(tmp_partitions, PARTITIONS_DIR)
+    replace_directory(tmp_filters, FILTERS_DIR)
+    os.replace(tmp_vectors, VECTORS_FILE)
+    os.replace(tmp_index, INDEX_FILE)
+    os.replace(tmp_info, INDEX_INFO_FILE)
+    print(f"   ✅ Index FAISS sauvegardé ({index_info['spec']}: {index_info['factory']})")
+    if index_info["rescore_factor"]:
+        print(f"   ✅ Re-classement exact des {index_info['rescore_factor']} x k meilleurs candidats")
+    print(f"   ✅ Chunk store sauvegardé ({len(writer)} chunks)")
+    print(f"   ✅ Index BM25 sauvegardé")
+    print(f"   ✅ Partitions par procédure sauvegardées ({len(partitions)})")
+    print(f"   ✅ Filtres de métadonnées sauvegardés")
+    
+    for name in LEGACY_FILES:
+        legacy_file = VECTOR_STORE_DIR / name
+        if legacy_file.exists():
+            legacy_file.unlink()
+            print(f"   🗑️  Ancien fichier supprimé: {name}")
     
     print(f"\n   📁 Fichiers créés dans {VECTOR_STORE_DIR}/:")
     for file in sorted(VECTOR_STORE_DIR.iterdir()):
-        size = file.stat().st_size
+        size = _directory_size(file)
         if size < 1024:
             size_str = f"{size} B"
         elif size < 1024 * 1024:
             size_str = f"{size / 1024:.1f} KB"
         else:
             size_str = f"{size / (1024 * 1024):.1f} MB"
-        print(f"      • {file.name} ({size_str})")
+        print(f"      • {file.name}{'/' if file.is_dir() else ''} ({size_str})")
+
+
+def reindex_vector_store(index_spec: str = None, precision: str = None):
+    """
+    Réécrit les fichiers de l'index à partir de l'index existant, sans
+    ré-encoder les chunks. Convertit aussi un index à l'ancien format
+    (index.pkl + chunks.pkl) vers le chunk store.
+    
+    Args:
+        index_spec: Type d'index de recherche à construire (celui de
+            l'index existant par défaut)
+        precision: Précision des vecteurs dans l'index (celle de l'index
+            existant par défaut)
+    """
+    print(f"\n♻️  Réécriture de l'index existant (sans ré-encodage)...")
+    if not INDEX_FILE.exists():
+        print(f"❌ Erreur: aucun index dans {VECTOR_STORE_DIR}/, lancez d'abord python ingest.py")
+        sys.exit(1)
+    
+    vectors = load_vectors()
+    vectors_writer = VectorFileWriter(VECTORS_FILE.with_suffix(".tmp.npy"))
+    for offset in range(0, len(vectors), VECTOR_BLOCK_SIZE):
+        vectors_writer.add(vectors[offset:offset + VECTOR_BLOCK_SIZE])
+    del vectors
+    if ChunkStore.exists(CHUNK_STORE_DIR):
+        store = ChunkStore(CHUNK_STORE_DIR)
+        chunks = (store.document(i) for i in range(len(store)))
+    elif (VECTOR_STORE_DIR / "chunks.pkl").exists():
+        # Ancien format: chunks.pkl est dans l'ordre des vecteurs de l'index
+        with open(VECTOR_STORE_DIR / "chunks.pkl", 'rb') as f:
+            chunks = pickle.load(f)
+    else:
+        print(f"❌ Erreur: aucun chunk trouvé dans {VECTOR_STORE_DIR}/")
+        sys.exit(1)
+    
+    writer = ChunkStoreWriter(CHUNK_STORE_DIR.with_name("chunks.tmp"))
+    writer.add_many(chunks)
+    index_info = load_index_info()
+    if precision is None:
+        precision = index_info.get("precision", "float32")
+        precision = precision if precision in VECTOR_PRECISIONS else "float32"
+    save_vector_store(vectors_writer, writer, index_spec or index_info["spec"], precision)
 
 
-def main():
+def main(full_rebuild: bool = False, workers: int = None, index_spec: str = None, precision: str = None):
     """
     Pipeline principal d'ingestion multi-sources.
+    
+    Par défaut l'ingestion est incrémentale: seules les sources nouvelles ou
+    modifiées depuis le dernier manifeste sont découpées et encodées.
+    
+    Args:
+        full_rebuild: Ignorer le manifeste et reconstruire tout l'index
+        workers: Nombre de processus d'extraction des PDFs
+        index_spec: Type d'index de recherche (INDEX_SPECS), INDEX_SPEC par défaut
+        precision: Précision des vecteurs dans l'index, VECTOR_PRECISION par défaut
     """
+    index_spec = index_spec or INDEX_SPEC
+    precision = precision or VECTOR_PRECISION
     print("=" * 80)
     print("🏥 INGESTION MULTI-SOURCES - RADIOLOGIE INTERVENTIONNELLE")
     print("   Sources: PDFs (par maladie) + Site web (laradiologiequisoigne.fr)")
     print("   Features: Intelligent Chunking + Hybrid Retrieval")
     print("=" * 80)
     
-    all_documents = []
+    manifest = None if full_rebuild else load_manifest()
+    previous_sources = manifest["sources"] if manifest else {}
+    if manifest:
+        print(f"\n🔄 Mode incrémental: {len(previous_sources)} source(s) déjà indexée(s)")
+    else:
+        print(f"\n🆕 Reconstruction complète de l'index")
     
-    # 1. Chargement des PDFs (par sous-dossier)
-    print("\n📚 PHASE 1: Chargement des PDFs")
-    pdf_documents = load_pdfs_recursive(PDF_DIR)
-    all_documents.extend(pdf_documents)
+    def is_unchanged(key: str, digest: str) -> bool:
+        return previous_sources.get(key, {}).get("hash") == digest
     
-    # 2. Scraping du site web
+    # 1. Inventaire des PDFs (par sous-dossier) - seuls les fichiers modifiés seront chargés
+    print("\n📚 PHASE 1: Inventaire des PDFs")
+    pdf_tasks = find_pdf_files(PDF_DIR)
+    source_hashes = {}
+    changed_tasks = []
+    for pdf_file, procedure_name, folder in pdf_tasks:
+        key = source_key({"source_type": "pdf", "folder": folder, "source_file": pdf_file.name})
+        source_hashes[key] = hash_file(pdf_file)
+        if not is_unchanged(key, source_hashes[key]):
+            changed_tasks.append((pdf_file, procedure_name, folder))
+    print(f"\n   {len(pdf_tasks) - len(changed_tasks)} PDF(s) inchangé(s), {len(changed_tasks)} à charger")
+    
+    # 2. Scraping du site web (les pages inchangées sont servies par le cache HTTP)
     print("\n🌐 PHASE 2: Scraping du site web")
     web_documents = scrape_website()
-    all_documents.extend(web_documents)
+    web_hashes = hash_documents(web_documents)
+    source_hashes.update(web_hashes)
+    # Une page momentanément inaccessible conserve ses chunks existants
+    configured_urls = {f"web:{url}" for url in WEB_URLS.values()}
+    for key, entry in previous_sources.items():
+        if key in configured_urls and key not in web_hashes:
+            source_hashes[key] = entry["hash"]
+    web_documents = [
+        doc for doc in web_documents
+        if not is_unchanged(source_key(doc.metadata), web_hashes[source_key(doc.metadata)])
+    ]
     
-    if not all_documents:
+    if not changed_tasks and not web_documents and not previous_sources:
         print("\n❌ ERREUR: Aucun document chargé (ni PDF ni Web)")
         print("   Vérifiez que:")
         print("   1. Les PDFs sont dans data/pdfs/maladie/*.pdf")
         print("   2. La connexion internet fonctionne pour le scraping")
         sys.exit(1)
     
-    print(f"\n✅ Total documents chargés: {len(all_documents)}")
-    print(f"   • PDFs: {len(pdf_documents)}")
-    print(f"   • Web: {len(web_documents)}")
+    # Sources dont les anciens chunks doivent être retirés de l'index
+    stale_keys = [
+        key for key in previous_sources
+        if key not in source_hashes or not is_unchanged(key, source_hashes[key])
+    ]
+    stale_ids = [chunk_id for key in stale_keys for chunk_id in previous_sources[key]["chunk_ids"]]
+    
+    print(f"\n✅ Sources à indexer:")
+    print(f"   • PDFs: {len(changed_tasks)} fichier(s)")
+    print(f"   • Web: {len(web_documents)} page(s)")
+    if manifest:
+        print(f"   • Sources modifiées ou supprimées: {len(stale_keys)}")
+    
+    if manifest and not changed_tasks and not web_documents and not stale_ids:
+        index_info = load_index_info()
+        wanted_precision = precision if index_spec != "IVF-PQ" else "pq"
+        if (index_info["spec"], index_info.get("precision", "float32")) == (index_spec, wanted_precision):
+            print("\n✅ Index déjà à jour, aucune source modifiée.")
+        else:
+            # Seul le type ou la précision de l'index change: reconstruction sans ré-encodage
+            reindex_vector_store(index_spec, precision)
+        return
     
-    # 3. Découpage en chunks
-    print("\n✂️  PHASE 3: Découpage des documents")
-    chunks = split_documents(all_documents)
+    # Empreinte du plan: un checkpoint n'est repris que pour un plan identique
+    fingerprint = hashlib.sha256(json.dumps({
+        "config": [EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, INGEST_BATCH_SIZE],
+        "base": sorted((key, entry["hash"]) for key, entry in previous_sources.items()) if manifest else None,
+        "pdfs": [source_key({"source_type": "pdf", "folder": folder, "source_file": pdf_file.name}) for pdf_file, _, folder in changed_tasks],
+        "sources": sorted(source_hashes.items()),
+    }).encode('utf-8')).hexdigest()
+    done_batches, sources_done = load_checkpoint(fingerprint)
     
-    # 4. Création des embeddings
-    print("\n🧠 PHASE 4: Création des embeddings")
+    # 3. Création des embeddings
+    print("\n🧠 PHASE 3: Création des embeddings")
     embeddings = create_embeddings()
     
-    # 5. Construction de l'index vectoriel
-    print("\n🔍 PHASE 5: Construction de l'index FAISS")
-    vector_store = build_vector_store(chunks, embeddings)
+    writer = ChunkStoreWriter(CHUNK_STORE_DIR.with_name("chunks.tmp"))
+    vectors_writer = VectorFileWriter(VECTORS_FILE.with_suffix(".tmp.npy"))
+    if manifest:
+        keep_ids = {
+            chunk_id
+            for key, entry in previous_sources.items() if key not in stale_keys
+            for chunk_id in entry["chunk_ids"]
+        }
+        open_vector_store_for_update(keep_ids, vectors_writer, writer)
     
-    # 6. Sauvegarde (FAISS + chunks pour BM25)
-    print("\n💾 PHASE 6: Sauvegarde")
-    save_vector_store(vector_store, chunks)
+    # 4. Chargement, découpage et encodage en flux, par lots de INGEST_BATCH_SIZE chunks
+    print("\n🔍 PHASE 4: Chargement, découpage et indexation en flux")
+    print(f"   Taille de chunk: {CHUNK_SIZE} caractères, chevauchement: {CHUNK_OVERLAP}")
+    print(f"   Lots de {INGEST_BATCH_SIZE} chunks")
+    new_sources = {}
+    new_chunk_count = 0
+    
+    # Reprise: les chunks des sources terminées sont relus du checkpoint, ces
+    # sources ne sont ni rechargées ni ré-encodées. Une source commencée mais
+    # pas terminée est reprise depuis le début (ses chunks ont le même ID).
+    if done_batches:
+        replayed_ids = set()
+        for batch_file in done_batches:
+            saved_chunks, vectors = read_checkpoint_batch(batch_file)
+            rows = [
+                i for i, chunk in enumerate(saved_chunks)
+                if source_key(chunk.metadata) in sources_done and chunk.metadata["chunk_id"] not in replayed_ids
+            ]
+            chunks = [saved_chunks[i] for i in rows]
+            replayed_ids.update(chunk.metadata["chunk_id"] for chunk in chunks)
+            assign_chunk_ids(chunks, source_hashes, new_sources)
+            add_to_vector_store(vectors_writer, writer, chunks, np.asarray(vectors)[rows])
+            new_chunk_count += len(chunks)
+        changed_tasks = [
+            task for task in changed_tasks
+            if source_key({"source_type": "pdf", "folder": task[2], "source_file": task[0].name}) not in sources_done
+        ]
+        web_documents = [doc for doc in web_documents if source_key(doc.metadata) not in sources_done]
+        print(f"   ♻️  Reprise: {len(sources_done)} source(s) et {new_chunk_count} chunk(s) relus depuis le checkpoint")
+    
+    documents = chain(iter_pdf_documents(changed_tasks, workers), web_documents)
+    sources_seen = set(sources_done)
+    
+    for batch_number, batch in enumerate(_batched(iter_chunks(documents), INGEST_BATCH_SIZE), len(done_batches) + 1):
+        assign_chunk_ids(batch, source_hashes, new_sources)
+        vectors = embed_chunks(batch, embeddings)
+        
+        # Toutes les sources vues sont terminées, sauf peut-être la dernière
+        sources_seen.update(source_key(chunk.metadata) for chunk in batch)
+        save_checkpoint_batch(
+            fingerprint, batch_number, batch, vectors,
+            sources_seen - {source_key(batch[-1].metadata)}
+        )
+        
+        add_to_vector_store(vectors_writer, writer, batch, vectors)
+        new_chunk_count += len(batch)
+        print(f"   ✅ Lot {batch_number}: {new_chunk_count} chunk(s) indexé(s)")
+    
+    if not len(vectors_writer):
+        print("\n❌ ERREUR: Aucun chunk n'a pu être créé à partir des sources")
+        sys.exit(1)
+    _save_embedding_cache(embeddings)
+    
+    # 5. Sauvegarde (FAISS + chunk store + manifeste)
+    print("\n💾 PHASE 5: Sauvegarde")
+    save_vector_store(vectors_writer, writer, index_spec, precision)
+    sources = {key: entry for key, entry in previous_sources.items() if key not in stale_keys}
+    sources.update(new_sources)
+    save_manifest(sources)
+    clear_checkpoint()
     
     print("\n" + "=" * 80)
     print("✅ INGESTION TERMINÉE AVEC SUCCÈS")
     print("=" * 80)
     print(f"\n📊 Statistiques finales:")
-    print(f"   • Documents sources: {len(all_documents)}")
-    print(f"     - PDFs: {len(pdf_documents)} pages")
-    print(f"     - Web: {len(web_documents)} pages")
-    print(f"   • Chunks créés: {len(chunks)}")
+    print(f"   • Sources traitées: {len(new_sources)}")
+    print(f"   • Chunks créés: {new_chunk_count}")
+    print(f"   • Chunks dans l'index: {len(vectors_writer)}")
     
     # Statistiques par procédure
-    procedures = {}
-    for chunk in chunks:
-        proc = chunk.metadata.get('procedure', 'Inconnu')
-        procedures[proc] = procedures.get(proc, 0) + 1
+    store = ChunkStore(CHUNK_STORE_DIR)
+    procedure_names = store.column_values("procedure")
+    counts = np.bincount(np.asarray(store.codes("procedure")) + 1, minlength=len(procedure_names) + 1)
+    procedures = {"Inconnu": int(counts[0])} if counts[0] else {}
+    procedures.update({name: int(count) for name, count in zip(procedure_names, counts[1:]) if count})
     
     print(f"   • Procédures couvertes: {len(procedures)}")
     for proc, count in sorted(procedures.items(), key=lambda x: x[1], reverse=True):
@@ -421,4 +1547,19 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Ingestion des documents dans l'index vectoriel")
+    parser.add_argument("--full", action="store_true",
+                        help="Reconstruire tout l'index au lieu de la mise à jour incrémentale")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Nombre de processus pour l'extraction des PDFs")
+    parser.add_argument("--reindex", action="store_true",
+                        help="Réécrire l'index existant au format courant, sans ré-encoder")
+    parser.add_argument("--index-spec", choices=INDEX_SPECS, default=None,
+                        help=f"Type d'index de recherche vectorielle (défaut: {INDEX_SPEC})")
+    parser.add_argument("--precision", choices=VECTOR_PRECISIONS, default=None,
+                        help=f"Précision des vecteurs dans l'index (défaut: {VECTOR_PRECISION})")
+    args = parser.parse_args()
+    if args.reindex:
+        reindex_vector_store(args.index_spec, args.precision)
+    else:
+        main(full_rebuild=args.full, workers=args.workers, index_spec=args.index_spec, precision=args.precision)
@@ -0,0 +1,125 @@
+"""
+Filtres de métadonnées précalculés (bitsets par valeur).
+
+ingest.py enregistre, pour chaque valeur des colonnes filtrables
+(procedure, source_type, folder, source_file), le bitset des IDs de chunks
+qui la portent. Un filtre se résout en quelques opérations OR / AND sur ces
+bitsets; le bitset obtenu est appliqué directement dans la recherche FAISS
+(IDSelectorBitmap) et dans le scoring BM25, sans sur-échantillonnage.
+
+Structure (dossier vector_store/filters/):
+    bitmaps.npy    uint8 (valeurs, ceil(n / 8)), bit i = chunk i (ordre "little")
+    meta.json      nombre de chunks et ligne de chaque valeur par colonne
+
+Format d'un filtre: {colonne: valeur ou liste de valeurs}. Les valeurs d'une
+même colonne se combinent en OU, les colonnes entre elles en ET:
+    {"source_type": "pdf", "folder": ["pose_pac", "biopsie_scanner"]}
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from chunk_store import ChunkStore
+
+FILTER_COLUMNS = ("procedure", "source_type", "folder", "source_file")
+
+MetadataFilter = Dict[str, Union[str, Iterable[str]]]
+
+
+def pack_mask(mask: np.ndarray) -> np.ndarray:
+    """
+    Bitset (format de faiss.IDSelectorBitmap) d'un masque booléen.
+    """
+    return np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+
+
+def unpack_bitmap(bitmap: np.ndarray, count: Optional[int] = None) -> np.ndarray:
+    """
+    Masque booléen des count premiers chunks d'un bitset (tous par défaut).
+    """
+    return np.unpackbits(bitmap, count=count, bitorder='little').view(bool)
+
+
+def build_filter_bitmaps(store: ChunkStore, directory: Path, columns: Iterable[str] = FILTER_COLUMNS):
+    """
+    Calcule et enregistre les bitsets de chaque valeur des colonnes filtrables.
+    """
+    directory = Path(directory)
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+
+    rows = []
+    table = {}
+    for name in columns:
+        if name not in store.column_names:
+            continue
+        codes = np.asarray(store.codes(name))
+        table[name] = {}
+        for code, value in enumerate(store.column_values(name)):
+            table[name][str(value)] = len(rows)
+            rows.append(pack_mask(codes == code))
+
+    width = (len(store) + 7) // 8
+    bitmaps = np.array(rows, dtype=np.uint8).reshape(len(rows), width)
+    np.save(directory / "bitmaps.npy", bitmaps)
+    with open(directory / "meta.json", 'w', encoding='utf-8') as f:
+        json.dump({"count": len(store), "columns": table}, f, ensure_ascii=False, indent=2)
+
+
+class FilterBitmaps:
+    """
+    Lecture des bitsets précalculés et résolution des filtres.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.count: int = meta["count"]
+        self._rows: Dict[str, Dict[str, int]] = meta["columns"]
+        self._bitmaps = np.load(self.directory / "bitmaps.npy")
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        return (Path(directory) / "meta.json").exists()
+
+    @property
+    def columns(self) -> Dict[str, List[str]]:
+        """
+        Valeurs disponibles pour chaque colonne filtrable.
+        """
+        return {name: list(rows) for name, rows in self._rows.items()}
+
+    def bitmap(self, metadata_filter: Optional[MetadataFilter]) -> Optional[np.ndarray]:
+        """
+        Bitset des chunks satisfaisant le filtre.
+
+        Returns:
+            Bitset uint8, ou None si le filtre est vide (aucune restriction)
+        """
+        if not metadata_filter:
+            return None
+
+        result = np.full(self._bitmaps.shape[1], 0xFF, dtype=np.uint8)
+        for name, values in metadata_filter.items():
+            if isinstance(values, str):
+                values = [values]
+            rows = [self._rows.get(name, {}).get(str(value)) for value in values]
+            rows = [row for row in rows if row is not None]
+            if not rows:
+                # Colonne ou valeur inconnue: aucun chunk ne correspond
+                return np.zeros_like(result)
+            result &= np.bitwise_or.reduce(self._bitmaps[rows], axis=0)
+        return result
+
+    def mask(self, metadata_filter: Optional[MetadataFilter]) -> Optional[np.ndarray]:
+        """
+        Masque booléen des chunks satisfaisant le filtre (None si filtre vide).
+        """
+        bitmap = self.bitmap(metadata_filter)
+        return unpack_bitmap(bitmap, self.count) if bitmap is not None else None
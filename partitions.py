@@ -0,0 +1,117 @@
+"""
+Index de recherche partitionnés par procédure.
+
+ingest.py construit, pour chaque procédure, un index vectoriel et un index
+BM25 restreints à ses chunks: une recherche ciblée n'interroge que la
+partition sélectionnée au lieu de sur-échantillonner le corpus entier puis
+filtrer. "Toutes les procédures" utilise les index globaux (union des
+partitions). Chaque partition n'est chargée qu'à sa première utilisation.
+Les filtres de métadonnées (metadata_filters) s'appliquent dans toutes les
+partitions, avec les bitsets globaux de vector_store/filters/.
+
+Structure (dossier vector_store/partitions/):
+    partitions.json          {procédure: {"directory": "p000", "count": n}}
+    pNNN/ids.npy             IDs globaux (croissants) des chunks de la procédure
+    pNNN/index.faiss         index vectoriel de la partition (même type que l'index global)
+    pNNN/index_info.json     paramètres de recherche de cet index
+    pNNN/bm25/               index BM25 de la partition (IDF du corpus complet)
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from bm25_index import BM25Index
+from chunk_store import ChunkStore
+from metadata_filters import FilterBitmaps
+from vector_index import VectorIndex
+
+ALL_PROCEDURES = "Toutes les procédures"
+
+
+class SearchIndexes(NamedTuple):
+    """
+    Index vectoriel et lexical d'une partition (ou du corpus entier).
+    Les deux renvoient des IDs globaux de chunks.
+    """
+    vector_index: VectorIndex
+    bm25: BM25Index
+
+
+class PartitionedIndexes:
+    """
+    Accès paresseux aux index globaux et aux partitions par procédure.
+    Partagé entre les sessions Streamlit (chargements protégés par un verrou).
+    """
+
+    def __init__(self, directory: Path, embeddings, store: ChunkStore):
+        self.directory = Path(directory)
+        self.embeddings = embeddings
+        self.store = store
+        with open(self.directory / "partitions" / "partitions.json", 'r', encoding='utf-8') as f:
+            self._partitions: Dict[str, Dict] = json.load(f)
+        self.filters = FilterBitmaps(self.directory / "filters")
+        self.version = self._read_version()
+        self._loaded: Dict[str, SearchIndexes] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = Path(directory)
+        return (directory / "partitions" / "partitions.json").exists() and FilterBitmaps.exists(directory / "filters")
+
+    def _read_version(self) -> str:
+        """
+        Version de l'index (empreinte écrite par ingest.py), pour invalider
+        les caches qui en dépendent.
+        """
+        info_file = self.directory / "index_info.json"
+        if info_file.exists():
+            with open(info_file, 'r', encoding='utf-8') as f:
+                version = json.load(f).get("version")
+            if version:
+                return version
+        return f"mtime-{int((self.directory / 'index.faiss').stat().st_mtime)}"
+
+    @property
+    def procedures(self) -> List[str]:
+        return list(self._partitions)
+
+    @property
+    def loaded(self) -> List[str]:
+        return list(self._loaded)
+
+    def get(self, procedure: str = ALL_PROCEDURES) -> Optional[SearchIndexes]:
+        """
+        Index de la procédure (chargés à la première demande).
+
+        Returns:
+            SearchIndexes, ou None si aucun chunk n'appartient à la procédure
+        """
+        if procedure in self._loaded:
+            return self._loaded[procedure]
+        if procedure != ALL_PROCEDURES and procedure not in self._partitions:
+            return None
+
+        with self._lock:
+            if procedure not in self._loaded:
+                self._loaded[procedure] = self._load(procedure)
+        return self._loaded[procedure]
+
+    def _load(self, procedure: str) -> SearchIndexes:
+        if procedure == ALL_PROCEDURES:
+            return SearchIndexes(
+                VectorIndex.load(self.directory, self.embeddings, self.store),
+                BM25Index(self.directory / "bm25"),
+            )
+
+        partition_dir = self.directory / "partitions" / self._partitions[procedure]["directory"]
+        ids = np.load(partition_dir / "ids.npy")
+        return SearchIndexes(
+            VectorIndex.load(partition_dir, self.embeddings, self.store, ids=ids,
+                             vectors_file=self.directory / "vectors.npy"),
+            BM25Index(partition_dir / "bm25", doc_ids=ids),
+        )
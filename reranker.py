@@ -0,0 +1,164 @@
+"""
+Re-classement optionnel des chunks fusionnés par un cross-encoder.
+
+Le cross-encoder lit chaque paire (question, chunk) et juge sa pertinence
+bien mieux que la fusion RRF, mais coûte cher en CPU. Il n'est donc appelé
+que sur les questions ambiguës: si l'écart relatif des scores RRF entre le
+k-ième chunk retenu et le premier écarté dépasse min_gap, la fusion a déjà
+tranché et son ordre est gardé tel quel.
+
+Les candidats sont évalués par lots, dans l'ordre de la fusion, avec un
+budget de temps par question qui est une limite stricte: chaque lot est
+réduit au nombre de paires qui peuvent se terminer dans le budget restant
+(coût par paire estimé d'après les lots précédents). Si même une paire ne
+tient pas dans le budget, la question n'est pas re-classée (comptée dans
+skipped). Seuls les candidats évalués sont re-classés; les autres gardent
+leur rang de fusion, après eux.
+
+Le modèle est chargé par load(), à appeler au démarrage de l'application:
+le premier appel au modèle (allocations, caches de torch) est bien plus lent
+que les suivants, load() fait donc un appel de chauffe puis mesure un lot
+pour la première estimation du coût par paire. Sans modèle chargé ni
+estimation, aucune question n'est re-classée.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class CrossEncoderReranker:
+    """
+    Cross-encoder sentence-transformers, chargé par load().
+    Partagé par toutes les sessions et les threads de recherche (compteurs
+    et estimation protégés par un verrou).
+    """
+
+    def __init__(self, model_name: str, candidates: int = 12, min_gap: float = 0.2,
+                 budget_ms: float = 150, batch_size: int = 8, max_length: int = 512):
+        self.model_name = model_name
+        self.candidates = candidates
+        self.min_gap = min_gap
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+        self.reranked = 0
+        self.skipped = 0
+        self.truncated = 0
+        self._ms_per_pair: Optional[float] = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Charge le modèle, le chauffe et mesure le coût par paire (quelques
+        secondes, hors de toute question).
+        """
+        with self._load_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                model = CrossEncoder(self.model_name, max_length=self.max_length, device='cpu')
+                pairs = [("question", "texte")] * self.batch_size
+                # Chauffe: le premier predict est lent et fausserait le coût par paire
+                model.predict(pairs, show_progress_bar=False)
+                start = time.perf_counter()
+                model.predict(pairs, show_progress_bar=False)
+                with self._lock:
+                    self._ms_per_pair = (time.perf_counter() - start) * 1000 / len(pairs)
+                self._model = model
+        return self._model
+
+    def is_ambiguous(self, scores: np.ndarray, k: int) -> bool:
+        """
+        La fusion hésite-t-elle entre les derniers chunks retenus et les
+        premiers écartés ? (écart relatif des scores RRF sous min_gap)
+        """
+        if len(scores) <= k:
+            return False
+        return scores[k - 1] - scores[k] < self.min_gap * scores[k - 1]
+
+    def score(self, query: str, texts: list) -> np.ndarray:
+        """
+        Scores de pertinence des premiers textes pouvant être évalués dans
+        le budget de temps.
+
+        Returns:
+            Scores des len(résultat) premiers textes (au plus len(texts),
+            aucun si le modèle n'est pas chargé ou si une paire dépasse le budget)
+        """
+        model = self._model
+        scores = []
+        start = time.perf_counter()
+        while model is not None and len(scores) < len(texts):
+            with self._lock:
+                ms_per_pair = self._ms_per_pair
+            if ms_per_pair is None:
+                break
+            remaining = self.budget_ms - (time.perf_counter() - start) * 1000
+            fits = int(remaining // ms_per_pair) if ms_per_pair > 0 else self.batch_size
+            size = min(self.batch_size, len(texts) - len(scores), fits)
+            if size < 1:
+                break
+            batch = texts[len(scores):len(scores) + size]
+            batch_start = time.perf_counter()
+            scores.extend(model.predict([(query, text) for text in batch], show_progress_bar=False))
+            measured = (time.perf_counter() - batch_start) * 1000 / len(batch)
+            with self._lock:
+                # Hausse lissée, baisse immédiate: un lot lent isolé ne bride
+                # pas les questions suivantes
+                if self._ms_per_pair is not None and measured > self._ms_per_pair:
+                    measured = 0.8 * self._ms_per_pair + 0.2 * measured
+                self._ms_per_pair = measured
+        return np.asarray(scores, dtype=np.float32)
+
+    def rerank(self, query: str, ids: np.ndarray, scores: np.ndarray, k: int,
+               text: Callable[[int], str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Re-classe les candidats de la fusion si elle est ambiguë.
+
+        Args:
+            query: Question
+            ids: IDs des candidats, par score RRF décroissant
+            scores: Scores RRF des candidats
+            k: Nombre de chunks retenus ensuite
+            text: Texte d'un chunk à partir de son ID
+
+        Returns:
+            Tuple (IDs des candidats dans le nouvel ordre, scores du
+            cross-encoder des premiers IDs évalués ou None sans re-classement)
+        """
+        if not self.is_ambiguous(scores, k):
+            with self._lock:
+                self.skipped += 1
+            return ids, None
+        relevance = self.score(query, [text(int(i)) for i in ids])
+        scored = len(relevance)
+        with self._lock:
+            if scored == 0:
+                # Modèle non chargé ou budget trop court pour une seule paire
+                self.skipped += 1
+                return ids, None
+            self.reranked += 1
+            if scored < len(ids):
+                self.truncated += 1
+        order = np.argsort(-relevance, kind='stable')
+        return np.concatenate([ids[:scored][order], ids[scored:]]), relevance[order]
+
+    def stats(self) -> Dict:
+        """
+        Compteurs du re-classement (pour régler min_gap et le budget).
+        """
+        with self._lock:
+            decisions = self.reranked + self.skipped
+            return {
+                "model": self.model_name,
+                "reranked": self.reranked,
+                "skipped": self.skipped,
+                "truncated_by_budget": self.truncated,
+                "rerank_rate": round(self.reranked / decisions, 3) if decisions else 0.0,
+                "ms_per_pair": round(self._ms_per_pair, 2) if self._ms_per_pair is not None else None,
+            }
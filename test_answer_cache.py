@@ -0,0 +1,207 @@
+"""
+Script de test du cache sémantique des réponses (answer_cache.py).
+Vérifie le seuil de similarité, la durée de vie, la purge des autres
+versions de l'index, l'isolation des procédures, l'éviction LRU et le
+partage du fichier entre deux processus (deux instances du cache).
+
+Usage: python test_answer_cache.py
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from answer_cache import AnswerCache
+except ImportError:
+    print("❌ Erreur: Impossible d'importer answer_cache.py")
+    print("   Assurez-vous que answer_cache.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# DONNÉES DE TEST
+# ============================================
+
+SOURCES = [Document(page_content="L'embolisation dure environ une heure.",
+                    metadata={"procedure": "Embolisation prostate", "page": 2})]
+
+
+def vector_at(similarity: float, dimension: int = 8) -> np.ndarray:
+    """
+    Vecteur de similarité cosinus donnée avec e0 (la « question » de référence).
+    """
+    vector = np.zeros(dimension, dtype=np.float32)
+    vector[0] = similarity
+    vector[1] = np.sqrt(1 - similarity ** 2)
+    return vector
+
+
+REFERENCE = vector_at(1.0)
+
+
+def put(cache: AnswerCache, scope: str = "prostate", version: str = "v1",
+        question: str = "Combien de temps dure l'intervention ?", vector=REFERENCE, answer: str = "Une heure."):
+    cache.put(scope, version, question, vector, answer, SOURCES)
+
+
+def answer(result) -> str:
+    return result[0] if result is not None else None
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests du cache des réponses.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DU CACHE SÉMANTIQUE DES RÉPONSES")
+    print("=" * 70)
+
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # Seuil de similarité
+        cache = AnswerCache(tmp / "threshold", threshold=0.95)
+        put(cache)
+        hit = cache.get("prostate", "v1", vector_at(0.96))
+        checks.append((
+            "Seuil: question proche servie (similarité 0.96 >= 0.95)",
+            answer(hit) == "Une heure."
+            and [(d.page_content, d.metadata) for d in hit[1]] == [(d.page_content, d.metadata) for d in SOURCES]
+        ))
+        checks.append((
+            "Seuil: question trop éloignée ignorée (similarité 0.94)",
+            cache.get("prostate", "v1", vector_at(0.94)) is None
+        ))
+        checks.append((
+            "Seuil: vecteur non normalisé comparé en cosinus",
+            answer(cache.get("prostate", "v1", 10 * vector_at(0.99))) == "Une heure."
+        ))
+        checks.append((
+            "Compteurs hits / misses",
+            cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+        ))
+
+        # Isolation des portées (procédures)
+        cache = AnswerCache(tmp / "scope")
+        put(cache, scope="prostate", answer="Réponse prostate")
+        put(cache, scope="fibrome", answer="Réponse fibrome")
+        checks.append((
+            "Portée: chaque procédure reçoit sa propre réponse",
+            answer(cache.get("prostate", "v1", REFERENCE)) == "Réponse prostate"
+            and answer(cache.get("fibrome", "v1", REFERENCE)) == "Réponse fibrome"
+            and cache.get("varicocele", "v1", REFERENCE) is None
+        ))
+
+        # Purge des autres versions de l'index
+        cache = AnswerCache(tmp / "version")
+        put(cache, version="v1")
+        put(cache, version="v1", scope="fibrome")
+        missed = cache.get("prostate", "v2", REFERENCE)
+        checks.append((
+            "Version: entrées d'une autre version ignorées puis supprimées",
+            missed is None and len(cache) == 0
+            and len(AnswerCache(tmp / "version")) == 0
+        ))
+
+        # Durée de vie
+        cache = AnswerCache(tmp / "ttl", ttl_seconds=0.3)
+        put(cache)
+        fresh = cache.get("prostate", "v1", REFERENCE)
+        time.sleep(0.4)
+        checks.append((
+            "TTL: entrée servie avant expiration, supprimée après",
+            answer(fresh) == "Une heure." and cache.get("prostate", "v1", REFERENCE) is None and len(cache) == 0
+        ))
+        checks.append((
+            "TTL: entrées expirées non rechargées depuis le disque",
+            len(AnswerCache(tmp / "ttl", ttl_seconds=0.3)) == 0
+        ))
+
+        # Éviction LRU: l'entrée servie récemment est conservée
+        cache = AnswerCache(tmp / "lru", max_entries=2, save_interval=0)
+        put(cache, question="q1", vector=vector_at(1.0))
+        put(cache, question="q2", vector=vector_at(0.5))
+        cache.get("prostate", "v1", vector_at(1.0))
+        put(cache, question="q3", vector=vector_at(0.0))
+        checks.append((
+            "LRU: la moins récemment utilisée est évincée",
+            sorted(e["question"] for e in cache._entries) == ["q1", "q3"]
+        ))
+
+        # Date d'utilisation enregistrée sur disque (différée)
+        cache = AnswerCache(tmp / "used", save_interval=3600)
+        put(cache)
+        written = AnswerCache(tmp / "used")._entries[0]["used"]
+        cache.get("prostate", "v1", REFERENCE)
+        not_yet = AnswerCache(tmp / "used")._entries[0]["used"]
+        cache.flush()
+        after_flush = AnswerCache(tmp / "used")._entries[0]["used"]
+        checks.append((
+            "Hit: date d'utilisation écrite après save_interval ou flush()",
+            not_yet == written and after_flush == cache._entries[0]["used"] > written
+        ))
+        immediate = AnswerCache(tmp / "used_now", save_interval=0)
+        put(immediate)
+        immediate.get("prostate", "v1", REFERENCE)
+        checks.append((
+            "Hit: save_interval = 0 écrit à chaque réponse servie",
+            AnswerCache(tmp / "used_now")._entries[0]["used"] == immediate._entries[0]["used"]
+        ))
+
+        # Deux processus partageant le même fichier
+        first = AnswerCache(tmp / "shared")
+        second = AnswerCache(tmp / "shared")
+        put(first, question="q1", answer="Réponse 1")
+        put(second, scope="fibrome", question="q2", answer="Réponse 2")
+        put(first, scope="varicocele", question="q3", answer="Réponse 3")
+        reopened = AnswerCache(tmp / "shared")
+        checks.append((
+            "Partage: aucune écriture ne fait perdre les entrées de l'autre instance",
+            sorted(e["question"] for e in reopened._entries) == ["q1", "q2", "q3"]
+            and answer(reopened.get("fibrome", "v1", REFERENCE)) == "Réponse 2"
+        ))
+        first.get("prostate", "v2", REFERENCE)  # nouvelle version: first purge tout
+        put(second, scope="cancer", question="q4")
+        put(first, version="v2", question="q5")
+        checks.append((
+            "Partage: une entrée supprimée par une instance n'est pas reprise du fichier",
+            sorted((e["version"], e["question"]) for e in first._entries) == [("v1", "q4"), ("v2", "q5")]
+        ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
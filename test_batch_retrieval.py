@@ -0,0 +1,199 @@
+"""
+Script de test de la recherche par lots (HybridRetriever.batch_retrieve).
+Construit un petit index (ingest.py, embeddings déterministes dont les
+requêtes portent un préfixe, comme les modèles à instruction) et vérifie
+que batch_retrieve renvoie exactement les chunks et les scores de
+_get_relevant_documents, question par question.
+
+Usage: python test_batch_retrieval.py
+"""
+
+import io
+import sys
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    import ingest
+    from app import HybridRetriever
+    from chunk_store import ChunkStore
+    from context_packing import SCORE_KEY
+    from embedding_cache import QueryEmbeddingCache
+    from partitions import ALL_PROCEDURES, PartitionedIndexes
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+except ImportError:
+    print("❌ Erreur: Impossible d'importer app.py / ingest.py")
+    print("   Assurez-vous que app.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# INDEX ET EMBEDDINGS DE SUBSTITUTION
+# ============================================
+
+TOPICS = {
+    "Embolisation prostate": ["prostate", "urinaire", "artère", "cathéter"],
+    "Fibrome utérin": ["fibrome", "utérus", "règles", "artère"],
+    "Varicocèle": ["varicocèle", "testicule", "veine", "douleur"],
+}
+
+QUESTIONS = [
+    "Combien de temps dure l'embolisation de la prostate ?",
+    "Le cathéter passe-t-il par l'artère ?",
+    "Les règles sont-elles plus abondantes avec un fibrome ?",
+    "Douleur au testicule après traitement de la varicocèle",
+    "Combien de temps dure l'embolisation de la prostate ?",
+    "  Combien de temps dure   l'embolisation de la prostate ?",
+    "Question sans aucun mot de l'index",
+    "veine",
+]
+
+
+class PrefixedQueryEmbeddings(DeterministicFakeEmbedding):
+    """
+    Embeddings déterministes dont les requêtes reçoivent un préfixe
+    d'instruction: embed_query(q) diffère de embed_documents([q]).
+    """
+
+    def embed_query(self, text: str):
+        return super().embed_query("question : " + text)
+
+
+def pages() -> list:
+    """
+    Deux pages par procédure, de 2 à 3 chunks chacune.
+    """
+    documents = []
+    for topic, words in TOPICS.items():
+        for number in range(2):
+            sentences = [f"Phrase {i} sur {words[i % len(words)]} et {words[(i + number) % len(words)]}, "
+                         f"page {number} de la procédure {topic}." for i in range(14)]
+            documents.append(Document(page_content=" ".join(sentences), metadata={
+                "source_url": f"https://exemple.fr/{len(documents)}/",
+                "source_type": "web",
+                "folder": "faq" if number else "guide",
+                "procedure": topic,
+            }))
+    return documents
+
+
+def build_index(directory: Path, embeddings):
+    """
+    Ingestion des pages dans directory/vector_store.
+    """
+    ingest.PDF_DIR = directory / "pdfs"
+    ingest.PDF_DIR.mkdir(parents=True)
+    ingest.VECTOR_STORE_DIR = directory / "vector_store"
+    for name, file_name in [
+        ("INDEX_FILE", "index.faiss"), ("CHUNK_STORE_DIR", "chunks"), ("BM25_DIR", "bm25"),
+        ("VECTORS_FILE", "vectors.npy"), ("INDEX_INFO_FILE", "index_info.json"),
+        ("PARTITIONS_DIR", "partitions"), ("FILTERS_DIR", "filters"),
+        ("MANIFEST_FILE", "manifest.json"), ("CHECKPOINT_DIR", ".checkpoint"),
+    ]:
+        setattr(ingest, name, ingest.VECTOR_STORE_DIR / file_name)
+    ingest.WEB_URLS = {}
+    ingest.create_embeddings = lambda: embeddings
+    ingest.scrape_website = pages
+    with contextlib.redirect_stdout(io.StringIO()):
+        ingest.main(full_rebuild=True, workers=1)
+
+
+def results(docs_per_question) -> list:
+    """
+    (chunk_id, score de fusion) des documents retenus pour chaque question.
+    """
+    return [[(doc.metadata["chunk_id"], doc.metadata[SCORE_KEY]) for doc in docs] for docs in docs_per_question]
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests de la recherche par lots.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DE LA RECHERCHE PAR LOTS - ÉQUIVALENCE QUESTION PAR QUESTION")
+    print("=" * 70)
+
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        base = PrefixedQueryEmbeddings(size=16)
+        build_index(Path(tmp), base)
+
+        embeddings = QueryEmbeddingCache(base, max_entries=0)
+        checks.append((
+            "embed_queries: mêmes vecteurs que embed_query (préfixe de requête compris)",
+            np.array_equal(embeddings.embed_queries(QUESTIONS[:4]),
+                           np.asarray([base.embed_query(q) for q in QUESTIONS[:4]], dtype=np.float32))
+        ))
+
+        store = ChunkStore(ingest.CHUNK_STORE_DIR)
+        retriever = HybridRetriever(
+            indexes=PartitionedIndexes(ingest.VECTOR_STORE_DIR, embeddings, store),
+            store=store,
+            k=3,
+            alpha=0.6,
+        )
+        cases = [
+            ("toutes les procédures", retriever, ALL_PROCEDURES),
+            ("une partition", retriever, "Fibrome utérin"),
+            ("filtre de métadonnées", retriever.model_copy(update={"metadata_filter": {"folder": "faq"}}),
+             ALL_PROCEDURES),
+            ("partition et filtre", retriever.model_copy(update={"metadata_filter": {"folder": "guide"}}),
+             "Varicocèle"),
+        ]
+        for label, case, procedure in cases:
+            single = [case.for_procedure(procedure).invoke(question) for question in QUESTIONS]
+            batched = case.batch_retrieve(QUESTIONS, procedure=procedure, batch_size=3)
+            checks.append((
+                f"batch_retrieve = _get_relevant_documents ({label}): mêmes chunks, mêmes scores",
+                all(single) and results(batched) == results(single)
+            ))
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            threaded = retriever.model_copy(update={"executor": executor})
+            checks.append((
+                "batch_retrieve avec pool de threads: résultats identiques",
+                results(threaded.batch_retrieve(QUESTIONS)) == results([retriever.invoke(q) for q in QUESTIONS])
+            ))
+        checks.append((
+            "Procédure inconnue et liste vide",
+            retriever.batch_retrieve(QUESTIONS[:2], procedure="Inconnue") == [[], []]
+            and retriever.batch_retrieve([]) == []
+        ))
+        del retriever, store
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
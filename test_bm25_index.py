@@ -0,0 +1,198 @@
+"""
+Script de test de l'index BM25 construit à l'ingestion (bm25_index.py).
+Compare les scores et les classements à rank_bm25.BM25Okapi sur un petit
+corpus, pour l'index global et pour un index de partition, et l'ordre des
+ex-aequo de top_k (argpartition) à celui d'un tri stable.
+
+Usage: python test_bm25_index.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from rank_bm25 import BM25Okapi
+    from bm25_index import BM25Index, build_bm25_index, build_bm25_partition, tokenize, top_k
+    from metadata_filters import pack_mask
+except ImportError:
+    print("❌ Erreur: Impossible d'importer rank_bm25 / bm25_index / metadata_filters")
+    print("   Assurez-vous que bm25_index.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# CORPUS DE TEST
+# ============================================
+
+# Termes fréquents (IDF négatif corrigé par epsilon), doublons (ex-aequo),
+# accents, chunk vide et longueurs de chunks variées
+CORPUS = [
+    "L'embolisation de la prostate est réalisée sous anesthésie locale.",
+    "L'embolisation utérine traite les fibromes sans chirurgie.",
+    "La biopsie sous scanner permet un prélèvement précis de la lésion.",
+    "La chambre implantable est posée sous anesthésie locale.",
+    "L'embolisation utérine traite les fibromes sans chirurgie.",
+    "",
+    "Après l'embolisation, la douleur est traitée par des antalgiques. La douleur diminue en quelques jours.",
+    "Le prélèvement est analysé au laboratoire d'anatomopathologie.",
+    "La varicocèle est une dilatation des veines du testicule.",
+    "la la la la embolisation",
+]
+
+QUERIES = [
+    "embolisation de la prostate",
+    "anesthésie locale",
+    "douleur douleur après embolisation",
+    "fibromes",
+    "la",
+    "terme inconnu",
+    "",
+    "Biopsie SOUS scanner",
+]
+
+# Partition: chunks d'une même procédure (IDs globaux croissants)
+PARTITION_IDS = np.array([0, 1, 4, 6, 9])
+
+
+def stable_ranking(scores: np.ndarray, k: int) -> list:
+    """
+    Classement de référence: tri stable des scores décroissants
+    (ex-aequo par ID croissant), comme l'ancien tri Python.
+    """
+    return np.argsort(-scores, kind='stable')[:k].tolist()
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests de l'index BM25.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DE L'INDEX BM25 - ÉQUIVALENCE AVEC BM25Okapi")
+    print("=" * 70)
+
+    tokenized_corpus = [tokenize(text) for text in CORPUS]
+    tokenized_queries = [tokenize(query) for query in QUERIES]
+    okapi = BM25Okapi(tokenized_corpus)
+
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        build_bm25_index(CORPUS, Path(tmp) / "bm25")
+        index = BM25Index(Path(tmp) / "bm25")
+        build_bm25_partition(index, PARTITION_IDS, Path(tmp) / "partition")
+        partition = BM25Index(Path(tmp) / "partition", doc_ids=PARTITION_IDS)
+
+        expected = [okapi.get_scores(query) for query in tokenized_queries]
+        scores = [index.get_scores(query) for query in tokenized_queries]
+
+        checks.append((
+            "Nombre de chunks et taille du vocabulaire",
+            len(index) == len(CORPUS)
+            and index.vocabulary_size == len({t for tokens in tokenized_corpus for t in tokens})
+        ))
+        checks.append((
+            "get_scores identique à BM25Okapi (au bit près)",
+            all(np.array_equal(a, b) for a, b in zip(scores, expected))
+        ))
+        checks.append((
+            "get_scores_batch identique à get_scores",
+            np.array_equal(index.get_scores_batch(tokenized_queries), np.vstack(scores))
+        ))
+        checks.append((
+            "top_k identique au tri des scores BM25Okapi (k = 1, 3, tout le corpus)",
+            all(
+                index.top_k(query, k).tolist() == stable_ranking(expected_scores, k)
+                for query, expected_scores in zip(tokenized_queries, expected)
+                for k in (1, 3, len(CORPUS) + 5)
+            )
+        ))
+        checks.append((
+            "top_k_batch identique à top_k",
+            all(
+                a.tolist() == index.top_k(query, 4).tolist()
+                for a, query in zip(index.top_k_batch(tokenized_queries, 4), tokenized_queries)
+            )
+        ))
+        checks.append((
+            "Partition: scores = scores globaux restreints aux chunks de la partition",
+            all(
+                np.array_equal(partition.get_scores(query), expected_scores[PARTITION_IDS])
+                for query, expected_scores in zip(tokenized_queries, expected)
+            )
+        ))
+        checks.append((
+            "Partition: top_k renvoie les IDs globaux dans l'ordre de BM25Okapi",
+            all(
+                partition.top_k(query, 3).tolist()
+                == PARTITION_IDS[stable_ranking(expected_scores[PARTITION_IDS], 3)].tolist()
+                for query, expected_scores in zip(tokenized_queries, expected)
+            )
+        ))
+        checks.append((
+            "Partition: vocabulaire limité aux termes de ses chunks",
+            partition.term_id("varicocèle") is None and partition.term_id("prostate") is not None
+        ))
+
+        # Filtre de métadonnées: chunks pairs uniquement
+        allowed = np.arange(len(CORPUS)) % 2 == 0
+        bitmap = pack_mask(allowed)
+        checks.append((
+            "top_k filtré par bitmap = tri stable restreint aux chunks autorisés",
+            all(
+                index.top_k(query, 3, bitmap).tolist()
+                == np.flatnonzero(allowed)[stable_ranking(expected_scores[allowed], 3)].tolist()
+                for query, expected_scores in zip(tokenized_queries, expected)
+            )
+        ))
+        del index, partition
+
+    # Ex-aequo: scores tirés parmi quelques valeurs seulement, le k-ième
+    # score est presque toujours partagé par plusieurs chunks
+    rng = np.random.default_rng(0)
+    tie_cases = [
+        (rng.integers(0, levels, size).astype(np.float64), k)
+        for size, levels in [(1, 1), (7, 1), (50, 2), (50, 3), (500, 4), (2000, 10)]
+        for k in (1, 2, 5, 16, 100, 5000)
+    ]
+    checks.append((
+        f"top_k: ex-aequo dans le même ordre qu'un tri stable ({len(tie_cases)} cas)",
+        all(top_k(scores, k).tolist() == stable_ranking(scores, k) for scores, k in tie_cases)
+    ))
+    checks.append((
+        "top_k: k <= 0 et tableau vide",
+        len(top_k(np.ones(5), 0)) == 0 and len(top_k(np.zeros(0), 3)) == 0
+    ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Script de test du chunk store mappé en mémoire (chunk_store.py).
+Écrit des chunks aux métadonnées hétérogènes (colonnes absentes, entiers,
+booléens, textes accentués...), rouvre le store et compare chaque chunk et
+chaque colonne aux originaux. Vérifie aussi replace_directory.
+
+Usage: python test_chunk_store.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from chunk_store import ChunkStore, ChunkStoreWriter, INT_MISSING, replace_directory
+except ImportError:
+    print("❌ Erreur: Impossible d'importer chunk_store.py")
+    print("   Assurez-vous que chunk_store.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# CHUNKS DE TEST
+# ============================================
+
+DOCUMENTS = [
+    Document(
+        page_content="L'embolisation de la prostate est réalisée sous anesthésie locale.",
+        metadata={"procedure": "Embolisation prostate", "source_type": "pdf", "page": 0, "start_index": 0},
+    ),
+    Document(
+        page_content="Après l'intervention : surveillance 24 h — douleur traitée. 🩺",
+        metadata={"procedure": "Embolisation prostate", "source_type": "pdf", "page": 3, "start_index": 512},
+    ),
+    Document(
+        # Colonnes absentes (page, start_index) et nouvelle colonne (source_url)
+        page_content="La varicocèle est une dilatation des veines du testicule.",
+        metadata={"procedure": "Varicocèle", "source_type": "web", "source_url": "https://exemple.fr/varicocèle/"},
+    ),
+    Document(page_content="", metadata={}),
+    Document(
+        # Valeurs non textuelles: booléen, flottant, None, liste, entier et texte mélangés
+        page_content="Chunk aux métadonnées variées.\nSur deux lignes.",
+        metadata={"procedure": None, "validated": True, "score": 0.75, "tags": ["rein", "foie"], "version": 2},
+    ),
+    Document(
+        page_content="Même texte que le premier chunk ? Non, mais même procédure.",
+        metadata={"procedure": "Embolisation prostate", "validated": 1, "version": "v3", "page": 12},
+    ),
+]
+
+DICT_COLUMNS = ["procedure", "source_type", "source_url", "validated", "score", "tags", "version"]
+INT_COLUMNS = ["page", "start_index"]
+
+
+def _typed(value):
+    """
+    Valeur accompagnée de son type (True et 1 doivent rester distincts).
+    """
+    return type(value).__name__, value
+
+
+def _distinct(name: str) -> list:
+    """
+    Valeurs distinctes (typées) d'une métadonnée, dans l'ordre de première apparition.
+    """
+    values = []
+    for doc in DOCUMENTS:
+        if name in doc.metadata and _typed(doc.metadata[name]) not in values:
+            values.append(_typed(doc.metadata[name]))
+    return values
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests du chunk store.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DU CHUNK STORE - ALLER-RETOUR DISQUE")
+    print("=" * 70)
+
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        writer = ChunkStoreWriter(tmp / "chunks.tmp")
+        writer.add_many(DOCUMENTS)
+        writer.close()
+        replace_directory(tmp / "chunks.tmp", tmp / "chunks")
+        store = ChunkStore(tmp / "chunks")
+
+        checks.append((
+            "Nombre de chunks et colonnes",
+            len(store) == len(DOCUMENTS) and sorted(store.column_names) == sorted(DICT_COLUMNS + INT_COLUMNS)
+        ))
+        checks.append((
+            "document(i): texte et métadonnées identiques (types compris)",
+            all(
+                store.document(i).page_content == doc.page_content
+                and {k: _typed(v) for k, v in store.document(i).metadata.items()}
+                == {k: _typed(v) for k, v in doc.metadata.items()}
+                for i, doc in enumerate(DOCUMENTS)
+            )
+        ))
+        checks.append((
+            "documents(ids) dans l'ordre demandé",
+            [d.page_content for d in store.documents([5, 0, 2])]
+            == [DOCUMENTS[i].page_content for i in (5, 0, 2)]
+        ))
+        checks.append((
+            "column_values: valeurs distinctes dans l'ordre d'apparition",
+            all(
+                [_typed(v) for v in store.column_values(name)] == _distinct(name)
+                for name in DICT_COLUMNS
+            ) and store.column_values("page") == []
+        ))
+        checks.append((
+            "codes: index dans column_values, -1 si absent",
+            all(
+                np.asarray(store.codes(name)).tolist() == [
+                    _distinct(name).index(_typed(doc.metadata[name]))
+                    if name in doc.metadata else -1
+                    for doc in DOCUMENTS
+                ]
+                for name in DICT_COLUMNS
+            )
+        ))
+        checks.append((
+            "Colonnes entières: valeurs directes, INT_MISSING si absent",
+            all(
+                np.asarray(store.codes(name)).tolist()
+                == [doc.metadata.get(name, INT_MISSING) for doc in DOCUMENTS]
+                for name in INT_COLUMNS
+            )
+        ))
+        checks.append((
+            "mask(): valeurs textuelles, entières, None et listes",
+            store.mask("procedure", "Embolisation prostate").tolist() == [True, True, False, False, False, True]
+            and store.mask("procedure", None).tolist() == [False, False, False, False, True, False]
+            and store.mask("page", 3).tolist() == [False, True, False, False, False, False]
+            and store.mask("tags", ["rein", "foie"]).tolist() == [False, False, False, False, True, False]
+        ))
+        checks.append((
+            "mask(): True et 1 distincts",
+            store.mask("validated", True).tolist() == [False, False, False, False, True, False]
+            and store.mask("validated", 1).tolist() == [False, False, False, False, False, True]
+        ))
+        checks.append((
+            "mask(): valeur ou colonne inconnue",
+            not store.mask("procedure", "Inconnue").any() and not store.mask("inconnue", "x").any()
+        ))
+
+        # Store vide
+        writer = ChunkStoreWriter(tmp / "empty")
+        writer.close()
+        empty = ChunkStore(tmp / "empty")
+        checks.append((
+            "Store vide relu",
+            len(empty) == 0 and empty.column_names == []
+        ))
+
+        # Remplacement d'un store existant (ingestion suivante), avec un
+        # dossier .old laissé par une exécution interrompue
+        writer = ChunkStoreWriter(tmp / "chunks.tmp")
+        writer.add(Document(page_content="Nouveau contenu", metadata={"procedure": "Biopsie"}))
+        writer.close()
+        (tmp / "chunks.old").mkdir()
+        (tmp / "chunks.old" / "reste.bin").write_bytes(b"x")
+        del store
+        replace_directory(tmp / "chunks.tmp", tmp / "chunks")
+        replaced = ChunkStore(tmp / "chunks")
+        checks.append((
+            "replace_directory sur un dossier existant",
+            len(replaced) == 1 and replaced.text(0) == "Nouveau contenu"
+            and replaced.column_values("procedure") == ["Biopsie"]
+            and not (tmp / "chunks.tmp").exists() and not (tmp / "chunks.old").exists()
+            and sorted(p.name for p in tmp.iterdir()) == ["chunks", "empty"]
+        ))
+        del replaced, empty
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Script de test de la compression extractive du contexte (context_compression.py).
+Avec des embeddings de substitution (mots-clés), vérifie le découpage en
+phrases, le choix des phrases les plus proches de la question, leur ordre
+d'origine, les marqueurs de coupure et les passages retirés.
+
+Usage: python test_context_compression.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from context_packing import TokenCounter
+    from context_compression import GAP_MARKER, ContextCompressor, split_sentences
+except ImportError:
+    print("❌ Erreur: Impossible d'importer context_compression.py / context_packing.py")
+    print("   Assurez-vous que context_compression.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# EMBEDDINGS DE SUBSTITUTION
+# ============================================
+
+KEYWORDS = ["durée", "anesthésie", "douleur", "cathéter", "fibrome", "biopsie"]
+
+
+class KeywordEmbeddings:
+    """
+    Vecteur = présence de chaque mot-clé (plus une composante commune): la
+    similarité avec la question ne dépend que des mots-clés partagés.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_passages(self, texts):
+        self.calls += 1
+        return np.array([self.vector(text) for text in texts], dtype=np.float32)
+
+    @staticmethod
+    def vector(text: str) -> np.ndarray:
+        text = text.lower()
+        return np.array([0.1] + [float(keyword in text) for keyword in KEYWORDS], dtype=np.float32)
+
+
+PASSAGES = [
+    Document(
+        page_content=(
+            "L'embolisation se pratique en salle de radiologie interventionnelle. "
+            "La durée de l'intervention est d'environ une heure et demie. "
+            "Le patient est installé sur le dos pendant toute la procédure. "
+            "Une anesthésie locale est faite au point de ponction du cathéter."
+        ),
+        metadata={"source": "prostate.pdf", "page": 2, "fusion_score": 0.03},
+    ),
+    Document(
+        page_content=(
+            "Le fibrome est une tumeur bénigne fréquente de l'utérus chez la femme. "
+            "Les règles abondantes en sont le symptôme le plus fréquent."
+        ),
+        metadata={"source": "fibrome.pdf", "page": 1, "fusion_score": 0.02},
+    ),
+    Document(
+        page_content=(
+            "Après l'intervention, une douleur pelvienne peut survenir pendant quelques jours. "
+            "Elle est soulagée par des antalgiques prescrits à la sortie de l'hôpital."
+        ),
+        metadata={"source": "prostate.pdf", "page": 5, "fusion_score": 0.01},
+    ),
+]
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests de la compression du contexte.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DE LA COMPRESSION EXTRACTIVE DU CONTEXTE")
+    print("=" * 70)
+
+    checks = []
+
+    # Découpage en phrases
+    checks.append((
+        "split_sentences: phrases séparées, espaces normalisés",
+        split_sentences("Première phrase assez longue pour compter. Deuxième phrase\n  assez longue elle aussi.", 20)
+        == ["Première phrase assez longue pour compter.", "Deuxième phrase assez longue elle aussi."]
+    ))
+    checks.append((
+        "split_sentences: fragment court rattaché à la phrase suivante",
+        split_sentences("Titre :\n\nLe texte de la section est suffisamment long.", 20)
+        == ["Titre : Le texte de la section est suffisamment long."]
+    ))
+    checks.append((
+        "split_sentences: dernier fragment court rattaché à la phrase précédente",
+        split_sentences("Une phrase suffisamment longue pour compter. Fin.", 20)
+        == ["Une phrase suffisamment longue pour compter. Fin."]
+    ))
+    checks.append((
+        "split_sentences: pas de coupure après une abréviation suivie d'une minuscule",
+        len(split_sentences("Le traitement dure env. deux heures au total avec la préparation.", 20)) == 1
+    ))
+
+    counter = TokenCounter()
+    embeddings = KeywordEmbeddings()
+    compressor = ContextCompressor(embeddings, counter, max_sentences=3, min_chars=40)
+    query = KeywordEmbeddings.vector("Quelle est la durée, l'anesthésie et la douleur ?")
+    compressed = compressor.compress(query, PASSAGES)
+
+    first = split_sentences(PASSAGES[0].page_content, 40)
+    third = split_sentences(PASSAGES[2].page_content, 40)
+    checks.append((
+        "Phrases les plus proches gardées, dans l'ordre d'origine",
+        [doc.page_content for doc in compressed] == [
+            first[1] + GAP_MARKER + first[3],
+            third[0],
+        ]
+    ))
+    checks.append((
+        "Passage sans phrase retenue retiré, métadonnées conservées",
+        [doc.metadata for doc in compressed] == [PASSAGES[0].metadata, PASSAGES[2].metadata]
+    ))
+
+    neighbours = PASSAGES[0].page_content.replace("Le patient est installé", "La durée: le patient est installé")
+    contiguous = compressor.compress(KeywordEmbeddings.vector("durée anesthésie cathéter"),
+                                     [Document(page_content=neighbours, metadata={})])
+    checks.append((
+        "Phrases voisines jointes par une espace, marqueur seulement pour une coupure",
+        [doc.page_content for doc in contiguous] == [" ".join(split_sentences(neighbours, 40)[1:])]
+    ))
+
+    calls = embeddings.calls
+    short = [Document(page_content="Une seule phrase assez longue pour être gardée telle quelle.", metadata={"page": 1})]
+    unchanged = compressor.compress(query, short)
+    checks.append((
+        "Moins de phrases que max_sentences: passages inchangés, sans encodage",
+        [doc.page_content for doc in unchanged] == [short[0].page_content] and embeddings.calls == calls
+    ))
+
+    stats = compressor.stats()
+    checks.append((
+        "Statistiques: phrases et tokens gardés",
+        stats["contexts"] == 3
+        and stats["sentences_total"] == len(first) + 2 + len(third) + 4 + 1
+        and stats["sentences_kept"] == 3 + 3 + 1
+        and 0 < stats["token_ratio"] < 1
+    ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
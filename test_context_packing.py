@@ -0,0 +1,196 @@
+"""
+Script de test de la construction du contexte (context_packing.py).
+Vérifie la fusion des chunks qui se chevauchent (y compris un chunk inclus
+dans un autre), la suppression des doublons exacts, le seuil de score, le
+budget de tokens et la troncature d'un premier passage trop long.
+
+Usage: python test_context_packing.py
+"""
+
+import sys
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from context_packing import RERANK_SCORE_KEY, SCORE_KEY, TokenCounter, merge_neighbors, pack_context
+except ImportError:
+    print("❌ Erreur: Impossible d'importer context_packing.py")
+    print("   Assurez-vous que context_packing.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# DONNÉES DE TEST
+# ============================================
+
+# Page source découpée comme par le text splitter (chunks qui se chevauchent)
+PAGE = (
+    "L'embolisation des artères prostatiques est réalisée sous anesthésie locale. "
+    "Un cathéter est introduit par l'artère fémorale ou radiale. "
+    "Des microparticules sont injectées pour réduire l'apport sanguin de la prostate. "
+    "L'intervention dure entre une et deux heures. "
+    "Le patient reste allongé quelques heures puis peut généralement rentrer le lendemain."
+)
+
+
+def chunk(start: int, end: int, score: float = None, page: int = 1, source: str = "prostate.pdf") -> Document:
+    """
+    Chunk PAGE[start:end] avec les métadonnées de l'ingestion.
+    """
+    metadata = {"source": source, "page": page, "start_index": start}
+    if score is not None:
+        metadata[SCORE_KEY] = score
+    return Document(page_content=PAGE[start:end], metadata=metadata)
+
+
+def texts(docs) -> list:
+    return [doc.page_content for doc in docs]
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests de la construction du contexte.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DE LA CONSTRUCTION DU CONTEXTE - FUSION ET BUDGET")
+    print("=" * 70)
+
+    checks = []
+
+    # Fusion des chunks voisins, dans le désordre des rangs
+    merged = merge_neighbors([chunk(120, 260, 0.9), chunk(0, 140, 0.5), chunk(240, 380, 0.7)])
+    checks.append((
+        "Chunks qui se chevauchent fusionnés en un passage continu",
+        texts(merged) == [PAGE[0:380]]
+    ))
+    checks.append((
+        "Passage fusionné: start_index du premier chunk, meilleur score",
+        merged[0].metadata["start_index"] == 0 and merged[0].metadata[SCORE_KEY] == 0.9
+    ))
+
+    merged = merge_neighbors([chunk(40, 90, 0.8), chunk(0, 200, 0.6)])
+    checks.append((
+        "Chunk entièrement inclus dans un autre: aucun texte répété",
+        texts(merged) == [PAGE[0:200]] and merged[0].metadata[SCORE_KEY] == 0.8
+    ))
+
+    merged = merge_neighbors([chunk(0, 150), chunk(150, 300)])
+    checks.append((
+        "Chunks contigus (fin = début du suivant) fusionnés",
+        texts(merged) == [PAGE[0:300]]
+    ))
+
+    merged = merge_neighbors([chunk(200, 300), chunk(0, 100), chunk(0, 100, page=2)])
+    checks.append((
+        "Chunks disjoints ou d'une autre page: passages séparés, ordre des rangs",
+        texts(merged) == [PAGE[200:300], PAGE[0:100]]
+    ))
+
+    duplicate = Document(page_content=PAGE[0:100], metadata={"source": "copie.pdf", "page": 4})
+    merged = merge_neighbors([chunk(0, 100), duplicate, chunk(300, 380)])
+    checks.append((
+        "Doublons exacts (autre source) supprimés, le mieux classé gardé",
+        texts(merged) == [PAGE[0:100], PAGE[300:380]] and merged[0].metadata["source"] == "prostate.pdf"
+    ))
+
+    no_offset = [Document(page_content=PAGE[0:100], metadata={"source": "web", "page": 1}),
+                 Document(page_content=PAGE[50:150], metadata={"source": "web", "page": 1})]
+    checks.append((
+        "Chunks sans start_index jamais fusionnés",
+        texts(merge_neighbors(no_offset)) == [PAGE[0:100], PAGE[50:150]]
+    ))
+
+    # Seuil de score relatif au meilleur chunk
+    counter = TokenCounter()
+    docs = [chunk(0, 100, 1.0), chunk(150, 250, 0.5, page=2), chunk(300, 380, 0.3, page=3)]
+    _, used = pack_context(docs, 10000, counter, min_score=0.4)
+    checks.append((
+        "min_score: chunks sous 0.4 x meilleur score retirés",
+        texts(used) == [PAGE[0:100], PAGE[150:250]]
+    ))
+    _, used = pack_context(docs, 10000, counter, min_score=0.0)
+    checks.append((
+        "min_score = 0: tous les chunks gardés",
+        len(used) == 3
+    ))
+
+    # Scores RRF réels (alpha = 0.6, rang + 60): chunk trouvé par BM25 seul au
+    # dernier des 8 rangs, face à un chunk classé premier par les deux recherches
+    alpha, offset, last_rank = 0.6, 60, 7
+    both = alpha / offset + (1 - alpha) / offset
+    bm25_only = (1 - alpha) / (last_rank + offset)
+    fused = [chunk(0, 100, both), chunk(300, 380, bm25_only, page=3)]
+    _, used = pack_context(fused, 10000, counter)
+    _, derived = pack_context(fused, 10000, counter, min_score=min(alpha, 1 - alpha) * offset / (offset + last_rank))
+    _, legacy = pack_context(fused, 10000, counter, min_score=0.4)
+    checks.append((
+        "Chunk trouvé par BM25 seul gardé par défaut et sous le seuil dérivé d'alpha",
+        texts(used) == texts(derived) == [PAGE[0:100], PAGE[300:380]] and texts(legacy) == [PAGE[0:100]]
+    ))
+
+    # Chunks re-classés: le cross-encoder a remonté des chunks de faible score de fusion
+    reranked = [chunk(300, 380, 0.3, page=3), chunk(0, 100, 1.0), chunk(150, 250, 0.2, page=2)]
+    for doc, relevance in zip(reranked, (4.2, 3.1, 1.5)):
+        doc.metadata[RERANK_SCORE_KEY] = relevance
+    _, used = pack_context(reranked, 10000, counter, min_score=0.4)
+    checks.append((
+        "Chunks re-classés: seuil de fusion ignoré, ordre du cross-encoder gardé",
+        texts(used) == [PAGE[300:380], PAGE[0:100], PAGE[150:250]]
+    ))
+
+    # Budget de tokens
+    budget = counter.count(PAGE[0:100]) + counter.count("\n\n") + counter.count(PAGE[300:380])
+    docs = [chunk(0, 100, 1.0), chunk(120, 290, 0.9, page=2), chunk(300, 380, 0.8, page=3)]
+    context, used = pack_context(docs, budget, counter)
+    checks.append((
+        "Budget: passage trop long sauté, le suivant plus court ajouté",
+        texts(used) == [PAGE[0:100], PAGE[300:380]] and context == PAGE[0:100] + "\n\n" + PAGE[300:380]
+    ))
+    checks.append((
+        "Budget: contexte (séparateurs compris) dans le budget",
+        counter.count(context) <= budget
+    ))
+
+    context, used = pack_context([chunk(0, len(PAGE), 1.0)], 20, counter)
+    checks.append((
+        "Premier passage plus long que le budget: tronqué, jamais de contexte vide",
+        len(used) == 1 and PAGE.startswith(context) and 0 < counter.count(context) <= 20
+    ))
+    checks.append((
+        "Aucun chunk: contexte vide",
+        pack_context([], 100, counter) == ("", [])
+    ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print(f"Comptage des tokens: {'tiktoken' if counter.exact else 'estimation (4 caractères par token)'}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Script de test du cache disque des embeddings (embedding_cache.py).
+Vérifie l'éviction LRU, la relecture du cache après save(), le rejet des
+lignes réutilisées avant un arrêt brutal (slots.sha256) et le cache
+désactivé (max_entries = 0).
+
+Usage: python test_embedding_cache.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from embedding_cache import EmbeddingCache, CachedEmbeddings
+except ImportError:
+    print("❌ Erreur: Impossible d'importer embedding_cache.py")
+    print("   Assurez-vous que embedding_cache.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# DONNÉES DE TEST
+# ============================================
+
+MODEL = "modele-de-test"
+DIMENSION = 4
+
+
+def vector(text: str) -> np.ndarray:
+    """
+    Vecteur déterministe d'un texte.
+    """
+    rng = np.random.default_rng(sum(text.encode('utf-8')))
+    return rng.standard_normal(DIMENSION).astype(np.float32)
+
+
+def same(found, text: str) -> bool:
+    return found is not None and np.array_equal(found, vector(text))
+
+
+class CountingEmbeddings:
+    """
+    Modèle de substitution: compte les textes réellement encodés.
+    """
+
+    def __init__(self):
+        self.encoded = []
+
+    def embed_documents(self, texts):
+        self.encoded.extend(texts)
+        return [vector(text).tolist() for text in texts]
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests du cache des embeddings.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DU CACHE DISQUE DES EMBEDDINGS")
+    print("=" * 70)
+
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # Éviction LRU: l'entrée relue récemment est conservée
+        cache = EmbeddingCache(tmp / "lru", MODEL, normalize=True, max_entries=3)
+        cache.put_many(["a", "b", "c"], [vector(t) for t in "abc"])
+        cache.get_many(["a"])
+        cache.put_many(["d"], [vector("d")])
+        found = cache.get_many(["a", "b", "c", "d"])
+        checks.append((
+            "LRU: la moins récemment utilisée est évincée, sa ligne réutilisée",
+            found[1] is None and all(same(found[i], t) for i, t in [(0, "a"), (2, "c"), (3, "d")])
+            and len(cache) == 3 and cache._capacity == 3
+        ))
+
+        cache.put_many(["e", "f", "g", "h"], [vector(t) for t in "efgh"])
+        checks.append((
+            "LRU: lot plus grand que le plafond, seuls les derniers gardés",
+            len(cache) == 3 and all(same(v, t) for v, t in zip(cache.get_many(["f", "g", "h"]), "fgh"))
+        ))
+
+        # Relecture après save()
+        cache = EmbeddingCache(tmp / "reopen", MODEL, normalize=True)
+        cache.put_many(["un", "deux"], [vector("un"), vector("deux")])
+        cache.save()
+        reopened = EmbeddingCache(tmp / "reopen", MODEL, normalize=True)
+        found = reopened.get_many(["un", "deux", "trois"])
+        checks.append((
+            "Relecture: vecteurs retrouvés après save(), texte inconnu absent",
+            same(found[0], "un") and same(found[1], "deux") and found[2] is None
+            and reopened.hits == 2 and reopened.misses == 1
+        ))
+        checks.append((
+            "Espace séparé par modèle et normalisation",
+            EmbeddingCache(tmp / "reopen", MODEL, normalize=False).get_many(["un"]) == [None]
+            and EmbeddingCache(tmp / "reopen", "autre-modele", normalize=True).get_many(["un"]) == [None]
+        ))
+
+        # Ligne réutilisée sans save() (arrêt brutal): keys.json est périmé
+        cache = EmbeddingCache(tmp / "stale", MODEL, normalize=True, max_entries=2)
+        cache.put_many(["ancien", "garde"], [vector("ancien"), vector("garde")])
+        cache.get_many(["garde"])
+        cache.save()
+        cache.put_many(["nouveau"], [vector("nouveau")])  # reprend la ligne de « ancien »
+        cache._vectors.flush()
+        cache._slots.flush()
+        crashed = EmbeddingCache(tmp / "stale", MODEL, normalize=True, max_entries=2)
+        found = crashed.get_many(["ancien", "garde"])
+        checks.append((
+            "slots.sha256: ligne réutilisée jamais servie pour l'ancien texte",
+            found[0] is None and same(found[1], "garde")
+            and EmbeddingCache.text_key("ancien") not in crashed._entries
+        ))
+        crashed.put_many(["autre"], [vector("autre")])
+        checks.append((
+            "slots.sha256: ligne rejetée rendue libre et réutilisable",
+            len(crashed) == 2 and same(crashed.get_many(["autre"])[0], "autre")
+        ))
+
+        # Cache désactivé
+        disabled = EmbeddingCache(tmp / "disabled", MODEL, normalize=True, max_entries=0)
+        disabled.put_many(["a", "b"], [vector("a"), vector("b")])
+        disabled.save()
+        checks.append((
+            "max_entries = 0: cache désactivé, rien écrit sur disque",
+            disabled.get_many(["a", "b"]) == [None, None] and len(disabled) == 0
+            and not disabled.directory.exists()
+        ))
+
+        # Embeddings adossés au cache
+        model = CountingEmbeddings()
+        embeddings = CachedEmbeddings(model, EmbeddingCache(tmp / "cached", MODEL, normalize=True))
+        first = embeddings.embed_documents(["x", "y", "x"])
+        second = embeddings.embed_documents(["y", "z"])
+        checks.append((
+            "CachedEmbeddings: seuls les textes absents sont encodés, une fois",
+            model.encoded == ["x", "y", "z"]
+            and first == [vector(t).tolist() for t in "xyx"] and second == [vector(t).tolist() for t in "yz"]
+        ))
+        model = CountingEmbeddings()
+        embeddings = CachedEmbeddings(model, EmbeddingCache(tmp / "none", MODEL, normalize=True, max_entries=0))
+        embeddings.embed_documents(["x", "y"])
+        embeddings.embed_documents(["x"])
+        checks.append((
+            "CachedEmbeddings: cache désactivé, tout est encodé",
+            model.encoded == ["x", "y", "x"]
+        ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Script de test de l'ingestion incrémentale (ingest.py).
+Ingère des pages web de substitution dans un dossier temporaire avec des
+embeddings déterministes, puis modifie, supprime et ajoute des sources et
+vérifie quels chunks sont ré-encodés et ce que contient l'index. Vérifie
+aussi la reprise d'une ingestion interrompue depuis le checkpoint.
+
+Usage: python test_incremental_ingest.py
+"""
+
+import io
+import sys
+import json
+import tempfile
+import contextlib
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    import ingest
+    from chunk_store import ChunkStore
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+except ImportError:
+    print("❌ Erreur: Impossible d'importer ingest.py")
+    print("   Assurez-vous que ingest.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# SOURCES ET EMBEDDINGS DE SUBSTITUTION
+# ============================================
+
+CONFIGURED_URL = "https://exemple.fr/configuree/"
+
+
+def page(url: str, topic: str, version: int = 1) -> Document:
+    """
+    Page web d'environ 1500 caractères (3 à 4 chunks).
+    """
+    sentences = [f"Phrase {i} de la page sur {topic}, version {version}, avec du texte de remplissage."
+                 for i in range(18)]
+    return Document(page_content=" ".join(sentences), metadata={
+        "source_url": url,
+        "source_type": "web",
+        "procedure": topic,
+    })
+
+
+class Interrupted(Exception):
+    """
+    Interruption simulée de l'ingestion (processus tué pendant l'encodage).
+    """
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """
+    Embeddings déterministes (vecteur dérivé du texte) qui notent les textes
+    encodés, et s'interrompent après fail_after textes si demandé.
+    """
+
+    encoded: list = []
+    fail_after: Optional[int] = None
+
+    def embed_documents(self, texts):
+        if self.fail_after is not None and len(self.encoded) + len(texts) > self.fail_after:
+            raise Interrupted()
+        self.encoded.extend(texts)
+        return super().embed_documents(texts)
+
+
+def use_directory(directory: Path):
+    """
+    Redirige tous les fichiers de l'index vers directory.
+    """
+    ingest.PDF_DIR = directory / "pdfs"
+    ingest.PDF_DIR.mkdir(parents=True, exist_ok=True)
+    ingest.VECTOR_STORE_DIR = directory / "vector_store"
+    for name, file_name in [
+        ("INDEX_FILE", "index.faiss"), ("CHUNK_STORE_DIR", "chunks"), ("BM25_DIR", "bm25"),
+        ("VECTORS_FILE", "vectors.npy"), ("INDEX_INFO_FILE", "index_info.json"),
+        ("PARTITIONS_DIR", "partitions"), ("FILTERS_DIR", "filters"),
+        ("MANIFEST_FILE", "manifest.json"), ("CHECKPOINT_DIR", ".checkpoint"),
+    ]:
+        setattr(ingest, name, ingest.VECTOR_STORE_DIR / file_name)
+
+
+def run_ingest(pages, full_rebuild: bool = False, fail_after: Optional[int] = None) -> list:
+    """
+    Lance ingest.main() sur les pages données (interrompu après fail_after
+    textes encodés si demandé).
+
+    Returns:
+        Textes encodés pendant cette exécution
+    """
+    embeddings = CountingEmbeddings(size=16, fail_after=fail_after)
+    ingest.create_embeddings = lambda: embeddings
+    ingest.scrape_website = lambda: [Document(page_content=p.page_content, metadata=dict(p.metadata)) for p in pages]
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            ingest.main(full_rebuild=full_rebuild, workers=1)
+        except Interrupted:
+            pass
+    return embeddings.encoded
+
+
+def index_content() -> dict:
+    """
+    Contenu de l'index: {chunk_id: (source, texte, vecteur)}.
+    """
+    store = ChunkStore(ingest.CHUNK_STORE_DIR)
+    vectors = np.load(ingest.VECTORS_FILE)
+    assert len(vectors) == len(store)
+    return {
+        doc.metadata["chunk_id"]: (doc.metadata["source_url"], doc.page_content, tuple(vectors[i]))
+        for i, doc in enumerate(store.documents(range(len(store))))
+    }
+
+
+def chunk_texts(doc: Document) -> list:
+    return [chunk.page_content for chunk in ingest.iter_chunks([doc])]
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests de l'ingestion incrémentale.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DE L'INGESTION INCRÉMENTALE - MANIFESTE ET HASH DES SOURCES")
+    print("=" * 70)
+
+    ingest.WEB_URLS = {"configuree": CONFIGURED_URL}
+    ingest.INGEST_BATCH_SIZE = 3
+
+    a = page(CONFIGURED_URL, "Embolisation prostate")
+    b = page("https://exemple.fr/b/", "Fibrome")
+    c = page("https://exemple.fr/c/", "Varicocèle")
+    d = page("https://exemple.fr/d/", "Biopsie")
+    b2 = page("https://exemple.fr/b/", "Fibrome", version=2)
+    e = page("https://exemple.fr/e/", "Chambre implantable")
+
+    checks = []
+
+    # Fonctions du manifeste
+    part_1 = Document(page_content="Première partie.", metadata=dict(b.metadata))
+    part_2 = Document(page_content="Seconde partie.", metadata=dict(b.metadata))
+    hashes = ingest.hash_documents([part_1, part_2, c])
+    checks.append((
+        "hash_documents: un hash par source, toutes ses pages comprises",
+        set(hashes) == {"web:https://exemple.fr/b/", "web:https://exemple.fr/c/"}
+        and hashes != ingest.hash_documents([part_1, c])
+        and hashes == ingest.hash_documents([part_1, part_2, c])
+    ))
+    chunks = list(ingest.iter_chunks([b, c]))
+    in_one = ingest.assign_chunk_ids([Document(page_content=x.page_content, metadata=dict(x.metadata)) for x in chunks],
+                                     ingest.hash_documents([b, c]))
+    in_batches = {}
+    for offset in range(0, len(chunks), 3):
+        ingest.assign_chunk_ids(chunks[offset:offset + 3], ingest.hash_documents([b, c]), in_batches)
+    checks.append((
+        "assign_chunk_ids: IDs déterministes, identiques par lots",
+        in_one == in_batches and len({chunk.metadata["chunk_id"] for chunk in chunks}) == len(chunks)
+    ))
+    changed = ingest.assign_chunk_ids(list(ingest.iter_chunks([b2])), ingest.hash_documents([b2]))
+    checks.append((
+        "assign_chunk_ids: une source modifiée change d'IDs",
+        not set(changed["web:https://exemple.fr/b/"]["chunk_ids"])
+        & set(in_one["web:https://exemple.fr/b/"]["chunk_ids"])
+    ))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        use_directory(tmp / "incremental")
+
+        # 1. Ingestion complète
+        encoded = run_ingest([a, b, c, d])
+        first = index_content()
+        manifest = ingest.load_manifest()
+        checks.append((
+            "Ingestion complète: tous les chunks encodés et indexés",
+            sorted(encoded) == sorted(sum(map(chunk_texts, [a, b, c, d]), []))
+            and len(first) == len(encoded)
+        ))
+        checks.append((
+            "Manifeste: une entrée par source, IDs des chunks de l'index",
+            len(manifest["sources"]) == 4
+            and {i for entry in manifest["sources"].values() for i in entry["chunk_ids"]} == set(first)
+        ))
+
+        # 2. Aucune source modifiée
+        encoded = run_ingest([a, b, c, d])
+        checks.append((
+            "Sources inchangées: aucun chunk ré-encodé, index identique",
+            encoded == [] and index_content() == first
+        ))
+
+        # 3. b modifiée, c supprimée, e ajoutée, a (URL configurée) momentanément absente
+        encoded = run_ingest([b2, d, e])
+        second = index_content()
+        sources = {source for source, _, _ in second.values()}
+        checks.append((
+            "Seuls les chunks des sources modifiées ou ajoutées sont ré-encodés",
+            sorted(encoded) == sorted(chunk_texts(b2) + chunk_texts(e))
+        ))
+        checks.append((
+            "Chunks des sources inchangées conservés avec leurs vecteurs",
+            all(second[i] == first[i] for i, (source, _, _) in first.items()
+                if source in (CONFIGURED_URL, "https://exemple.fr/d/"))
+        ))
+        checks.append((
+            "Source supprimée et ancienne version retirées, URL configurée absente gardée",
+            sources == {CONFIGURED_URL, "https://exemple.fr/b/", "https://exemple.fr/d/", "https://exemple.fr/e/"}
+            and not {text for _, text, _ in second.values()} & set(chunk_texts(b) + chunk_texts(c))
+        ))
+        manifest = ingest.load_manifest()
+        checks.append((
+            "Manifeste mis à jour (hash de la nouvelle version)",
+            set(manifest["sources"]) == {"web:" + url for url in sources}
+            and manifest["sources"]["web:https://exemple.fr/b/"]["hash"]
+            == ingest.hash_documents([b2])["web:https://exemple.fr/b/"]
+            and {i for entry in manifest["sources"].values() for i in entry["chunk_ids"]} == set(second)
+        ))
+
+        # Comparaison avec une reconstruction complète des mêmes sources
+        use_directory(tmp / "full")
+        run_ingest([a, b2, d, e], full_rebuild=True)
+        checks.append((
+            "Index incrémental = reconstruction complète (mêmes chunks, mêmes vecteurs)",
+            index_content() == second
+        ))
+
+        # Paramètre de découpage modifié: le manifeste n'est plus utilisable
+        chunk_size = ingest.CHUNK_SIZE
+        ingest.CHUNK_SIZE = chunk_size + 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            rejected = ingest.load_manifest()
+        ingest.CHUNK_SIZE = chunk_size
+        checks.append((
+            "Taille de chunk modifiée: manifeste ignoré (reconstruction complète)",
+            rejected is None and ingest.load_manifest() is not None
+        ))
+
+        # 4. Checkpoint: état relu pour le même plan, effacé sinon
+        use_directory(tmp / "checkpoint")
+        saved = [Document(page_content="Chunk du lot.", metadata={"source_url": "https://exemple.fr/b/"})]
+        ingest.save_checkpoint_batch("plan-a", 1, saved, [[0.0] * 16], {"web:https://exemple.fr/b/"})
+        ingest.save_checkpoint_batch("plan-a", 2, saved, [[1.0] * 16], {"web:https://exemple.fr/b/", "web:x"})
+        batch_files, sources_done = ingest.load_checkpoint("plan-a")
+        replayed, vectors = ingest.read_checkpoint_batch(batch_files[1])
+        checks.append((
+            "Checkpoint du même plan: lots et sources terminées relus",
+            [f.name for f in batch_files] == ["batch_000001.pkl", "batch_000002.pkl"]
+            and sources_done == {"web:https://exemple.fr/b/", "web:x"}
+            and replayed[0].page_content == "Chunk du lot." and np.array_equal(vectors, np.ones((1, 16)))
+        ))
+        checks.append((
+            "Checkpoint d'un autre plan (empreinte différente): ignoré et effacé",
+            ingest.load_checkpoint("plan-b") == ([], set()) and not ingest.CHECKPOINT_DIR.exists()
+        ))
+        ingest.save_checkpoint_batch("plan-a", 1, saved, [[0.0] * 16], set())
+        (ingest.CHECKPOINT_DIR / "state.json").write_text('{"fingerprint": "plan-a", "batches_done": 1}')
+        checks.append((
+            "Checkpoint de l'ancien format (sans sources terminées): effacé",
+            ingest.load_checkpoint("plan-a") == ([], set()) and not ingest.CHECKPOINT_DIR.exists()
+        ))
+
+        # 5. Ingestion interrompue puis reprise
+        pages = [a, b, c, d, e]
+        use_directory(tmp / "uninterrupted")
+        run_ingest(pages)
+        uninterrupted = index_content()
+
+        use_directory(tmp / "resume")
+        interrupted = run_ingest(pages, fail_after=9)
+        state = json.loads((ingest.CHECKPOINT_DIR / "state.json").read_text())
+        sources_done = set(state["sources_done"])
+        resumed = run_ingest(pages)
+        done_texts = sum((chunk_texts(p) for p in pages if ingest.source_key(p.metadata) in sources_done), [])
+        # 3 lots de 3 chunks encodés: sources terminées = sources vues, sauf celle du 9e chunk
+        stream = [ingest.source_key(chunk.metadata) for chunk in ingest.iter_chunks(pages)][:9]
+        checks.append((
+            f"Reprise: les {len(sources_done)} source(s) terminée(s) ne sont ni rechargées ni ré-encodées",
+            state["batches_done"] == 3 and sources_done == set(stream) - {stream[-1]}
+            and not set(resumed) & set(done_texts)
+            and sorted(resumed + done_texts) == sorted(sum(map(chunk_texts, pages), []))
+        ))
+        checks.append((
+            "Reprise: checkpoint effacé, index identique à une ingestion sans interruption",
+            not ingest.CHECKPOINT_DIR.exists() and index_content() == uninterrupted
+        ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
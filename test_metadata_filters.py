@@ -0,0 +1,234 @@
+"""
+Script de test des filtres de métadonnées (metadata_filters.py) dans la
+recherche vectorielle (vector_index.py).
+Sur un petit index à deux procédures, compare les résultats filtrés à une
+recherche exhaustive: résolution des filtres en bitsets, IDSelectorBitmap
+dans FAISS, bitset global ramené aux IDs locaux d'une partition et repli
+exact quand l'index approximatif ne trouve pas assez de chunks autorisés.
+
+Usage: python test_metadata_filters.py
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from chunk_store import ChunkStore, ChunkStoreWriter
+    from metadata_filters import FilterBitmaps, build_filter_bitmaps, pack_mask, unpack_bitmap
+    from vector_index import VectorIndex
+except ImportError:
+    print("❌ Erreur: Impossible d'importer metadata_filters.py / vector_index.py")
+    print("   Assurez-vous que metadata_filters.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# DONNÉES DE TEST
+# ============================================
+
+# Nombre de chunks non multiple de 8: le dernier octet des bitsets est partiel
+COUNT = 203
+DIMENSION = 8
+K = 5
+PROCEDURES = ["Embolisation prostate", "Fibrome utérin"]
+
+rng = np.random.default_rng(13)
+VECTORS = rng.standard_normal((COUNT, DIMENSION)).astype(np.float32)
+QUERIES = rng.standard_normal((6, DIMENSION)).astype(np.float32)
+METADATA = [
+    {
+        "procedure": PROCEDURES[int(rng.integers(2))],
+        "source_type": "pdf" if rng.random() < 0.6 else "web",
+        "folder": f"dossier_{int(rng.integers(4))}",
+        "source_file": f"fichier_{i % 60}.pdf",
+    }
+    for i in range(COUNT)
+]
+
+FILTERS = [
+    {"source_type": "pdf"},
+    {"folder": ["dossier_0", "dossier_2"]},
+    {"source_type": "web", "folder": "dossier_1"},
+    {"procedure": PROCEDURES[1], "source_type": "pdf"},
+]
+# Très sélectif: 3 ou 4 chunks par fichier
+SELECTIVE = {"source_file": "fichier_7.pdf"}
+
+
+def allowed_ids(metadata_filter, ids=None) -> np.ndarray:
+    """
+    IDs (croissants) des chunks satisfaisant le filtre, calculés sur les
+    métadonnées: OU entre les valeurs d'une colonne, ET entre colonnes.
+    """
+    ids = range(COUNT) if ids is None else ids
+    return np.array([
+        i for i in ids
+        if all(METADATA[i].get(name) in ([values] if isinstance(values, str) else values)
+               for name, values in metadata_filter.items())
+    ], dtype=np.int64)
+
+
+def brute_force(query: np.ndarray, ids: np.ndarray, k: int) -> np.ndarray:
+    """
+    k plus proches voisins exacts parmi ids (ex-aequo départagés par ID).
+    """
+    distances = ((VECTORS[ids] - query) ** 2).sum(axis=1)
+    return ids[np.lexsort((ids, distances))][:k]
+
+
+def flat_index(vectors: np.ndarray) -> faiss.Index:
+    index = faiss.IndexFlatL2(DIMENSION)
+    index.add(vectors)
+    return index
+
+
+def ivf_index(vectors: np.ndarray) -> faiss.Index:
+    """
+    IVF à une seule liste sondée: la plupart des chunks autorisés par un
+    filtre sélectif sont hors de portée de FAISS.
+    """
+    index = faiss.index_factory(DIMENSION, "IVF8,Flat")
+    ivf = faiss.extract_index_ivf(index)
+    ivf.cp.min_points_per_centroid = 1  # petit corpus voulu: pas d'avertissement
+    index.train(vectors)
+    index.add(vectors)
+    ivf.nprobe = 1
+    return index
+
+
+def matches(vector_index: VectorIndex, bitmap, expected_ids) -> bool:
+    """
+    Résultats filtrés (une requête et lot de requêtes) = recherche exhaustive.
+    """
+    batch = vector_index.search_vectors(QUERIES, K, bitmap)
+    return all(
+        np.array_equal(vector_index.search_vector(query, K, bitmap), brute_force(query, expected_ids, K))
+        and np.array_equal(found, brute_force(query, expected_ids, K))
+        for query, found in zip(QUERIES, batch)
+    )
+
+
+def faiss_alone_short(vector_index: VectorIndex, bitmap) -> bool:
+    """
+    L'index approximatif seul renvoie-t-il moins de K chunks autorisés
+    (condition du repli exact) pour au moins une requête ?
+    """
+    if vector_index.ids is not None:
+        bitmap = pack_mask(unpack_bitmap(bitmap)[vector_index.ids])
+    params = vector_index._search_parameters(bitmap)
+    _, found = vector_index.index.search(QUERIES, K, params=params)
+    return bool(((found >= 0).sum(axis=1) < K).any())
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests des filtres de métadonnées.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DES FILTRES DE MÉTADONNÉES - RECHERCHE FILTRÉE")
+    print("=" * 70)
+
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        writer = ChunkStoreWriter(tmp / "chunks")
+        writer.add_many(Document(page_content=f"Chunk {i}", metadata=m) for i, m in enumerate(METADATA))
+        writer.close()
+        store = ChunkStore(tmp / "chunks")
+        build_filter_bitmaps(store, tmp / "filters")
+        filters = FilterBitmaps(tmp / "filters")
+
+        # Résolution des filtres
+        checks.append((
+            "Bitsets: OU dans une colonne, ET entre colonnes (= métadonnées)",
+            all(
+                np.array_equal(np.flatnonzero(filters.mask(f)), allowed_ids(f))
+                for f in FILTERS + [SELECTIVE]
+            ) and filters.count == COUNT
+        ))
+        checks.append((
+            "Bitsets: valeur ou colonne inconnue = aucun chunk, filtre vide = None",
+            not filters.mask({"source_type": "inconnu"}).any()
+            and not filters.mask({"inconnue": "x"}).any()
+            and filters.bitmap(None) is None and filters.bitmap({}) is None
+        ))
+
+        # Index global
+        flat = VectorIndex(flat_index(VECTORS), vectors=VECTORS)
+        checks.append((
+            "Index global Flat: résultats filtrés = recherche exhaustive",
+            all(matches(flat, filters.bitmap(f), allowed_ids(f)) for f in FILTERS + [SELECTIVE])
+        ))
+        ivf = VectorIndex(ivf_index(VECTORS), vectors=VECTORS)
+        bitmap = filters.bitmap(SELECTIVE)
+        checks.append((
+            "Index global IVF, filtre très sélectif: repli exact = recherche exhaustive",
+            faiss_alone_short(ivf, bitmap) and matches(ivf, bitmap, allowed_ids(SELECTIVE))
+        ))
+
+        # Partitions: bitset global ramené aux IDs locaux
+        for procedure in PROCEDURES:
+            ids = np.flatnonzero([m["procedure"] == procedure for m in METADATA])
+            partition = VectorIndex(flat_index(VECTORS[ids]), vectors=VECTORS, ids=ids)
+            checks.append((
+                f"Partition Flat « {procedure} »: filtrés = exhaustive, procédure respectée",
+                all(matches(partition, filters.bitmap(f), allowed_ids(f, ids)) for f in FILTERS)
+                and all(
+                    METADATA[i]["procedure"] == procedure
+                    for f in FILTERS for found in partition.search_vectors(QUERIES, K, filters.bitmap(f))
+                    for i in found
+                )
+            ))
+            partition = VectorIndex(ivf_index(VECTORS[ids]), vectors=VECTORS, ids=ids)
+            bitmap = filters.bitmap(SELECTIVE)
+            checks.append((
+                f"Partition IVF « {procedure} », filtre très sélectif: repli exact = exhaustive",
+                faiss_alone_short(partition, bitmap) and matches(partition, bitmap, allowed_ids(SELECTIVE, ids))
+            ))
+
+        # Aucun chunk autorisé dans la partition
+        ids = np.flatnonzero([m["procedure"] == PROCEDURES[0] for m in METADATA])
+        partition = VectorIndex(flat_index(VECTORS[ids]), vectors=VECTORS, ids=ids)
+        empty = partition.search_vectors(QUERIES, K, filters.bitmap({"procedure": PROCEDURES[1]}))
+        checks.append((
+            "Filtre sans chunk dans la partition: aucun résultat",
+            len(empty) == len(QUERIES) and all(len(found) == 0 for found in empty)
+        ))
+        del store
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
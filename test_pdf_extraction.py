@@ -0,0 +1,202 @@
+"""
+Script de test de l'extraction parallèle des PDFs (ingest.py).
+Génère de petits PDFs (dont un PDF corrompu) dans deux dossiers et vérifie
+que l'extraction sur un pool de processus renvoie les mêmes pages, dans le
+même ordre et avec les mêmes métadonnées que l'extraction séquentielle
+(INGEST_WORKERS=1), y compris quand un processus d'extraction meurt.
+
+Usage: python test_pdf_extraction.py
+"""
+
+import io
+import os
+import sys
+import tempfile
+import logging
+import contextlib
+import multiprocessing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    import ingest
+except ImportError:
+    print("❌ Erreur: Impossible d'importer ingest.py")
+    print("   Assurez-vous que ingest.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# PDFS DE TEST
+# ============================================
+
+CRASH_MARKER = "plantage"
+_extract_pdf = ingest._extract_pdf
+
+
+def make_pdf(path: Path, pages: list):
+    """
+    Écrit un PDF minimal (une ligne de texte par page).
+    """
+    count = len(pages)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [" + " ".join(f"{4 + 2 * i} 0 R" for i in range(count))
+        + f"] /Count {count} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    content += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1')
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    path.write_bytes(content)
+
+
+def crash_on_marker(pdf_path: str):
+    """
+    Extraction qui tue son processus pour les fichiers marqués (segfault simulé).
+    """
+    if CRASH_MARKER in pdf_path:
+        os._exit(1)
+    return _extract_pdf(pdf_path)
+
+
+def build_tasks(directory: Path, crash: bool = False) -> list:
+    """
+    Deux dossiers de PDFs, dont un PDF corrompu (et un PDF qui tue son
+    processus si crash).
+    """
+    files = [
+        ("embolisation_prostate", "fiche_1.pdf", ["Fiche un page un", "Fiche un page deux"]),
+        ("embolisation_prostate", "corrompu.pdf", None),
+        ("embolisation_prostate", "fiche_2.pdf", ["Fiche deux"]),
+        ("embolisation_prostate", f"{CRASH_MARKER}.pdf", ["Jamais lu"]),
+        ("embolisation_uterine", "fiche_3.pdf", ["Fiche trois page un", "Fiche trois page deux"]),
+        ("embolisation_uterine", "fiche_4.pdf", ["Fiche quatre"]),
+        ("embolisation_uterine", "fiche_5.pdf", ["Fiche cinq"]),
+        ("embolisation_uterine", "fiche_6.pdf", ["Fiche six page un", "Fiche six page deux"]),
+    ]
+    tasks = []
+    for folder, name, pages in files:
+        if name.startswith(CRASH_MARKER) and not crash:
+            continue
+        path = directory / folder / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if pages is None:
+            path.write_bytes(b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R")
+        else:
+            make_pdf(path, pages)
+        tasks.append((path, ingest.detect_procedure_from_folder(folder), folder))
+    return tasks
+
+
+def extract(tasks: list, workers: int):
+    """
+    Pages extraites ((texte, métadonnées) dans l'ordre) et sortie console.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        documents = list(ingest.iter_pdf_documents(tasks, workers))
+    return [(doc.page_content, doc.metadata) for doc in documents], output.getvalue()
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests de l'extraction des PDFs.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DE L'EXTRACTION PARALLÈLE DES PDFS")
+    print("=" * 70)
+
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        tasks = build_tasks(tmp / "normal")
+        serial, serial_output = extract(tasks, workers=1)
+        files = [metadata["source_file"] for _, metadata in serial]
+        checks.append((
+            "Séquentiel: PDF corrompu signalé et ignoré, pages des autres chargées",
+            "corrompu.pdf" not in files and "⚠️ Erreur" in serial_output
+            and files == ["fiche_1.pdf"] * 2 + ["fiche_2.pdf"] + ["fiche_3.pdf"] * 2
+            + ["fiche_4.pdf", "fiche_5.pdf"] + ["fiche_6.pdf"] * 2
+            and "Fiche trois page deux" in serial[4][0]
+        ))
+        checks.append((
+            "Séquentiel: métadonnées du fichier (dossier, procédure, page)",
+            [(m["folder"], m["procedure"], m["page"]) for _, m in serial[:5]] == [
+                ("embolisation_prostate", "Embolisation de la prostate", 0),
+                ("embolisation_prostate", "Embolisation de la prostate", 1),
+                ("embolisation_prostate", "Embolisation de la prostate", 0),
+                ("embolisation_uterine", "Embolisation utérine", 0),
+                ("embolisation_uterine", "Embolisation utérine", 1),
+            ]
+        ))
+
+        for workers in (2, 3):
+            parallel, _ = extract(tasks, workers)
+            checks.append((
+                f"Parallèle ({workers} processus): pages, ordre et métadonnées identiques",
+                parallel == serial
+            ))
+
+        # Un processus meurt: le pool est cassé, les fichiers en cours sont
+        # ré-extraits un par un et seul le fichier fautif est perdu
+        crash_tasks = build_tasks(tmp / "crash", crash=True)
+        expected = [(text, {**metadata, "source": metadata["source"].replace("/normal/", "/crash/")})
+                    for text, metadata in serial]
+        ingest._extract_pdf = crash_on_marker
+        try:
+            parallel, output = extract(crash_tasks, workers=2)
+        finally:
+            ingest._extract_pdf = _extract_pdf
+        checks.append((
+            "Processus arrêté brutalement: seul son fichier est perdu, ordre et métadonnées conservés",
+            parallel == expected and "arrêté brutalement" in output
+            and f"{CRASH_MARKER}.pdf" in output
+        ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    # Processus créés par fork: ils héritent de l'extraction qui simule un plantage
+    multiprocessing.set_start_method("fork", force=True)
+    # Avertissements de pypdf sur le PDF corrompu (déjà rapportés par ingest.py)
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Script de test de la Reciprocal Rank Fusion sur IDs de chunks (app.py).
+Compare reciprocal_rank_fusion à l'ancienne fusion par dictionnaire indexé
+sur le texte des chunks: mêmes classements et mêmes scores, ex-aequo
+compris, et chunks de textes identiques gardés séparés.
+
+Usage: python test_rank_fusion.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from app import reciprocal_rank_fusion, RRF_OFFSET
+except ImportError:
+    print("❌ Erreur: Impossible d'importer app.py")
+    print("   Assurez-vous que app.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# ANCIENNE FUSION (RÉFÉRENCE)
+# ============================================
+
+def legacy_fusion(vector_ids, bm25_ids, texts, alpha: float, k: int):
+    """
+    Fusion RRF telle qu'écrite avant les IDs entiers: dictionnaire indexé sur
+    le texte des chunks, tri stable des scores (ex-aequo par ordre d'insertion).
+
+    Returns:
+        Tuple (IDs, scores) des k meilleurs chunks
+    """
+    doc_scores = {}
+    doc_map = {}
+
+    for rank, chunk_id in enumerate(vector_ids):
+        doc_id = texts[chunk_id]
+        doc_map[doc_id] = chunk_id
+        doc_scores[doc_id] = doc_scores.get(doc_id, 0) + alpha / (rank + RRF_OFFSET)
+
+    for rank, chunk_id in enumerate(bm25_ids):
+        doc_id = texts[chunk_id]
+        doc_map[doc_id] = chunk_id
+        doc_scores[doc_id] = doc_scores.get(doc_id, 0) + (1 - alpha) / (rank + RRF_OFFSET)
+
+    sorted_docs = sorted(doc_scores.items(), key=lambda x: x[1], reverse=True)[:k]
+    return [doc_map[doc_id] for doc_id, _ in sorted_docs], [score for _, score in sorted_docs]
+
+
+def fuse(vector_ids, bm25_ids, alpha: float, k: int):
+    ids, scores = reciprocal_rank_fusion([vector_ids, bm25_ids], [alpha, 1 - alpha], k)
+    return ids.tolist(), scores.tolist()
+
+
+# ============================================
+# TESTS
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests de la fusion RRF.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DE LA FUSION RRF - IDS ENTIERS VS ANCIENNE FUSION")
+    print("=" * 70)
+
+    corpus_size = 200
+    texts = [f"Chunk numéro {i}" for i in range(corpus_size)]
+    rng = np.random.default_rng(0)
+
+    # Classements aléatoires qui se recouvrent en partie: avec alpha = 0.5,
+    # deux chunks de même rang dans l'un et l'autre classement sont ex-aequo
+    cases = []
+    for alpha in (0.5, 0.7, 0.3, 1.0, 0.0):
+        for depth in (1, 5, 16, 40):
+            for _ in range(20):
+                pool = rng.choice(corpus_size, size=rng.integers(depth, 2 * depth + 1), replace=False)
+                vector_ids = rng.permutation(pool)[:depth]
+                bm25_ids = rng.permutation(pool)[:depth]
+                cases.append((vector_ids, bm25_ids, alpha, int(rng.integers(1, 2 * depth + 1))))
+
+    checks = []
+    checks.append((
+        f"Classements identiques à l'ancienne fusion ({len(cases)} cas)",
+        all(fuse(v, b, a, k)[0] == legacy_fusion(v, b, texts, a, k)[0] for v, b, a, k in cases)
+    ))
+    checks.append((
+        "Scores identiques à l'ancienne fusion",
+        all(fuse(v, b, a, k)[1] == legacy_fusion(v, b, texts, a, k)[1] for v, b, a, k in cases)
+    ))
+
+    # Ex-aequo construits: ordre de première apparition, classement vectoriel d'abord
+    tie_ids, _ = fuse([6, 5, 4], [3, 2, 1], 0.5, 6)
+    checks.append((
+        "Ex-aequo dans l'ordre de première apparition (pas par ID)",
+        tie_ids == [6, 3, 5, 2, 4, 1] == legacy_fusion([6, 5, 4], [3, 2, 1], texts, 0.5, 6)[0]
+    ))
+    tie_ids, _ = fuse([8, 7], [7, 8], 0.5, 2)
+    checks.append((
+        "Chunks présents dans les deux classements, scores égaux",
+        tie_ids == [8, 7] == legacy_fusion([8, 7], [7, 8], texts, 0.5, 2)[0]
+    ))
+
+    # Deux chunks de même texte (pages répétées d'un PDF): un ID chacun
+    duplicate_texts = list(texts)
+    duplicate_texts[10] = duplicate_texts[20]
+    ids, scores = fuse([10, 30, 40], [20, 30, 50], 0.5, 5)
+    legacy_ids, _ = legacy_fusion([10, 30, 40], [20, 30, 50], duplicate_texts, 0.5, 5)
+    checks.append((
+        "Textes identiques: chunks gardés séparés, sans cumul de leurs scores",
+        10 in ids and 20 in ids and len(ids) == 5 and len(legacy_ids) == 4
+        and scores[ids.index(10)] == scores[ids.index(20)] == 0.5 / RRF_OFFSET
+    ))
+
+    empty_ids, empty_scores = reciprocal_rank_fusion([np.zeros(0, dtype=np.int64)] * 2, [0.5, 0.5], 4)
+    checks.append((
+        "Classements vides ou un seul classement",
+        len(empty_ids) == 0 and len(empty_scores) == 0
+        and fuse([3, 1, 2], [], 0.5, 10)[0] == [3, 1, 2]
+    ))
+    checks.append((
+        "k plus grand que le nombre de chunks",
+        fuse([1, 2], [2, 3], 0.5, 100)[0] == [2, 1, 3]
+    ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
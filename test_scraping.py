@@ -0,0 +1,213 @@
+"""
+Script de test du scraping web concurrent avec cache HTTP.
+Lance un serveur HTTP local qui imite laradiologiequisoigne.fr (ETag,
+Last-Modified, 304) et vérifie le comportement de ingest.scrape_website.
+
+Usage: python test_scraping.py
+"""
+
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from ingest import scrape_website
+except ImportError:
+    print("❌ Erreur: Impossible d'importer ingest.py")
+    print("   Assurez-vous que ingest.py existe dans le même dossier.")
+    sys.exit(1)
+
+
+# ============================================
+# SERVEUR HTTP DE SUBSTITUTION
+# ============================================
+
+PAGE_DELAY = 0.3  # Latence simulée par requête (secondes)
+
+PAGES = {
+    "/prostate/": ('"v1-prostate"', "Hyperplasie bénigne de la prostate",
+                   "L'embolisation des artères prostatiques est réalisée sous anesthésie locale."),
+    "/fibrome-uterin/": ('"v1-fibrome"', "Fibrome utérin",
+                         "L'embolisation utérine traite les fibromes sans chirurgie."),
+    "/varicocele/": ('"v1-varicocele"', "La varicocèle",
+                     "La varicocèle est une dilatation des veines du testicule."),
+    "/cancer/": ('"v1-cancer"', "Le cancer",
+                 "La radiologie interventionnelle participe au traitement des tumeurs."),
+}
+
+LAST_MODIFIED = "Mon, 05 Jan 2026 10:00:00 GMT"
+
+# Journal des réponses envoyées: liste de (chemin, code HTTP)
+REQUEST_LOG = []
+REQUEST_LOG_LOCK = threading.Lock()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Sert les pages de PAGES avec ETag/Last-Modified et répond 304 aux
+    requêtes conditionnelles dont la validation réussit.
+    """
+
+    def do_GET(self):
+        time.sleep(PAGE_DELAY)
+
+        if self.path not in PAGES:
+            self._log(500)
+            self.send_error(500, "Erreur serveur simulée")
+            return
+
+        etag, title, body = PAGES[self.path]
+        if self.headers.get("If-None-Match") == etag:
+            self._log(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        html = (
+            f'<html lang="fr"><head><title>{title}</title>'
+            f'<meta name="description" content="{title}"></head>'
+            f'<body><h1>{title}</h1><p>{body}</p></body></html>'
+        ).encode("utf-8")
+
+        self._log(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(html)
+
+    def _log(self, status):
+        with REQUEST_LOG_LOCK:
+            REQUEST_LOG.append((self.path, status))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    """
+    Démarre le serveur de substitution sur un port libre.
+
+    Returns:
+        Tuple (serveur, URL de base)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ============================================
+# TESTS DU SCRAPING
+# ============================================
+
+def run_tests():
+    """
+    Exécute les tests du scraping.
+    """
+    print("=" * 70)
+    print("🧪 TESTS DU SCRAPING WEB - CONCURRENCE ET CACHE HTTP")
+    print("=" * 70)
+
+    server, base_url = start_server()
+    urls = {
+        "prostate": f"{base_url}/prostate/",
+        "fibrome_uterin": f"{base_url}/fibrome-uterin/",
+        "varicocele": f"{base_url}/varicocele/",
+        "cancer": f"{base_url}/cancer/",
+        "hemorroides": f"{base_url}/page-en-erreur/",
+    }
+
+    checks = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp) / "web_cache"
+
+        # 1er passage: tout est téléchargé, en parallèle
+        start = time.perf_counter()
+        first = scrape_website(urls, cache_dir=cache_dir, max_concurrency=5)
+        first_duration = time.perf_counter() - start
+        first_log = list(REQUEST_LOG)
+        REQUEST_LOG.clear()
+
+        # 2e passage: pages inchangées, uniquement des 304
+        second = scrape_website(urls, cache_dir=cache_dir, max_concurrency=5)
+        second_log = list(REQUEST_LOG)
+
+        # 3e passage séquentiel pour comparer les temps
+        REQUEST_LOG.clear()
+        start = time.perf_counter()
+        scrape_website(urls, cache_dir=cache_dir, max_concurrency=1)
+        sequential_duration = time.perf_counter() - start
+
+    server.shutdown()
+
+    checks.append((
+        "Pages valides récupérées, page en erreur ignorée",
+        len(first) == 4
+    ))
+    checks.append((
+        "Ordre des documents identique à celui des URLs",
+        [d.metadata["source_url"] for d in first] == list(urls.values())[:4]
+    ))
+    checks.append((
+        "Métadonnées source_url / procedure conservées",
+        first[0].metadata["source_url"] == urls["prostate"]
+        and first[0].metadata["procedure"] == "Embolisation de la prostate"
+        and first[0].metadata["source_type"] == "web"
+    ))
+    checks.append((
+        "Texte extrait de la page",
+        "anesthésie locale" in first[0].page_content
+    ))
+    checks.append((
+        "1er passage: téléchargements complets (200)",
+        sorted(status for _, status in first_log) == [200, 200, 200, 200, 500]
+    ))
+    checks.append((
+        "2e passage: pages inchangées revalidées en 304",
+        sorted(status for _, status in second_log) == [304, 304, 304, 304, 500]
+    ))
+    checks.append((
+        "Contenu servi depuis le cache identique",
+        [(d.page_content, d.metadata) for d in second]
+        == [(d.page_content, d.metadata) for d in first]
+    ))
+    checks.append((
+        f"Requêtes simultanées ({first_duration:.2f}s vs {sequential_duration:.2f}s en séquentiel)",
+        first_duration < sequential_duration / 2
+    ))
+
+    print()
+    passed = 0
+    for label, success in checks:
+        status = "\033[92m✅ PASS\033[0m" if success else "\033[91m❌ FAIL\033[0m"
+        print(f"{status} {label}")
+        passed += success
+
+    # Résumé
+    print()
+    print("=" * 70)
+    print(f"Tests réussis:  {passed}/{len(checks)}")
+    print("=" * 70)
+
+    return 0 if passed == len(checks) else 1
+
+
+def main():
+    """
+    Point d'entrée principal.
+    """
+    sys.exit(run_tests())
+
+
+if __name__ == "__main__":
+    main()
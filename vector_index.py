@@ -0,0 +1,179 @@
+"""
+Recherche vectorielle sur l'index FAISS du vector store.
+
+L'index peut stocker les vecteurs en précision réduite (float16, int8) ou
+compressés (PQ): les k * rescore_factor meilleurs candidats sont alors
+re-classés avec les distances exactes calculées sur vectors.npy, ouvert
+en mmap (seules les lignes des candidats sont lues).
+
+search_vectors / search_batch traitent plusieurs requêtes en un seul appel
+FAISS, avec les mêmes résultats que des recherches une par une.
+
+Un bitset de filtre (metadata_filters) restreint la recherche aux chunks
+autorisés à l'intérieur de FAISS (IDSelectorBitmap). Si l'index approximatif
+ne trouve pas assez de chunks autorisés, la recherche est refaite exactement
+sur ces seuls chunks.
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from chunk_store import ChunkStore
+from metadata_filters import pack_mask, unpack_bitmap
+
+
+class VectorIndex:
+    """
+    Index FAISS associé au chunk store: la position d'un vecteur dans l'index
+    est l'ID de son chunk. La recherche renvoie des IDs; les Documents ne sont
+    construits que pour les résultats effectivement retournés.
+    """
+
+    def __init__(self, index: faiss.Index, embeddings=None, store: Optional[ChunkStore] = None,
+                 vectors: Optional[np.ndarray] = None, rescore_factor: int = 0,
+                 ids: Optional[np.ndarray] = None):
+        self.index = index
+        self.embeddings = embeddings
+        self.store = store
+        self.vectors = vectors
+        self.rescore_factor = rescore_factor if vectors is not None else 0
+        # Index d'une partition: IDs globaux des chunks de ses vecteurs
+        self.ids = ids
+
+    @classmethod
+    def load(cls, directory: Path, embeddings, store: Optional[ChunkStore] = None,
+             ids: Optional[np.ndarray] = None, vectors_file: Optional[Path] = None) -> "VectorIndex":
+        """
+        Charge index.faiss avec les paramètres de recherche et de re-classement
+        enregistrés dans index_info.json par ingest.py.
+
+        Args:
+            ids: IDs globaux des vecteurs (index d'une partition)
+            vectors_file: Vecteurs exacts (directory/vectors.npy par défaut)
+        """
+        directory = Path(directory)
+        vectors_file = Path(vectors_file) if vectors_file else directory / "vectors.npy"
+        index = faiss.read_index(str(directory / "index.faiss"))
+        info = {}
+        if (directory / "index_info.json").exists():
+            with open(directory / "index_info.json", 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        if info.get("search_params"):
+            faiss.ParameterSpace().set_index_parameters(index, info["search_params"])
+
+        # mmap: seules les lignes lues (re-classement, repli exact) sont chargées
+        vectors = np.load(vectors_file, mmap_mode='r') if vectors_file.exists() else None
+        return cls(index, embeddings, store, vectors, info.get("rescore_factor", 0), ids)
+
+    def _search_parameters(self, bitmap: np.ndarray):
+        """
+        Paramètres de recherche FAISS restreignant les résultats au bitset
+        (en conservant nprobe / efSearch de l'index).
+        """
+        selector = faiss.IDSelectorBitmap(self.index.ntotal, faiss.swig_ptr(bitmap))
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+        if isinstance(self.index, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.index.hnsw.efSearch)
+        return faiss.SearchParameters(sel=selector)
+
+    def _exact_search(self, query_vector: np.ndarray, allowed: np.ndarray, k: int) -> np.ndarray:
+        """
+        Recherche exacte parmi les chunks autorisés (IDs globaux croissants).
+        """
+        exact = np.asarray(self.vectors[allowed], dtype=np.float32)
+        distances = ((exact - query_vector) ** 2).sum(axis=1)
+        return allowed[np.argsort(distances, kind='stable')[:k]]
+
+    def search_vector(self, query_vector: np.ndarray, k: int, bitmap: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Recherche les k chunks les plus proches d'un vecteur de requête.
+
+        Args:
+            bitmap: Bitset des IDs globaux autorisés (None = pas de filtre)
+
+        Returns:
+            IDs des chunks, du plus proche au plus éloigné
+        """
+        return self.search_vectors(np.asarray(query_vector, dtype=np.float32).reshape(1, -1), k, bitmap)[0]
+
+    def search_vectors(self, query_vectors: np.ndarray, k: int, bitmap: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """
+        Recherche les k chunks les plus proches de chaque vecteur de requête,
+        en un seul appel FAISS pour toutes les requêtes.
+
+        Returns:
+            Pour chaque requête, IDs des chunks du plus proche au plus éloigné
+        """
+        query_vectors = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.index.d)
+        candidates = k * self.rescore_factor if self.rescore_factor > 1 else k
+        available = self.index.ntotal
+        params = None
+        if bitmap is not None:
+            if self.ids is not None:
+                # Bitset global -> bitset local de la partition
+                bitmap = pack_mask(unpack_bitmap(bitmap)[self.ids])
+            available = int(unpack_bitmap(bitmap, self.index.ntotal).sum())
+            if available == 0:
+                return [np.zeros(0, dtype=np.int64) for _ in query_vectors]
+            params = self._search_parameters(bitmap)
+
+        distances, found = self.index.search(query_vectors, min(candidates, available), params=params)
+        results = []
+        for query_vector, ids, distances in zip(query_vectors, found, distances):
+            query_vector = query_vector.reshape(1, -1)
+            valid = ids >= 0
+            ids, distances = ids[valid], distances[valid]
+            if bitmap is not None and len(ids) < min(k, available) and self.vectors is not None:
+                # L'index approximatif n'a pas atteint assez de chunks autorisés
+                allowed = np.flatnonzero(unpack_bitmap(bitmap, self.index.ntotal))
+                allowed = self.ids[allowed] if self.ids is not None else allowed
+                results.append(self._exact_search(query_vector, allowed, k))
+                continue
+            if self.ids is not None:
+                ids = self.ids[ids]
+
+            if self.vectors is not None and len(ids):
+                # Re-classement exact (distance L2 sur les vecteurs float32): les
+                # k * rescore_factor candidats d'un index approximatif, sinon les k
+                # résultats, pour un ordre indépendant du noyau de calcul FAISS
+                # (requête seule ou lot), ex-aequo départagés par ID
+                ids = np.sort(ids)
+                exact = np.asarray(self.vectors[ids], dtype=np.float32)
+                ids = ids[np.argsort(((exact - query_vector) ** 2).sum(axis=1), kind='stable')]
+            else:
+                ids = ids[np.lexsort((ids, distances))]
+            results.append(ids[:k])
+        return results
+
+    def search(self, query: str, k: int, bitmap: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Recherche les k chunks les plus proches de la requête.
+
+        Returns:
+            IDs des chunks, du plus proche au plus éloigné
+        """
+        return self.search_vector(self.embeddings.embed_query(query), k, bitmap)
+
+    def search_batch(self, queries: List[str], k: int, bitmap: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """
+        Recherche de plusieurs requêtes: vecteurs des requêtes (en un passage
+        par le cache si les embeddings le permettent, cf.
+        QueryEmbeddingCache.embed_queries) puis une seule recherche FAISS.
+        """
+        if not queries:
+            return []
+        if hasattr(self.embeddings, "embed_queries"):
+            vectors = self.embeddings.embed_queries(queries)
+        else:
+            vectors = [self.embeddings.embed_query(query) for query in queries]
+        return self.search_vectors(np.asarray(vectors, dtype=np.float32), k, bitmap)
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return self.store.documents(self.search(query, k))